@@ -7,21 +7,154 @@ akshare数据获取模块
 """
 
 import os
+import json
+import atexit
 import time
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import akshare as ak
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
 from log_utils import get_logger
+from numeric_kernels import compute_preclose
+from schema import FIELDS
+
+# 尝试导入pyarrow，用于Feather缓存读写
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    pc = None
+    feather = None
 
 # 获取日志记录器
 logger = get_logger('akshare_data_fetcher')
 
 
+@functools.lru_cache(maxsize=8192)
+def _cache_path(cache_dir, source_name, code, frequency, adjust):
+    """
+    生成缓存文件路径，结果按参数缓存，批量获取时同一股票的路径只拼接一次
+    """
+    return os.path.join(cache_dir, f'{source_name}_{code}_{frequency}_{adjust}.feather')
+
+
+# 每个缓存文件一把锁，保护缓存文件"读取-合并-替换"的整个过程；
+# 同一股票的不同日期区间并发保存时不会互相覆盖，进程内所有获取器实例共用
+_cache_file_locks = {}
+_cache_file_locks_guard = threading.Lock()
+
+
+def _cache_file_lock(cache_file):
+    """
+    获取缓存文件对应的锁，首次使用时创建
+    
+    Args:
+        cache_file: 缓存文件路径
+        
+    Returns:
+        threading.Lock: 该缓存文件的锁
+    """
+    with _cache_file_locks_guard:
+        lock = _cache_file_locks.get(cache_file)
+        if lock is None:
+            lock = _cache_file_locks[cache_file] = threading.Lock()
+        return lock
+
+
+# 进程内共享的HTTP会话，首次创建获取器时创建并替换akshare行情模块使用的requests，进程退出时关闭
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def _get_http_session():
+    """
+    获取进程内共享的HTTP会话，首次调用时创建带连接池和重试的会话，并替换akshare行情模块使用的requests
+    
+    akshare的行情接口以模块属性方式调用requests.get，替换为Session后，
+    同一进程内的请求复用连接池中的长连接，网络错误和5xx响应按指数退避自动重试；
+    替换只进行一次，多个获取器实例共用同一个会话
+    
+    Returns:
+        requests.Session: HTTP会话
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is not None:
+            return _http_session
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=64,
+            pool_maxsize=64,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504))
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        
+        try:
+            import akshare.stock_feature.stock_hist_em as stock_hist_em
+            stock_hist_em.requests = session
+        except ImportError as e:
+            logger.warning(f'无法为akshare启用连接复用: {str(e)}')
+        
+        atexit.register(session.close)
+        _http_session = session
+        return session
+
+
 class AkShareDataFetcher:
     """
 akshare数据获取器
     """
     
+    # akshare列名到系统标准列名的映射
+    COLUMN_MAPPING = {
+        '日期': 'date',
+        '股票代码': 'code',
+        '开盘': 'open',
+        '收盘': 'close',
+        '最高': 'high',
+        '最低': 'low',
+        '成交量': 'volume',
+        '成交额': 'amount',
+        '振幅': 'amplitude',
+        '涨跌幅': 'pctChg',
+        '涨跌额': 'change',
+        '换手率': 'turn',
+    }
+    
+    # 系统标准列
+    REQUIRED_COLUMNS = list(FIELDS)
+    
+    # 数值类型的标准列
+    NUMERIC_COLUMNS = ['open', 'high', 'low', 'close', 'preclose', 'volume', 'amount', 'turn', 'pctChg']
+    
+    # 标准列缺失时的默认值：数值列为0.0，文本列为空字符串
+    COLUMN_DEFAULTS = {
+        'date': '', 'code': '', 'open': 0.0, 'high': 0.0, 'low': 0.0, 'close': 0.0,
+        'preclose': 0.0, 'volume': 0.0, 'amount': 0.0, 'adjustflag': '', 'turn': 0.0,
+        'tradestatus': '', 'pctChg': 0.0, 'peTTM': '', 'pbMRQ': '', 'psTTM': '',
+        'pcfNcfTTM': '', 'isST': ''
+    }
+    
+    # 复权类型到adjustflag（复权标志）的映射
+    ADJUSTFLAG_MAP = {
+        'qfq': '1',  # 前复权
+        'hfq': '2',  # 后复权
+        '': '3'      # 不复权
+    }
+    
+    # 缓存文件元数据中记录已覆盖日期区间的键
+    CACHE_RANGES_KEY = b'akshare_cache_ranges'
+    
     def __init__(self, config=None):
         """
         初始化akshare数据获取器
@@ -42,71 +175,140 @@ akshare数据获取器
         self.last_request_time = 0
         self.min_interval = 1.0 / self.rate_limit
         
+        # 令牌桶，多线程共享，桶容量为1以保证相邻请求间隔不小于min_interval
+        self._rate_lock = threading.Lock()
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        
+        # 正在进行中的请求，相同(代码, 开始日期, 结束日期)的并发请求共享同一个结果
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        
+        # 批量获取线程池，网络I/O密集，线程数为速率上限的2倍
+        self.executor = ThreadPoolExecutor(max_workers=max(1, int(self.rate_limit * 2)))
+        
         # 超时配置
         self.timeout = self.akshare_config.get('timeout', 30)
         
+        # 复用HTTP连接，避免每次请求重新建立TCP/TLS连接；会话为进程内共享，只创建一次
+        self._session = _get_http_session()
+        
         # 缓存配置
         self.cache_enabled = self.akshare_config.get('cache_enabled', True)
         self.cache_expire_hours = self.akshare_config.get('cache_expire_hours', 24)
         self.cache_dir = './cache/akshare'
         os.makedirs(self.cache_dir, exist_ok=True)
+        if self.cache_enabled and feather is None:
+            logger.warning('pyarrow未安装，数据缓存已禁用，请使用pip install pyarrow安装')
+            self.cache_enabled = False
         
         logger.info(f'akshare数据获取器初始化完成，数据源: {self.source_name}，频率: {self.frequency}，复权: {self.adjust}')
     
+    def close(self):
+        """
+        关闭批量获取线程池，等待已提交的请求完成
+        """
+        self.executor.shutdown(wait=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def _check_rate_limit(self):
         """
         检查速率限制，确保不超过每秒最大请求数
-        """
-        current_time = time.time()
-        elapsed = current_time - self.last_request_time
         
-        if elapsed < self.min_interval:
-            # 需要等待
-            wait_time = self.min_interval - elapsed
+        使用线程安全的令牌桶实现：仅在锁内补充和扣减令牌，等待在锁外进行，
+        批量获取的多个工作线程可以同时等待而不会互相阻塞
+        """
+        while True:
+            with self._rate_lock:
+                now = time.monotonic()
+                # 按速率补充令牌
+                self._tokens = min(1.0, self._tokens + (now - self._last_refill) * self.rate_limit)
+                self._last_refill = now
+                
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    # 更新最后请求时间
+                    self.last_request_time = time.time()
+                    return
+                
+                wait_time = (1.0 - self._tokens) / self.rate_limit
+            
+            # 需要等待，在锁外休眠
             logger.debug(f'速率限制：等待 {wait_time:.2f} 秒')
             time.sleep(wait_time)
+    
+    @staticmethod
+    def _normalize_date(date):
+        """
+        将日期统一为YYYYMMDD格式，便于区间比较
         
-        # 更新最后请求时间
-        self.last_request_time = time.time()
+        Args:
+            date: 日期，格式YYYY-MM-DD或YYYYMMDD
+            
+        Returns:
+            str: YYYYMMDD格式的日期
+        """
+        return str(date).replace('-', '')
     
-    def _get_cache_file_path(self, code, start_date, end_date):
+    def _get_cache_file_path(self, code):
         """
-        获取缓存文件路径
+        获取缓存文件路径，每只股票一个Feather文件，保存该股票所有已获取的日期
         
         Args:
             code: 股票代码
-            start_date: 开始日期
-            end_date: 结束日期
             
         Returns:
             str: 缓存文件路径
         """
-        cache_filename = f'{self.source_name}_{code}_{start_date}_{end_date}_{self.frequency}_{self.adjust}.csv'
-        return os.path.join(self.cache_dir, cache_filename)
+        return _cache_path(self.cache_dir, self.source_name, code, self.frequency, self.adjust)
     
-    def _is_cache_valid(self, cache_file):
+    def _parse_cache_ranges(self, schema):
         """
-        检查缓存是否有效
+        解析缓存文件schema元数据中记录的已覆盖日期区间
         
         Args:
-            cache_file: 缓存文件路径
+            schema: 缓存文件的Arrow schema
             
         Returns:
-            bool: 缓存是否有效
+            list: [开始日期, 结束日期, 获取时间戳] 列表，日期格式YYYYMMDD
+        """
+        metadata = schema.metadata or {}
+        ranges = metadata.get(self.CACHE_RANGES_KEY)
+        return json.loads(ranges) if ranges else []
+    
+    def _is_cache_valid(self, ranges, start_date, end_date):
         """
-        if not os.path.exists(cache_file):
-            return False
+        检查缓存是否有效：存在一个未过期的已获取区间完整覆盖请求区间
         
-        # 检查缓存文件的修改时间
-        mtime = os.path.getmtime(cache_file)
+        Args:
+            ranges: 缓存文件中记录的已覆盖日期区间
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            bool: 缓存是否有效
+        """
+        start, end = self._normalize_date(start_date), self._normalize_date(end_date)
         expire_time = time.time() - self.cache_expire_hours * 3600
         
-        return mtime > expire_time
+        for range_start, range_end, fetched_at in ranges:
+            if range_start <= start and range_end >= end and fetched_at > expire_time:
+                return True
+        
+        return False
     
     def _load_from_cache(self, code, start_date, end_date):
         """
         从缓存加载数据
         
+        缓存文件只打开一次：文件不存在时直接返回，存在时先读取文件尾部的schema判断有效性，
+        有效再从同一个文件句柄读取数据
+        
         Args:
             code: 股票代码
             start_date: 开始日期
@@ -118,22 +320,39 @@ akshare数据获取器
         if not self.cache_enabled:
             return None
         
-        cache_file = self._get_cache_file_path(code, start_date, end_date)
+        cache_file = self._get_cache_file_path(code)
         
-        if self._is_cache_valid(cache_file):
+        try:
+            # 内存映射读取，文件页由操作系统页缓存在各工作线程/进程间共享
             try:
-                df = pd.read_csv(cache_file)
-                logger.debug(f'从缓存加载股票 {code} 数据成功，缓存文件: {cache_file}')
-                return df
-            except Exception as e:
-                logger.error(f'从缓存加载股票 {code} 数据失败: {str(e)}')
+                source = pa.memory_map(cache_file, 'r')
+            except FileNotFoundError:
                 return None
-        
-        return None
+            
+            with source:
+                reader = pa.ipc.open_file(source)
+                if not self._is_cache_valid(self._parse_cache_ranges(reader.schema), start_date, end_date):
+                    return None
+                
+                # 先在Arrow层按日期过滤，只把请求区间内的行转换为DataFrame
+                start, end = self._normalize_date(start_date), self._normalize_date(end_date)
+                table = reader.read_all()
+                date_col = table.column('date')
+                mask = pc.and_(
+                    pc.greater_equal(date_col, f'{start[:4]}-{start[4:6]}-{start[6:]}'),
+                    pc.less_equal(date_col, f'{end[:4]}-{end[4:6]}-{end[6:]}')
+                )
+                df = table.filter(mask).to_pandas(split_blocks=True, self_destruct=True)
+                del table
+            logger.debug(f'从缓存加载股票 {code} 数据成功，缓存文件: {cache_file}')
+            return df
+        except Exception as e:
+            logger.error(f'从缓存加载股票 {code} 数据失败: {str(e)}')
+            return None
     
     def _save_to_cache(self, code, start_date, end_date, df):
         """
-        将数据保存到缓存
+        将数据合并保存到缓存，与已缓存的其他日期的数据合并后整体写回
         
         Args:
             code: 股票代码
@@ -144,14 +363,59 @@ akshare数据获取器
         if not self.cache_enabled or df is None or df.empty:
             return
         
-        cache_file = self._get_cache_file_path(code, start_date, end_date)
+        cache_file = self._get_cache_file_path(code)
         
         try:
-            df.to_csv(cache_file, index=False, encoding='utf-8')
+            # 读取已有缓存到替换文件期间持有该文件的锁，避免并发保存时后写入的覆盖先写入的数据
+            with _cache_file_lock(cache_file):
+                expire_time = time.time() - self.cache_expire_hours * 3600
+                ranges = []
+                cached_df = None
+                try:
+                    with pa.memory_map(cache_file, 'r') as source:
+                        reader = pa.ipc.open_file(source)
+                        ranges = [r for r in self._parse_cache_ranges(reader.schema) if r[2] > expire_time]
+                        if ranges:
+                            cached_df = reader.read_all().to_pandas()
+                except FileNotFoundError:
+                    pass
+                
+                # 合并未过期的已缓存数据，新获取的数据覆盖相同日期的旧数据
+                if cached_df is not None:
+                    df = pd.concat([cached_df[~cached_df['date'].isin(df['date'])], df], ignore_index=True)
+                    df = df.sort_values('date', ignore_index=True)
+                ranges.append([self._normalize_date(start_date), self._normalize_date(end_date), time.time()])
+                
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                metadata = {**(table.schema.metadata or {}), self.CACHE_RANGES_KEY: json.dumps(ranges).encode('utf-8')}
+                table = table.replace_schema_metadata(metadata)
+                
+                # 先写临时文件再替换，避免并发读取到不完整的文件
+                tmp_file = f'{cache_file}.{threading.get_ident()}.tmp'
+                feather.write_feather(table, tmp_file, compression='lz4')
+                os.replace(tmp_file, cache_file)
             logger.debug(f'将股票 {code} 数据保存到缓存成功，缓存文件: {cache_file}')
         except Exception as e:
             logger.error(f'将股票 {code} 数据保存到缓存失败: {str(e)}')
     
+    @staticmethod
+    def _format_dates(dates):
+        """
+        将日期列转换为YYYY-MM-DD格式的字符串数组
+        
+        已是datetime64类型时直接转换为datetime64[D]，否则整列用pd.to_datetime解析一次，
+        再由numpy统一格式化，无需逐行调用Python的strftime
+        
+        Args:
+            dates: 日期列
+            
+        Returns:
+            np.ndarray: 日期字符串数组
+        """
+        if not pd.api.types.is_datetime64_dtype(dates):
+            dates = pd.to_datetime(dates)
+        return dates.to_numpy(dtype='datetime64[D]').astype('U10')
+    
     def _convert_akshare_to_standard(self, df, code):
         """
         将akshare数据转换为系统标准格式
@@ -166,84 +430,55 @@ akshare数据获取器
         if df is None or df.empty:
             return df
         
-        # 重命名列，转换为系统标准格式
-        column_mapping = {
-            '日期': 'date',
-            '股票代码': 'code',
-            '开盘': 'open',
-            '收盘': 'close',
-            '最高': 'high',
-            '最低': 'low',
-            '成交量': 'volume',
-            '成交额': 'amount',
-            '振幅': 'amplitude',
-            '涨跌幅': 'pctChg',
-            '涨跌额': 'change',
-            '换手率': 'turn',
-        }
-        
-        # 选择需要的列并转换
-        standard_df = pd.DataFrame()
+        # 重命名列，缺失的标准列一次性按默认值补齐，再按标准列重排
+        renamed_df = df.rename(columns=self.COLUMN_MAPPING)
+        missing_columns = [col for col in self.REQUIRED_COLUMNS if col not in renamed_df.columns]
+        standard_df = renamed_df.assign(
+            **{col: self.COLUMN_DEFAULTS[col] for col in missing_columns}
+        )[self.REQUIRED_COLUMNS]
         
         # 转换日期格式
-        if '日期' in df.columns:
-            standard_df['date'] = pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d')
-        
-        # 转换其他列
-        for ak_col, std_col in column_mapping.items():
-            if ak_col in df.columns:
-                standard_df[std_col] = df[ak_col]
-        
-        # 设置股票代码
-        standard_df['code'] = code
-        
-        # 添加缺失的标准列
-        required_columns = [
-            'date', 'code', 'open', 'high', 'low', 'close', 'preclose', 
-            'volume', 'amount', 'adjustflag', 'turn', 'tradestatus', 
-            'pctChg', 'peTTM', 'pbMRQ', 'psTTM', 'pcfNcfTTM', 'isST'
-        ]
-        
-        for col in required_columns:
-            if col not in standard_df.columns:
-                if col in ['preclose', 'adjustflag', 'tradestatus', 'peTTM', 'pbMRQ', 'psTTM', 'pcfNcfTTM', 'isST']:
-                    standard_df[col] = ''
-                else:
-                    standard_df[col] = 0.0
-        
-        # 转换数据类型
-        numeric_columns = ['open', 'high', 'low', 'close', 'preclose', 'volume', 'amount', 'turn', 'pctChg']
-        for col in numeric_columns:
-            if col in standard_df.columns:
-                standard_df[col] = pd.to_numeric(standard_df[col], errors='coerce')
-        
-        # 设置preclose（前收盘价）
-        if 'close' in standard_df.columns:
-            standard_df['preclose'] = standard_df['close'].shift(1)
-            # 填充第一个值
-            standard_df['preclose'] = standard_df['preclose'].fillna(standard_df['open'])
-        
-        # 设置adjustflag（复权标志）
-        adjustflag_map = {
-            'qfq': '1',  # 前复权
-            'hfq': '2',  # 后复权
-            '': '3'      # 不复权
-        }
-        standard_df['adjustflag'] = adjustflag_map.get(self.adjust, '3')
+        if 'date' in renamed_df.columns:
+            standard_df['date'] = self._format_dates(standard_df['date'])
         
-        # 设置tradestatus（交易状态）
-        standard_df['tradestatus'] = '1'  # 默认正常交易
+        # 转换数据类型，akshare返回的数值列通常已是数值类型，此时跳过逐列解析
+        numeric_df = standard_df[self.NUMERIC_COLUMNS]
+        if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in numeric_df.dtypes):
+            numeric_df = numeric_df.apply(pd.to_numeric, errors='coerce')
+        standard_df[self.NUMERIC_COLUMNS] = numeric_df.astype(np.float64)
         
-        # 设置isST（是否ST股）
-        standard_df['isST'] = '0'  # 默认非ST股
+        # 设置preclose（前收盘价）
+        close = standard_df['close'].to_numpy(dtype=np.float64)
+        if 'change' in renamed_df.columns:
+            # akshare已提供涨跌额，前收盘价 = 收盘价 - 涨跌额，第一行也能得到准确值
+            change = pd.to_numeric(renamed_df['change'], errors='coerce').to_numpy(dtype=np.float64)
+            standard_df['preclose'] = np.round(close - change, 4)
+        else:
+            # 否则用前一日收盘价，第一个值用开盘价填充
+            standard_df['preclose'] = compute_preclose(standard_df['open'].to_numpy(dtype=np.float64), close)
+        
+        # 一次性设置常量列：股票代码、复权标志、交易状态（默认正常交易）、是否ST股（默认非ST股）及akshare不提供的估值指标
+        standard_df = standard_df.assign(
+            code=code,
+            adjustflag=self.ADJUSTFLAG_MAP.get(self.adjust, '3'),
+            tradestatus='1',
+            isST='0',
+            peTTM='',
+            pbMRQ='',
+            psTTM='',
+            pcfNcfTTM=''
+        )
         
         logger.debug(f'数据转换完成，原始列: {list(df.columns)}，标准列: {list(standard_df.columns)}')
         
         return standard_df
     
-    def fetch_stock_data(self, code, start_date, end_date):
+    def _fetch_one(self, code, start_date, end_date):
         """
-        获取股票历史K线数据
+        获取单只股票数据（不检查缓存），合并相同参数的并发请求
+        
+        第一个请求负责实际获取，同一时刻相同参数的其他请求等待并复用其结果，
+        避免重复请求网络和重复写缓存；等待的请求各自得到结果的副本，调用方修改返回的DataFrame时互不影响
         
         Args:
             code: 股票代码
@@ -253,13 +488,41 @@ akshare数据获取器
         Returns:
             pd.DataFrame: 股票历史数据
         """
-        logger.info(f'开始获取股票 {code} 数据，日期范围: {start_date} 至 {end_date}')
+        key = (code, start_date, end_date)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not is_owner:
+            logger.debug(f'股票 {code} 已有相同的请求在进行中，等待其结果')
+            return future.result().copy()
         
-        # 检查缓存
-        cached_data = self._load_from_cache(code, start_date, end_date)
-        if cached_data is not None:
-            return cached_data
+        try:
+            result = self._fetch_from_akshare(code, start_date, end_date)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+    
+    def _fetch_from_akshare(self, code, start_date, end_date):
+        """
+        调用akshare获取单只股票数据，先获取速率令牌再发起请求
         
+        Args:
+            code: 股票代码
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            pd.DataFrame: 股票历史数据
+        """
         # 检查速率限制
         self._check_rate_limit()
         
@@ -291,6 +554,109 @@ akshare数据获取器
             logger.error(f'获取股票 {code} 数据失败: {str(e)}')
             return pd.DataFrame()
     
+    def fetch_stock_data(self, code, start_date, end_date):
+        """
+        获取股票历史K线数据
+        
+        Args:
+            code: 股票代码
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            pd.DataFrame: 股票历史数据
+        """
+        logger.info(f'开始获取股票 {code} 数据，日期范围: {start_date} 至 {end_date}')
+        
+        # 检查缓存
+        cached_data = self._load_from_cache(code, start_date, end_date)
+        if cached_data is not None:
+            return cached_data
+        
+        return self._fetch_one(code, start_date, end_date)
+    
+    def fetch_stock_data_batch(self, codes, start_date, end_date):
+        """
+        并发批量获取多只股票的历史K线数据
+        
+        命中缓存的股票直接返回，不占用速率令牌；其余股票提交到线程池并发获取，
+        实际请求速率仍由令牌桶限制
+        
+        Args:
+            codes: 股票代码列表
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            dict: 以股票代码为键，DataFrame为值的字典
+        """
+        logger.info(f'开始批量获取 {len(codes)} 只股票数据，日期范围: {start_date} 至 {end_date}')
+        
+        results = {}
+        futures = {}
+        
+        for code in codes:
+            # 检查缓存
+            cached_data = self._load_from_cache(code, start_date, end_date)
+            if cached_data is not None:
+                results[code] = cached_data
+            else:
+                futures[code] = self.executor.submit(self._fetch_one, code, start_date, end_date)
+        
+        for code, future in futures.items():
+            results[code] = future.result()
+        
+        logger.info(f'批量获取完成，缓存命中 {len(codes) - len(futures)} 只，网络获取 {len(futures)} 只')
+        return results
+    
+    def fetch_and_store(self, code, start_date, end_date, conn):
+        """
+        获取股票历史K线数据并直接写入history_k_data表
+        
+        转换为标准格式后一次性转为Python列表，在单个事务中用executemany批量写入，
+        同一股票在该日期区间内的旧数据会先被删除，重复写入不会产生重复记录
+        
+        Args:
+            code: 股票代码
+            start_date: 开始日期
+            end_date: 结束日期
+            conn: sqlite3数据库连接，调用时不能有未结束的事务
+            
+        Returns:
+            int: 写入的记录数
+        """
+        df = self.fetch_stock_data(code, start_date, end_date)
+        if df.empty:
+            logger.warning(f'股票 {code} 无数据，跳过写入')
+            return 0
+        
+        df = df[self.REQUIRED_COLUMNS]
+        rows = df.to_numpy().tolist()
+        columns = ', '.join(self.REQUIRED_COLUMNS)
+        placeholders = ', '.join(['?'] * len(self.REQUIRED_COLUMNS))
+        
+        # 显式开启事务，删除旧数据和写入新数据要么全部生效要么全部回滚；
+        # 连接在isolation_level为None的自动提交模式下同样适用，日志模式等PRAGMA由建表时统一设置
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'DELETE FROM history_k_data WHERE code = ? AND date >= ? AND date <= ?',
+                (code, df['date'].min(), df['date'].max())
+            )
+            conn.executemany(
+                f'INSERT INTO history_k_data ({columns}) VALUES ({placeholders})',
+                rows
+            )
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            logger.error(f'写入股票 {code} 数据失败: {str(e)}')
+            raise
+        
+        logger.info(f'成功写入股票 {code} 数据，共 {len(rows)} 条记录')
+        return len(rows)
+    
     def fetch_index_data(self, code, start_date, end_date):
         """
         获取指数历史数据
@@ -395,22 +761,21 @@ if __name__ == '__main__':
         }
     }
     
-    # 创建数据获取器
-    fetcher = AkShareDataFetcher(config)
-    
-    # 测试获取股票数据
-    stock_code = '000001'
-    start_date = '2023-01-01'
-    end_date = '2023-01-10'
-    
-    logger.info(f'测试获取股票 {stock_code} 数据')
-    df = fetcher.fetch_stock_data(stock_code, start_date, end_date)
-    logger.info(f'获取到 {len(df)} 条记录')
-    print(df.head())
-    
-    # 测试获取指数数据
-    index_code = 'sh000001'
-    logger.info(f'测试获取指数 {index_code} 数据')
-    df = fetcher.fetch_index_data(index_code, start_date, end_date)
-    logger.info(f'获取到 {len(df)} 条记录')
-    print(df.head())
+    # 创建数据获取器，结束时关闭线程池
+    with AkShareDataFetcher(config) as fetcher:
+        # 测试获取股票数据
+        stock_code = '000001'
+        start_date = '2023-01-01'
+        end_date = '2023-01-10'
+        
+        logger.info(f'测试获取股票 {stock_code} 数据')
+        df = fetcher.fetch_stock_data(stock_code, start_date, end_date)
+        logger.info(f'获取到 {len(df)} 条记录')
+        print(df.head())
+        
+        # 测试获取指数数据
+        index_code = 'sh000001'
+        logger.info(f'测试获取指数 {index_code} 数据')
+        df = fetcher.fetch_index_data(index_code, start_date, end_date)
+        logger.info(f'获取到 {len(df)} 条记录')
+        print(df.head())
@@ -8,10 +8,13 @@ Baostock数据获取适配器
 
 import os
 import time
+import threading
+import numpy as np
 import pandas as pd
 import baostock as bs
 from typing import Optional, Dict, Any
 from data_fetcher_interface import DataFetcherInterface
+from schema import FIELDS
 from log_utils import get_logger
 
 
@@ -21,6 +24,33 @@ class BaostockDataFetcher(DataFetcherInterface):
     实现DataFetcherInterface接口，用于获取股票、指数等金融数据
     """
     
+    # 查询的K线字段，与history_k_data表结构一致
+    FIELDS = FIELDS
+    
+    # 不可重试的错误码（参数错误、无效代码、权限不足等），重试也不会成功
+    PERMANENT_ERROR_CODES = frozenset({
+        '10001006',  # 用户权限不足
+        '10001011',  # 黑名单用户
+        '10004005',  # 传入参数为空
+        '10004006',  # 参数错误
+        '10004007',  # 起始日期格式不正确
+        '10004008',  # 截止日期格式不正确
+        '10004009',  # 起始日期大于终止日期
+        '10004010',  # 日期格式不正确
+        '10004011',  # 无效的证券代码
+        '10004012',  # 无效的指标
+        '10004013',  # 超出日期支持范围
+        '10004014',  # 不支持的混合证券品种
+        '10004015',  # 不支持的证券代码品种
+        '10004018',  # 指标重复
+    })
+    
+    # 需要转换为数值类型的字段
+    NUMERIC_FIELDS = (
+        'open', 'high', 'low', 'close', 'preclose', 'volume', 'amount',
+        'turn', 'pctChg', 'peTTM', 'pbMRQ', 'psTTM', 'pcfNcfTTM'
+    )
+    
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         """
         初始化Baostock数据获取器
@@ -43,8 +73,12 @@ class BaostockDataFetcher(DataFetcherInterface):
         # 超时配置
         self.timeout = self.baostock_config.get('timeout', 30)
         
+        # 查询字段字符串只拼接一次，避免每次请求重复构造
+        self._fields_str = ','.join(self.FIELDS)
+        
         # 状态跟踪
         self.is_logged_in = False
+        self._login_lock = threading.Lock()
         self.last_health_check = 0
         self.health_status = False
         
@@ -56,36 +90,81 @@ class BaostockDataFetcher(DataFetcherInterface):
         """
         登录Baostock系统
         
+        登录状态在进程内复用，仅在未登录时才真正发起登录，并发调用时只登录一次
+        
         Returns:
             bool: 登录是否成功
         """
-        if self.is_logged_in:
-            return True
-        
-        try:
-            lg = bs.login()
-            if lg.error_code == '0':
-                self.is_logged_in = True
-                self.logger.debug('Baostock登录成功')
+        with self._login_lock:
+            if self.is_logged_in:
                 return True
-            else:
-                self.logger.error(f'Baostock登录失败: {lg.error_msg}')
+            
+            try:
+                lg = bs.login()
+                if lg.error_code == '0':
+                    self.is_logged_in = True
+                    self.logger.debug('Baostock登录成功')
+                    return True
+                else:
+                    self.logger.error(f'Baostock登录失败: {lg.error_msg}')
+                    return False
+            except Exception as e:
+                self.logger.error(f'Baostock登录发生异常: {str(e)}')
                 return False
-        except Exception as e:
-            self.logger.error(f'Baostock登录发生异常: {str(e)}')
-            return False
     
     def _logout(self):
         """
         登出Baostock系统
         """
-        if self.is_logged_in:
-            try:
-                bs.logout()
-                self.is_logged_in = False
-                self.logger.debug('Baostock登出成功')
-            except Exception as e:
-                self.logger.error(f'Baostock登出发生异常: {str(e)}')
+        with self._login_lock:
+            if self.is_logged_in:
+                try:
+                    bs.logout()
+                    self.is_logged_in = False
+                    self.logger.debug('Baostock登出成功')
+                except Exception as e:
+                    self.logger.error(f'Baostock登出发生异常: {str(e)}')
+    
+    def _get_retry_delay(self, attempt: int) -> float:
+        """
+        计算第attempt次失败后的重试等待时间（指数退避）
+        
+        Args:
+            attempt: 已失败的尝试序号，从0开始
+        
+        Returns:
+            float: 等待秒数
+        """
+        return self.retry_interval * (2 ** attempt)
+    
+    def _build_dataframe(self, rs) -> pd.DataFrame:
+        """
+        将Baostock结果集批量转换为DataFrame
+        
+        逐行收集原始字符串后一次性构建二维数组按列切片，数值字段统一转换为float64，
+        避免pandas逐列推断类型
+        
+        Args:
+            rs: Baostock查询结果集
+        
+        Returns:
+            pd.DataFrame: 结果数据
+        """
+        rows = []
+        while rs.next():
+            rows.append(rs.get_row_data())
+        
+        if not rows:
+            return pd.DataFrame(columns=rs.fields)
+        
+        arr = np.array(rows, dtype=object)
+        result = pd.DataFrame({field: arr[:, i] for i, field in enumerate(rs.fields)}, copy=False)
+        
+        numeric_fields = [field for field in self.NUMERIC_FIELDS if field in result.columns]
+        if numeric_fields:
+            result[numeric_fields] = result[numeric_fields].apply(pd.to_numeric, errors='coerce')
+        
+        return result
     
     def fetch_stock_data(self, code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
@@ -103,50 +182,54 @@ class BaostockDataFetcher(DataFetcherInterface):
         
         for attempt in range(self.retry_count):
             try:
-                # 确保已登录
-                if not self._login():
+                # 确保已登录，已登录时直接复用会话
+                if not self.is_logged_in and not self._login():
                     self.logger.error(f'股票 {code} 数据获取失败: 登录失败')
-                    time.sleep(self.retry_interval)
+                    time.sleep(self._get_retry_delay(attempt))
                     continue
                 
                 # 获取历史K线数据
                 rs = bs.query_history_k_data_plus(
                     code,
-                    "date,code,open,high,low,close,preclose,volume,amount,adjustflag,turn,tradestatus,pctChg,peTTM,pbMRQ,psTTM,pcfNcfTTM,isST",
+                    self._fields_str,
                     start_date=start_date, 
                     end_date=end_date, 
                     frequency=self.frequency, 
                     adjustflag=self.adjustflag
                 )
                 
-                # 检查是否需要重新登录
-                if rs.error_code == '10001001' and '未登录' in rs.error_msg:
+                # 会话失效时才重新登录
+                if rs.error_code == '10001001':
                     self.logger.warning(f'股票 {code} 数据获取失败: 未登录，尝试重新登录...')
                     self.is_logged_in = False
+                    self._login()
                     continue
                 
+                if rs.error_code in self.PERMANENT_ERROR_CODES:
+                    # 参数或权限类错误重试也不会成功，直接放弃
+                    self.logger.error(f'获取股票 {code} 历史数据失败（不可重试）: {rs.error_msg}')
+                    return pd.DataFrame()
+                
                 if rs.error_code != '0':
                     self.logger.error(f'获取股票 {code} 历史数据失败: {rs.error_msg}')
                     if attempt < self.retry_count - 1:
-                        self.logger.debug(f'将在 {self.retry_interval} 秒后重试...')
-                        time.sleep(self.retry_interval)
+                        retry_delay = self._get_retry_delay(attempt)
+                        self.logger.debug(f'将在 {retry_delay} 秒后重试...')
+                        time.sleep(retry_delay)
                         continue
                     else:
                         return pd.DataFrame()
                 
                 # 解析结果集
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
-                
-                result = pd.DataFrame(data_list, columns=rs.fields)
+                result = self._build_dataframe(rs)
                 self.logger.debug(f'成功获取股票 {code} 历史数据，共 {len(result)} 条记录')
                 return result
             except Exception as e:
                 self.logger.error(f'获取股票 {code} 历史数据时发生异常: {str(e)}')
                 if attempt < self.retry_count - 1:
-                    self.logger.debug(f'将在 {self.retry_interval} 秒后重试...')
-                    time.sleep(self.retry_interval)
+                    retry_delay = self._get_retry_delay(attempt)
+                    self.logger.debug(f'将在 {retry_delay} 秒后重试...')
+                    time.sleep(retry_delay)
                     continue
                 else:
                     return pd.DataFrame()
@@ -263,8 +346,10 @@ class BaostockDataFetcher(DataFetcherInterface):
             'adjustflag': self.adjustflag
         }
     
-    def __del__(self):
+    def close(self):
         """
-        析构函数，确保登出
+        关闭数据获取器，登出Baostock系统
+        
+        登录状态在进程内复用，由调用者在不再需要获取数据时显式调用
         """
         self._logout()
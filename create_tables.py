@@ -1,4 +1,5 @@
 from sqlite_db_manager import SQLiteDBManager
+from schema import HISTORY_K_DATA_COLUMNS
 from log_utils import setup_logger, get_logger
 
 # 配置日志
@@ -27,43 +28,21 @@ def create_tables(db_path: str = 'stock_data.db'):
         db_manager.connect()
         logger.info(f"成功连接到数据库: {db_path}")
         
+        # 所有建表和建索引语句汇总后在一个事务中执行，只需一次磁盘同步
+        ddl_statements = []
+        
         # 创建history_k_data表
-        logger.info("开始创建history_k_data表...")
-        db_manager.create_table(
-            'history_k_data',
-            {
-                'date': 'TEXT',
-                'code': 'TEXT',
-                'open': 'REAL',
-                'high': 'REAL',
-                'low': 'REAL',
-                'close': 'REAL',
-                'preclose': 'REAL',
-                'volume': 'REAL',
-                'amount': 'REAL',
-                'adjustflag': 'TEXT',
-                'turn': 'REAL',
-                'tradestatus': 'TEXT',
-                'pctChg': 'REAL',
-                'peTTM': 'REAL',
-                'pbMRQ': 'REAL',
-                'psTTM': 'REAL',
-                'pcfNcfTTM': 'REAL',
-                'isST': 'TEXT'
-            }
-        )
-        # 添加索引
-        db_manager.execute_update(
-            "CREATE INDEX IF NOT EXISTS idx_history_k_data_code ON history_k_data(code)"
-        )
-        db_manager.execute_update(
+        ddl_statements.append(db_manager.build_create_table_sql('history_k_data', HISTORY_K_DATA_COLUMNS))
+        # 添加索引：按股票读取历史数据时以(code, date)索引定位并按日期排序，
+        # 其前缀已覆盖只按code过滤的查询，单独的code索引不再需要
+        ddl_statements.append(db_manager.build_create_index_sql('history_k_data', ('code', 'date')))
+        ddl_statements.append("DROP INDEX IF EXISTS idx_history_k_data_code")
+        ddl_statements.append(
             "CREATE INDEX IF NOT EXISTS idx_history_k_data_date ON history_k_data(date)"
         )
-        logger.info("history_k_data表创建完成")
         
         # 创建technical_indicators表
-        logger.info("开始创建technical_indicators表...")
-        db_manager.create_table(
+        ddl_statements.append(db_manager.build_create_table_sql(
             'technical_indicators',
             {
                 'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
@@ -92,16 +71,18 @@ def create_tables(db_path: str = 'stock_data.db'):
                 'VOL20': 'REAL',
                 'created_at': 'TEXT DEFAULT CURRENT_TIMESTAMP'
             }
-        )
+        ))
         # 添加唯一约束
-        db_manager.execute_update(
+        ddl_statements.append(
             "CREATE UNIQUE INDEX IF NOT EXISTS idx_technical_indicators_date_code ON technical_indicators(date, code)"
         )
-        logger.info("technical_indicators表创建完成")
+        # 按股票代码和日期范围查询技术指标时使用的索引
+        ddl_statements.append(
+            "CREATE INDEX IF NOT EXISTS idx_technical_indicators_code_date ON technical_indicators(code, date)"
+        )
         
         # 创建analysis_results表
-        logger.info("开始创建analysis_results表...")
-        db_manager.create_table(
+        ddl_statements.append(db_manager.build_create_table_sql(
             'analysis_results',
             {
                 'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
@@ -110,11 +91,8 @@ def create_tables(db_path: str = 'stock_data.db'):
                 'strategy': 'TEXT NOT NULL',
                 'rating': 'TEXT NOT NULL',
                 'score': 'REAL',
-                'macd_signal': 'TEXT',
-                'rsi_signal': 'TEXT',
-                'kdj_signal': 'TEXT',
-                'boll_signal': 'TEXT',
-                'ma_signal': 'TEXT',
+                # 各指标信号以JSON对象存储，如{"macd":"buy","rsi":"hold"}，读取时用json_extract取出
+                'signals_json': 'TEXT',
                 'llm_analysis': 'TEXT',
                 'llm_provider': 'TEXT',
                 'llm_model': 'TEXT',
@@ -122,16 +100,18 @@ def create_tables(db_path: str = 'stock_data.db'):
                 'expected_return': 'REAL',
                 'created_at': 'TEXT DEFAULT CURRENT_TIMESTAMP'
             }
-        )
+        ))
         # 添加唯一约束
-        db_manager.execute_update(
+        ddl_statements.append(
             "CREATE UNIQUE INDEX IF NOT EXISTS idx_analysis_results_stock_date_strategy ON analysis_results(stock_code, analysis_date, strategy)"
         )
-        logger.info("analysis_results表创建完成")
+        # 按策略查询并按分析日期倒序排列时使用的索引
+        ddl_statements.append(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_results_strategy_date ON analysis_results(strategy, analysis_date DESC)"
+        )
         
         # 创建analysis_reports表
-        logger.info("开始创建analysis_reports表...")
-        db_manager.create_table(
+        ddl_statements.append(db_manager.build_create_table_sql(
             'analysis_reports',
             {
                 'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
@@ -141,16 +121,14 @@ def create_tables(db_path: str = 'stock_data.db'):
                 'report_content': 'TEXT NOT NULL',
                 'created_at': 'TEXT DEFAULT CURRENT_TIMESTAMP'
             }
-        )
+        ))
         # 添加唯一约束
-        db_manager.execute_update(
+        ddl_statements.append(
             "CREATE UNIQUE INDEX IF NOT EXISTS idx_analysis_reports_stock_date_type ON analysis_reports(stock_code, analysis_date, report_type)"
         )
-        logger.info("analysis_reports表创建完成")
         
         # 创建strategy_performance表
-        logger.info("开始创建strategy_performance表...")
-        db_manager.create_table(
+        ddl_statements.append(db_manager.build_create_table_sql(
             'strategy_performance',
             {
                 'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
@@ -166,12 +144,32 @@ def create_tables(db_path: str = 'stock_data.db'):
                 'trades_count': 'INTEGER',
                 'created_at': 'TEXT DEFAULT CURRENT_TIMESTAMP'
             }
-        )
+        ))
         # 添加唯一约束
-        db_manager.execute_update(
+        ddl_statements.append(
             "CREATE UNIQUE INDEX IF NOT EXISTS idx_strategy_performance_name_date ON strategy_performance(strategy_name, start_date, end_date)"
         )
-        logger.info("strategy_performance表创建完成")
+        
+        # 执行建表脚本：WAL模式和synchronous=NORMAL减少后续写入的磁盘同步开销
+        script = 'PRAGMA journal_mode=WAL;\nPRAGMA synchronous=NORMAL;\nBEGIN;\n'
+        script += ';\n'.join(ddl_statements) + ';\nCOMMIT;'
+        db_manager.execute_script(script)
+        
+        # 旧版analysis_results表中各信号为单独的列，补充signals_json列并迁移已有数据
+        result_columns = {row['name'] for row in db_manager.fetch_all("PRAGMA table_info(analysis_results)")}
+        if 'signals_json' not in result_columns:
+            db_manager.execute_script(
+                "BEGIN;\n"
+                "ALTER TABLE analysis_results ADD COLUMN signals_json TEXT;\n"
+                "UPDATE analysis_results SET signals_json = json_object("
+                "'macd', macd_signal, 'rsi', rsi_signal, 'kdj', kdj_signal, "
+                "'bollinger', boll_signal, 'ma', ma_signal);\n"
+                "COMMIT;"
+            )
+            logger.info("已将analysis_results表的信号列迁移到signals_json列")
+        
+        # 更新统计信息，使查询优化器按数据分布选择新建的索引
+        db_manager.analyze()
         
         logger.info("所有表创建完成")
     except Exception as e:
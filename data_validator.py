@@ -1,6 +1,11 @@
-import pandas as pd
 import datetime
+import functools
+from collections import Counter, namedtuple
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
 from log_utils import setup_logger, get_logger
+from numeric_kernels import scan_numeric_block
 
 # 配置日志
 log_config = {
@@ -14,6 +19,132 @@ log_config = {
 setup_logger(log_config)
 logger = get_logger('data_validator')
 
+# 校验计划：按DataFrame的列结构预先计算好的各项检查涉及的字段
+SchemaPlan = namedtuple('SchemaPlan', [
+    'missing_required',   # 缺少的必填字段
+    'numeric_fields',     # 存在的数值字段
+    'date_fields',        # 存在的日期字段
+    'negative_fields',    # 需要检查负值的数值字段
+    'positive_fields',    # 需要检查为正数的字段（成交量、成交额）
+    'other_columns',      # 数值字段和日期字段以外的列
+    'numeric_blocks'      # 数值字段按扫描精度划分的NumericBlock列表
+])
+
+# 按相同精度一起扫描的一组数值字段，scan_args为传给scan_numeric_block的列号参数
+NumericBlock = namedtuple('NumericBlock', ['fields', 'dtype', 'scan_args'])
+
+# 格式检查中转换得到的数据：与SchemaPlan.numeric_blocks一一对应的数值矩阵元组（转换失败时为None）、
+# 各日期字段的datetime64[ns]数组，以及数值矩阵的扫描结果
+CoercedData = namedtuple('CoercedData', ['numeric', 'dates', 'scan'])
+
+# 数值矩阵扫描结果，由scan_numeric_block遍历各数值矩阵后合并得到
+ScanResult = namedtuple('ScanResult', [
+    'row_has_nan',        # 每行是否有NaN
+    'nan_counts',         # numeric_fields各列NaN数量
+    'consistency',        # [最高价小于最低价行数, 收盘价越界行数, 开盘价越界行数]
+    'negative_counts',    # negative_fields各列负值数量
+    'nonpositive_counts'  # positive_fields各列非正数数量
+])
+
+# 允许为负数的数值字段
+NEGATIVE_ALLOWED_FIELDS = ('pctChg', 'pcfNcfTTM')
+
+# 数值超出float32整数精确范围（2^24）的字段，保持float64扫描，其余价格和指标字段降为float32扫描
+WIDE_NUMERIC_FIELDS = ('volume', 'amount')
+
+
+def _build_numeric_block(fields, dtype, negative_fields, positive_fields):
+    """
+    构建一组数值字段的扫描参数
+    
+    Args:
+        fields: 该组包含的数值字段
+        dtype: 扫描时使用的数值类型
+        negative_fields: 需要检查负值的数值字段
+        positive_fields: 需要检查为正数的字段
+        
+    Returns:
+        NumericBlock: 数值字段组
+    """
+    index = {field: i for i, field in enumerate(fields)}
+    return NumericBlock(
+        fields=fields,
+        dtype=dtype,
+        scan_args=(
+            index.get('high', -1),
+            index.get('low', -1),
+            index.get('open', -1),
+            index.get('close', -1),
+            np.array([index[field] for field in negative_fields if field in index], dtype=np.int64),
+            np.array([index[field] for field in positive_fields if field in index], dtype=np.int64)
+        )
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def _resolve_schema(columns, required, numeric, date):
+    """
+    根据列集合计算校验计划，相同列结构的DataFrame只计算一次
+    
+    Args:
+        columns: DataFrame列名集合（frozenset）
+        required: 必填字段
+        numeric: 数值字段
+        date: 日期字段
+        
+    Returns:
+        SchemaPlan: 校验计划
+    """
+    numeric_fields = [field for field in numeric if field in columns]
+    negative_fields = [field for field in numeric_fields if field not in NEGATIVE_ALLOWED_FIELDS]
+    positive_fields = [field for field in ('volume', 'amount') if field in numeric_fields]
+    narrow_fields = [field for field in numeric_fields if field not in WIDE_NUMERIC_FIELDS]
+    wide_fields = [field for field in numeric_fields if field in WIDE_NUMERIC_FIELDS]
+    numeric_blocks = [
+        _build_numeric_block(fields, dtype, negative_fields, positive_fields)
+        for fields, dtype in ((narrow_fields, np.float32), (wide_fields, np.float64))
+        if fields
+    ]
+    return SchemaPlan(
+        missing_required=[field for field in required if field not in columns],
+        numeric_fields=numeric_fields,
+        date_fields=[field for field in date if field in columns],
+        negative_fields=negative_fields,
+        positive_fields=positive_fields,
+        other_columns=[col for col in columns if col not in numeric_fields and col not in date],
+        numeric_blocks=numeric_blocks
+    )
+
+
+def _merge_scans(plan, block_scans, n_rows):
+    """
+    合并各数值字段组的扫描结果，计数按SchemaPlan中的字段顺序排列
+    
+    Args:
+        plan: 校验计划
+        block_scans: 与plan.numeric_blocks一一对应的scan_numeric_block返回值列表
+        n_rows: 行数
+        
+    Returns:
+        ScanResult: 合并后的扫描结果
+    """
+    row_has_nan = np.zeros(n_rows, dtype=bool)
+    consistency = np.zeros(3, dtype=np.int64)
+    nan_counts, negative_counts, nonpositive_counts = {}, {}, {}
+    for block, (block_nan_rows, block_nan, block_consistency, block_negative, block_nonpositive) in zip(plan.numeric_blocks, block_scans):
+        row_has_nan |= block_nan_rows
+        consistency += block_consistency
+        nan_counts.update(zip(block.fields, block_nan))
+        negative_counts.update(zip([block.fields[i] for i in block.scan_args[4]], block_negative))
+        nonpositive_counts.update(zip([block.fields[i] for i in block.scan_args[5]], block_nonpositive))
+    return ScanResult(
+        row_has_nan=row_has_nan,
+        nan_counts=[nan_counts[field] for field in plan.numeric_fields],
+        consistency=consistency,
+        negative_counts=[negative_counts[field] for field in plan.negative_fields],
+        nonpositive_counts=[nonpositive_counts[field] for field in plan.positive_fields]
+    )
+
 
 class DataValidator:
     """
@@ -25,25 +156,25 @@ class DataValidator:
         初始化数据校验器
         """
         # 定义必填字段
-        self.required_fields = [
+        self.required_fields = (
             'date', 'code', 'open', 'high', 'low', 'close', 
             'preclose', 'volume', 'amount', 'adjustflag', 
             'turn', 'tradestatus', 'pctChg', 'peTTM', 
             'pbMRQ', 'psTTM', 'pcfNcfTTM', 'isST'
-        ]
+        )
         
         # 定义数值字段
-        self.numeric_fields = [
+        self.numeric_fields = (
             'open', 'high', 'low', 'close', 'preclose', 
             'volume', 'amount', 'turn', 'pctChg', 
             'peTTM', 'pbMRQ', 'psTTM', 'pcfNcfTTM'
-        ]
+        )
         
         # 定义日期字段
-        self.date_fields = ['date', 'ipoDate', 'outDate']
+        self.date_fields = ('date', 'ipoDate', 'outDate')
         
         # 定义布尔字段
-        self.boolean_fields = ['isST']
+        self.boolean_fields = ('isST',)
     
     def validate_dataframe(self, df, stock_code=None):
         """
@@ -71,38 +202,23 @@ class DataValidator:
                 'stock_code': stock_code
             }
         
-        # 2. 检查必填字段是否完整
-        missing_fields = [field for field in self.required_fields if field not in df.columns]
-        if missing_fields:
-            errors.append(f'缺少必填字段: {missing_fields}')
-            is_valid = False
+        # 按列结构获取校验计划，各项检查直接使用其中的字段列表
+        plan = self._get_schema_plan(df)
         
-        # 3. 检查数据格式
-        format_errors = self._check_data_format(df)
-        if format_errors:
-            errors.extend(format_errors)
-            is_valid = False
-        
-        # 4. 检查数据完整性
-        completeness_errors = self._check_data_completeness(df)
-        if completeness_errors:
-            errors.extend(completeness_errors)
-            is_valid = False
-        
-        # 5. 检查数据一致性
-        consistency_errors = self._check_data_consistency(df)
-        if consistency_errors:
-            errors.extend(consistency_errors)
+        # 2. 检查必填字段是否完整
+        if plan.missing_required:
+            errors.append(f'缺少必填字段: {plan.missing_required}')
             is_valid = False
         
-        # 6. 检查数据有效性
-        validity_errors = self._check_data_validity(df)
-        if validity_errors:
-            errors.extend(validity_errors)
-            is_valid = False
+        # 3-6. 检查数据格式、完整性、一致性和有效性，数值列只转换一次，所有检查共用转换结果
+        check_results, coerced = self._check_all(df, plan)
+        for check_errors in check_results.values():
+            if check_errors:
+                errors.extend(check_errors)
+                is_valid = False
         
-        # 7. 检查时间连续性
-        continuity_errors = self._check_time_continuity(df)
+        # 7. 检查时间连续性，日期列已在格式检查中转换，直接复用
+        continuity_errors = self._check_time_continuity(df, coerced.dates.get('date'))
         if continuity_errors:
             errors.extend(continuity_errors)
             is_valid = False
@@ -119,164 +235,236 @@ class DataValidator:
             'valid_records': len(df) if is_valid else 0
         }
     
-    def _check_data_format(self, df):
+    def _get_schema_plan(self, df):
+        """
+        获取DataFrame对应的校验计划
+        
+        Args:
+            df: 要检查的DataFrame
+            
+        Returns:
+            SchemaPlan: 校验计划
+        """
+        return _resolve_schema(frozenset(df.columns), self.required_fields, self.numeric_fields, self.date_fields)
+    
+    def _check_all(self, df, plan):
+        """
+        一次遍历完成数据格式、完整性、一致性和有效性检查
+        
+        数值字段转换后按精度取出为float32价格/指标矩阵和float64成交量/成交额矩阵，由scan_numeric_block
+        各遍历一次完成NaN统计、缺失行统计、价格一致性和负值检查，不再对每项检查分别读取DataFrame的列；
+        转换结果不写回df
+        
+        Args:
+            df: 要检查的DataFrame
+            plan: 校验计划
+            
+        Returns:
+            tuple: (各项检查的错误列表字典, 转换后的数据CoercedData)，
+                   错误字典的键依次为format、completeness、consistency、validity
+        """
+        results = {'format': [], 'completeness': [], 'consistency': [], 'validity': []}
+        results['format'], coerced = self._coerce_data(df, plan)
+        
+        # 检查每一行是否有缺失值
+        results['completeness'] = self._completeness_errors(df, plan, coerced)
+        
+        if coerced.scan is not None:
+            results['consistency'] = self._consistency_errors(coerced.scan)
+            results['validity'] = self._validity_errors(coerced.scan, plan)
+        
+        return results, coerced
+    
+    def _coerce_data(self, df, plan):
         """
-        检查数据格式
+        转换数值字段和日期字段并统计无效值，不修改df
         
         Args:
             df: 要检查的DataFrame
+            plan: 校验计划
             
         Returns:
-            list: 格式错误列表
+            tuple: (格式错误列表, 转换后的数据CoercedData)
         """
         errors = []
         
-        # 检查数值字段格式
-        for field in self.numeric_fields:
-            if field in df.columns:
-                try:
-                    # 尝试转换为数值类型
-                    df[field] = pd.to_numeric(df[field], errors='coerce')
-                    # 检查是否有NaN值
-                    nan_count = df[field].isna().sum()
-                    if nan_count > 0:
-                        errors.append(f'字段 {field} 包含 {nan_count} 个无效数值')
-                except Exception as e:
-                    errors.append(f'字段 {field} 格式错误: {str(e)}')
-        
-        # 检查日期字段格式
-        for field in self.date_fields:
-            if field in df.columns:
-                try:
-                    # 尝试转换为日期类型
-                    df[field] = pd.to_datetime(df[field], errors='coerce')
-                    # 检查是否有NaN值
-                    nan_count = df[field].isna().sum()
+        # 一次读取各列类型，只有类型不对的列才需要转换
+        dtypes = df.dtypes
+        
+        # 数值字段一次性转换为数值矩阵，已是数值类型的列跳过pd.to_numeric
+        # 价格和指标只需6-7位有效数字，降为float32扫描以减半内存带宽；成交量和成交额保持float64
+        arrays = None
+        if plan.numeric_fields:
+            try:
+                numeric_df = df[plan.numeric_fields]
+                unconverted = [field for field in plan.numeric_fields if not is_numeric_dtype(dtypes[field])]
+                if unconverted:
+                    numeric_df = numeric_df.copy()
+                    numeric_df[unconverted] = numeric_df[unconverted].apply(pd.to_numeric, errors='coerce')
+                arrays = tuple(
+                    numeric_df[block.fields].to_numpy(dtype=block.dtype)
+                    for block in plan.numeric_blocks
+                )
+            except Exception as e:
+                errors.append(f'数值字段 {plan.numeric_fields} 格式错误: {str(e)}')
+        
+        scan = None
+        if arrays is not None:
+            block_scans = [
+                scan_numeric_block(arr, *block.scan_args)
+                for block, arr in zip(plan.numeric_blocks, arrays)
+            ]
+            scan = _merge_scans(plan, block_scans, len(df))
+            for field, nan_count in zip(plan.numeric_fields, scan.nan_counts):
+                if nan_count > 0:
+                    errors.append(f'字段 {field} 包含 {nan_count} 个无效数值')
+        
+        # 检查日期字段格式，非日期类型的列整块转换，已是日期类型的列跳过pd.to_datetime
+        dates = {}
+        if plan.date_fields:
+            try:
+                date_df = df[plan.date_fields]
+                unconverted = [field for field in plan.date_fields if not is_datetime64_any_dtype(dtypes[field])]
+                if unconverted:
+                    date_df = date_df.copy()
+                    date_df[unconverted] = date_df[unconverted].apply(pd.to_datetime, errors='coerce')
+                dates = {field: date_df[field].to_numpy(dtype='datetime64[ns]') for field in plan.date_fields}
+                for field, values in dates.items():
+                    nan_count = int(np.count_nonzero(np.isnat(values)))
                     if nan_count > 0:
                         errors.append(f'字段 {field} 包含 {nan_count} 个无效日期')
-                except Exception as e:
-                    errors.append(f'字段 {field} 格式错误: {str(e)}')
+            except Exception as e:
+                dates = {}
+                errors.append(f'日期字段 {plan.date_fields} 格式错误: {str(e)}')
         
-        return errors
+        return errors, CoercedData(numeric=arrays, dates=dates, scan=scan)
     
-    def _check_data_completeness(self, df):
+    def _completeness_errors(self, df, plan, coerced):
         """
-        检查数据完整性
+        检查每一行是否有缺失值
+        
+        数值字段直接使用数值矩阵扫描得到的每行NaN标记，日期字段使用转换后的NaT掩码，
+        只有其余的列才走pandas的isna判断
         
         Args:
             df: 要检查的DataFrame
+            plan: 校验计划
+            coerced: 格式检查中转换得到的数据
             
         Returns:
             list: 完整性错误列表
         """
         errors = []
         
-        # 检查每一行是否有缺失值
-        total_rows = len(df)
-        missing_rows = df.isnull().any(axis=1).sum()
+        if coerced.scan is not None:
+            row_has_nan = coerced.scan.row_has_nan.copy()
+        else:
+            row_has_nan = df[plan.numeric_fields].isna().to_numpy().any(axis=1)
+        
+        for field in plan.date_fields:
+            if field in coerced.dates:
+                row_has_nan |= np.isnat(coerced.dates[field])
+            else:
+                row_has_nan |= df[field].isna().to_numpy()
+        
+        if plan.other_columns:
+            row_has_nan |= df[plan.other_columns].isna().to_numpy().any(axis=1)
+        
+        missing_rows = int(np.count_nonzero(row_has_nan))
         if missing_rows > 0:
-            errors.append(f'数据不完整，共 {missing_rows}/{total_rows} 行包含缺失值')
+            errors.append(f'数据不完整，共 {missing_rows}/{len(df)} 行包含缺失值')
         
         return errors
     
-    def _check_data_consistency(self, df):
+    def _consistency_errors(self, scan):
         """
-        检查数据一致性
+        根据数值矩阵扫描结果生成价格一致性错误
         
         Args:
-            df: 要检查的DataFrame
+            scan: 数值矩阵扫描结果
             
         Returns:
             list: 一致性错误列表
         """
         errors = []
+        high_low_count, close_count, open_count = scan.consistency
         
         # 检查最高价是否大于等于最低价
-        if 'high' in df.columns and 'low' in df.columns:
-            inconsistent_rows = df[df['high'] < df['low']]
-            if len(inconsistent_rows) > 0:
-                errors.append(f'最高价小于最低价，共 {len(inconsistent_rows)} 行')
+        if high_low_count > 0:
+            errors.append(f'最高价小于最低价，共 {high_low_count} 行')
         
         # 检查收盘价是否在最高价和最低价之间
-        if 'open' in df.columns and 'high' in df.columns and 'low' in df.columns and 'close' in df.columns:
-            inconsistent_rows = df[(df['close'] > df['high']) | (df['close'] < df['low'])]
-            if len(inconsistent_rows) > 0:
-                errors.append(f'收盘价不在最高价和最低价之间，共 {len(inconsistent_rows)} 行')
+        if close_count > 0:
+            errors.append(f'收盘价不在最高价和最低价之间，共 {close_count} 行')
         
         # 检查开盘价是否在最高价和最低价之间
-        if 'open' in df.columns and 'high' in df.columns and 'low' in df.columns:
-            inconsistent_rows = df[(df['open'] > df['high']) | (df['open'] < df['low'])]
-            if len(inconsistent_rows) > 0:
-                errors.append(f'开盘价不在最高价和最低价之间，共 {len(inconsistent_rows)} 行')
+        if open_count > 0:
+            errors.append(f'开盘价不在最高价和最低价之间，共 {open_count} 行')
         
         return errors
     
-    def _check_data_validity(self, df):
+    def _validity_errors(self, scan, plan):
         """
-        检查数据有效性
+        根据数值矩阵扫描结果生成数值有效性错误
         
         Args:
-            df: 要检查的DataFrame
+            scan: 数值矩阵扫描结果
+            plan: 校验计划
             
         Returns:
             list: 有效性错误列表
         """
         errors = []
         
-        # 检查数值字段是否为正数
-        for field in self.numeric_fields:
-            if field in df.columns:
-                negative_rows = df[df[field] < 0]
-                if len(negative_rows) > 0:
-                    # 有些字段可以为负数，如pctChg和pcfNcfTTM
-                    if field not in ['pctChg', 'pcfNcfTTM']:
-                        errors.append(f'字段 {field} 包含 {len(negative_rows)} 个负值')
-        
-        # 检查成交量是否为正数
-        if 'volume' in df.columns:
-            zero_volume_rows = df[df['volume'] <= 0]
-            if len(zero_volume_rows) > 0:
-                errors.append(f'成交量为零或负数，共 {len(zero_volume_rows)} 行')
-        
-        # 检查成交额是否为正数
-        if 'amount' in df.columns:
-            zero_amount_rows = df[df['amount'] <= 0]
-            if len(zero_amount_rows) > 0:
-                errors.append(f'成交额为零或负数，共 {len(zero_amount_rows)} 行')
+        # 检查数值字段是否为正数，有些字段可以为负数，如pctChg和pcfNcfTTM
+        for field, negative_count in zip(plan.negative_fields, scan.negative_counts):
+            if negative_count > 0:
+                errors.append(f'字段 {field} 包含 {negative_count} 个负值')
+        
+        # 检查成交量、成交额是否为正数
+        non_positive_counts = dict(zip(plan.positive_fields, scan.nonpositive_counts))
+        if non_positive_counts.get('volume', 0) > 0:
+            errors.append(f'成交量为零或负数，共 {non_positive_counts["volume"]} 行')
+        if non_positive_counts.get('amount', 0) > 0:
+            errors.append(f'成交额为零或负数，共 {non_positive_counts["amount"]} 行')
         
         return errors
     
-    def _check_time_continuity(self, df):
+    def _check_time_continuity(self, df, dates=None):
         """
         检查时间连续性
         
         Args:
             df: 要检查的DataFrame
+            dates: 已转换为日期类型的日期列或datetime64数组，默认为None（从df中读取并转换）
             
         Returns:
             list: 时间连续性错误列表
         """
         errors = []
         
-        if 'date' not in df.columns:
-            return errors
+        if dates is None:
+            if 'date' not in df.columns:
+                return errors
+            dates = df['date']
         
         try:
-            # 转换日期格式
-            df['date'] = pd.to_datetime(df['date'])
-            
-            # 按日期排序
-            df_sorted = df.sort_values('date')
-            
-            # 计算日期差
-            date_diff = df_sorted['date'].diff()
+            # 转换日期格式，已是日期类型时不再重复解析
+            if not is_datetime64_any_dtype(dates):
+                dates = pd.to_datetime(dates)
             
             # 检查是否有连续的日期
             # 注意：股票市场周末和节假日不交易，所以不能简单检查日期差是否为1天
-            # 这里只检查是否有重复日期
-            duplicate_dates = df_sorted[df_sorted.duplicated('date', keep=False)]
-            if len(duplicate_dates) > 0:
-                errors.append(f'存在重复日期，共 {len(duplicate_dates)} 行')
+            # 这里只检查是否有重复日期：对日期数组排序后比较相邻元素，无需排序DataFrame
+            # 按int64比较，使NaT之间也视为相同日期，与pandas的duplicated一致
+            values = np.sort(np.asarray(dates, dtype='datetime64[ns]').view(np.int64))
+            same_as_next = values[1:] == values[:-1]
+            is_duplicate = np.zeros(len(values), dtype=bool)
+            is_duplicate[1:] |= same_as_next
+            is_duplicate[:-1] |= same_as_next
+            duplicate_rows = int(np.count_nonzero(is_duplicate))
+            if duplicate_rows > 0:
+                errors.append(f'存在重复日期，共 {duplicate_rows} 行')
         except Exception as e:
             errors.append(f'检查时间连续性时发生错误: {str(e)}')
         
@@ -293,16 +481,15 @@ class DataValidator:
             dict: 校验报告
         """
         total_stocks = len(validation_results)
-        valid_stocks = sum(1 for result in validation_results if result['is_valid'])
-        invalid_stocks = total_stocks - valid_stocks
         
-        # 统计错误类型
-        error_types = {}
+        # 一次遍历同时统计有效股票数和各错误类型的出现次数
+        valid_stocks = 0
+        error_counter = Counter()
         for result in validation_results:
-            for error in result['errors']:
-                if error not in error_types:
-                    error_types[error] = 0
-                error_types[error] += 1
+            valid_stocks += bool(result['is_valid'])
+            error_counter.update(result['errors'])
+        invalid_stocks = total_stocks - valid_stocks
+        error_types = dict(error_counter)
         
         # 生成报告
         report = {
@@ -341,27 +528,29 @@ class DataValidator:
         
         logger.debug(f'开始清理数据，共 {len(df)} 条记录')
         
-        # 1. 移除重复行
-        df = df.drop_duplicates()
+        # 1. 移除重复行：同一股票同一日期只保留最后一条，只对键列做哈希；缺少键列时按整行去重
+        key_columns = [col for col in ('date', 'code') if col in df.columns]
+        if 'date' in key_columns:
+            df = df.drop_duplicates(subset=key_columns, keep='last')
+        else:
+            df = df.drop_duplicates()
         
         # 2. 移除缺失值过多的行
         df = df.dropna(thresh=len(self.required_fields) * 0.8)  # 至少80%的必填字段有值
         
-        # 3. 填充缺失值
-        for field in self.numeric_fields:
-            if field in df.columns:
-                # 用前一天的值填充
-                df[field] = df[field].fillna(method='ffill')
-                df[field] = df[field].fillna(method='bfill')
+        plan = self._get_schema_plan(df)
+        numeric_fields, date_fields = plan.numeric_fields, plan.date_fields
+        
+        # 3. 填充缺失值：所有数值字段整块用前一天的值填充，开头的缺失值用后一天的值填充
+        if numeric_fields:
+            df[numeric_fields] = df[numeric_fields].ffill().bfill()
         
         # 4. 转换数据类型
-        for field in self.numeric_fields:
-            if field in df.columns:
-                df[field] = pd.to_numeric(df[field], errors='coerce')
+        if numeric_fields:
+            df[numeric_fields] = df[numeric_fields].apply(pd.to_numeric, errors='coerce')
         
-        for field in self.date_fields:
-            if field in df.columns:
-                df[field] = pd.to_datetime(df[field], errors='coerce')
+        if date_fields:
+            df[date_fields] = df[date_fields].apply(pd.to_datetime, errors='coerce')
         
         logger.debug(f'数据清理完成，剩余 {len(df)} 条记录')
         
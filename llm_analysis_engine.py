@@ -1,7 +1,20 @@
+import io
 import os
+import re
 import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from log_utils import setup_logger, get_logger
 
+# 尝试导入orjson，用于快速序列化分析输入，未安装时退化为标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # 配置日志
 log_config = {
     "log_level": "INFO",
@@ -14,6 +27,44 @@ log_config = {
 setup_logger(log_config)
 logger = get_logger('llm_analysis_engine')
 
+# 评级和风险等级关键词，一次扫描找出响应中出现的全部关键词
+# 风险关键词之间可能重叠（如"高风险低"），用前瞻匹配保证重叠的关键词都能找到
+RATING_PATTERN = re.compile(r'买入|卖出')
+RISK_PATTERN = re.compile(r'(?=(风险低|低风险|风险高|高风险))')
+
+# 股票分析prompt模板，模块加载时定义一次，各次分析直接填充
+ANALYSIS_PROMPT_TEMPLATE = """你是一名专业的股票分析师，请基于以下股票数据和技术指标，对股票 {stock_code} 进行全面分析，并给出明确的投资建议。
+
+## 股票基本数据
+{stock_data_str}
+
+## 技术指标
+{technical_indicators_str}
+
+## 分析要求
+1. 请从技术面、基本面（如果有数据）等多个维度进行分析
+2. 分析要深入、全面，有数据支撑
+3. 给出明确的投资建议，包括买入、持有或卖出
+4. 给出风险等级评估（低、中、高）
+5. 给出预期收益率（年化）
+6. 分析过程要清晰，逻辑要严谨
+7. 回答要简洁明了，避免冗长
+
+## 输出格式
+请按照以下格式输出：
+
+### 分析结果
+[详细的分析内容]
+
+### 投资建议
+- 评级：[买入/持有/卖出]
+- 风险等级：[低/中/高]
+- 预期收益率：[年化百分比，如15%]
+
+### 风险提示
+[主要风险因素]
+"""
+
 
 class LLMAnalysisEngine:
     """
@@ -65,7 +116,10 @@ class LLMAnalysisEngine:
                 }
             },
             "temperature": 0.1,
-            "max_tokens": 1000
+            "max_tokens": 1000,
+            "cache_ttl": 300,
+            "cache_max_size": 1024,
+            "max_concurrent": 16
         }
         
         # 合并配置
@@ -77,6 +131,26 @@ class LLMAnalysisEngine:
         else:
             self.config = self.default_config
         
+        # 提供商到调用方法的映射，分析时直接查表
+        self._provider_dispatch = {
+            'baidu': self._call_baidu_ernie,
+            'alibaba': self._call_alibaba_qwen,
+            'tencent': self._call_tencent_hunyuan,
+            'bytedance': self._call_bytedance_doubao,
+            'huawei': self._call_huawei_pangu,
+            'zhipu': self._call_zhipu_glm,
+            'sensecore': self._call_sensecore_risen,
+            'openai': self._call_openai_gpt,
+            'anthropic': self._call_anthropic_claude
+        }
+        
+        # 分析结果缓存：输入相同且未过期时直接返回，避免重复调用大模型API；
+        # 按写入顺序保存，超过cache_max_size条时淘汰最早写入的结果，批量分析时由多个线程共用，读写加锁
+        self._result_cache = OrderedDict()
+        self._cache_ttl = self.config.get('cache_ttl', 300)
+        self._cache_max_size = self.config.get('cache_max_size', 1024)
+        self._cache_lock = threading.Lock()
+        
         self.logger = logger
         self.logger.info(f"大模型分析引擎已初始化，当前提供商: {self.config['provider']}")
     
@@ -93,32 +167,29 @@ class LLMAnalysisEngine:
             大模型分析结果
         """
         try:
+            provider = self.config['provider']
+            
+            # 相同输入在缓存有效期内直接返回缓存结果
+            cache_key = self._build_cache_key(provider, stock_code, stock_data, technical_indicators)
+            with self._cache_lock:
+                cached = self._result_cache.get(cache_key)
+                # 已过期的结果直接删除
+                if cached is not None and time.time() - cached[0] >= self._cache_ttl:
+                    del self._result_cache[cache_key]
+                    cached = None
+            if cached is not None:
+                self.logger.info(f"股票 {stock_code} 的分析结果命中缓存")
+                return dict(cached[1])
+            
             # 构建分析prompt
             prompt = self._build_analysis_prompt(stock_code, stock_data, technical_indicators)
             
             # 根据提供商选择不同的大模型
-            provider = self.config['provider']
-            
-            if provider == 'baidu':
-                result = self._call_baidu_ernie(prompt)
-            elif provider == 'alibaba':
-                result = self._call_alibaba_qwen(prompt)
-            elif provider == 'tencent':
-                result = self._call_tencent_hunyuan(prompt)
-            elif provider == 'bytedance':
-                result = self._call_bytedance_doubao(prompt)
-            elif provider == 'huawei':
-                result = self._call_huawei_pangu(prompt)
-            elif provider == 'zhipu':
-                result = self._call_zhipu_glm(prompt)
-            elif provider == 'sensecore':
-                result = self._call_sensecore_risen(prompt)
-            elif provider == 'openai':
-                result = self._call_openai_gpt(prompt)
-            elif provider == 'anthropic':
-                result = self._call_anthropic_claude(prompt)
-            else:
+            try:
+                call_provider = self._provider_dispatch[provider]
+            except KeyError:
                 raise ValueError(f"不支持的大模型提供商: {provider}")
+            result = call_provider(prompt)
             
             # 解析大模型响应
             analysis_result = self._parse_llm_response(result)
@@ -127,12 +198,73 @@ class LLMAnalysisEngine:
             analysis_result['llm_provider'] = provider
             analysis_result['llm_model'] = self.config['model_name']
             
+            # 只缓存成功的分析结果
+            if self._cache_ttl > 0 and self._cache_max_size > 0:
+                with self._cache_lock:
+                    self._result_cache[cache_key] = (time.time(), dict(analysis_result))
+                    self._result_cache.move_to_end(cache_key)
+                    while len(self._result_cache) > self._cache_max_size:
+                        self._result_cache.popitem(last=False)
+            
             self.logger.info(f"成功使用 {provider} {self.config['model_name']} 分析股票 {stock_code}")
             return analysis_result
         except Exception as e:
             self.logger.error(f"使用大模型分析股票 {stock_code} 失败: {str(e)}")
             raise
     
+    def analyze_batch(self, stocks: list) -> list:
+        """
+        并发批量分析多只股票
+        
+        大模型API调用以网络等待为主，使用线程池并发发起请求，并发数不超过配置的max_concurrent
+        
+        Args:
+            stocks: 待分析股票列表，每项为(stock_code, stock_data)或(stock_code, stock_data, technical_indicators)
+            
+        Returns:
+            与stocks顺序一致的分析结果列表，分析失败的股票对应位置为捕获到的异常
+        """
+        if not stocks:
+            return []
+        
+        max_workers = max(1, min(self.config.get('max_concurrent', 16), len(stocks)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.analyze_stock, *stock) for stock in stocks]
+        
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        
+        self.logger.info(f"批量分析完成，共 {len(stocks)} 只股票，失败 {sum(isinstance(r, Exception) for r in results)} 只")
+        return results
+    
+    def _build_cache_key(self, provider: str, stock_code: str, stock_data: dict, technical_indicators: dict = None) -> str:
+        """
+        根据提供商、模型和分析输入生成缓存键
+        
+        Args:
+            provider: 大模型提供商
+            stock_code: 股票代码
+            stock_data: 股票数据字典
+            technical_indicators: 技术指标字典
+            
+        Returns:
+            缓存键
+        """
+        key_data = (provider, self.config['model_name'], stock_code, stock_data, technical_indicators)
+        if orjson is not None:
+            payload = orjson.dumps(
+                key_data,
+                option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+                default=str
+            )
+        else:
+            payload = json.dumps(key_data, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
     def _build_analysis_prompt(self, stock_code: str, stock_data: dict, technical_indicators: dict = None) -> str:
         """
         构建分析prompt
@@ -145,57 +277,42 @@ class LLMAnalysisEngine:
         Returns:
             构建好的prompt
         """
-        # 基础prompt模板
-        prompt_template = """你是一名专业的股票分析师，请基于以下股票数据和技术指标，对股票 {stock_code} 进行全面分析，并给出明确的投资建议。
-
-## 股票基本数据
-{stock_data_str}
-
-## 技术指标
-{technical_indicators_str}
-
-## 分析要求
-1. 请从技术面、基本面（如果有数据）等多个维度进行分析
-2. 分析要深入、全面，有数据支撑
-3. 给出明确的投资建议，包括买入、持有或卖出
-4. 给出风险等级评估（低、中、高）
-5. 给出预期收益率（年化）
-6. 分析过程要清晰，逻辑要严谨
-7. 回答要简洁明了，避免冗长
-
-## 输出格式
-请按照以下格式输出：
-
-### 分析结果
-[详细的分析内容]
-
-### 投资建议
-- 评级：[买入/持有/卖出]
-- 风险等级：[低/中/高]
-- 预期收益率：[年化百分比，如15%]
-
-### 风险提示
-[主要风险因素]
-"""
-        
         # 格式化股票数据
-        stock_data_str = "\n".join([f"- {key}: {value}" for key, value in stock_data.items()])
+        stock_data_str = self._format_fields(stock_data)
         
         # 格式化技术指标
         if technical_indicators:
-            technical_indicators_str = "\n".join([f"- {key}: {value}" for key, value in technical_indicators.items()])
+            technical_indicators_str = self._format_fields(technical_indicators)
         else:
             technical_indicators_str = "无"
         
         # 填充模板
-        prompt = prompt_template.format(
-            stock_code=stock_code,
-            stock_data_str=stock_data_str,
-            technical_indicators_str=technical_indicators_str
-        )
+        prompt = ANALYSIS_PROMPT_TEMPLATE.format_map({
+            'stock_code': stock_code,
+            'stock_data_str': stock_data_str,
+            'technical_indicators_str': technical_indicators_str
+        })
         
         return prompt
     
+    @staticmethod
+    def _format_fields(fields: dict) -> str:
+        """
+        将字段字典格式化为"- 键: 值"形式的多行文本
+        
+        Args:
+            fields: 字段字典
+            
+        Returns:
+            格式化后的文本
+        """
+        buffer = io.StringIO()
+        for i, (key, value) in enumerate(fields.items()):
+            if i:
+                buffer.write("\n")
+            buffer.write(f"- {key}: {value}")
+        return buffer.getvalue()
+    
     def _parse_llm_response(self, response: str) -> dict:
         """
         解析大模型响应
@@ -215,15 +332,17 @@ class LLMAnalysisEngine:
             "expected_return": 0.1
         }
         
-        # 简单解析示例
-        if "买入" in response:
+        # 简单解析示例：买入优先于卖出，低风险优先于高风险
+        ratings = set(RATING_PATTERN.findall(response))
+        if "买入" in ratings:
             result["rating"] = "buy"
-        elif "卖出" in response:
+        elif "卖出" in ratings:
             result["rating"] = "sell"
         
-        if "风险低" in response or "低风险" in response:
+        risks = set(RISK_PATTERN.findall(response))
+        if "风险低" in risks or "低风险" in risks:
             result["risk_level"] = "low"
-        elif "风险高" in response or "高风险" in response:
+        elif "风险高" in risks or "高风险" in risks:
             result["risk_level"] = "high"
         
         return result
@@ -473,9 +592,7 @@ class LLMAnalysisEngine:
         Args:
             provider: 大模型提供商名称
         """
-        supported_providers = ['baidu', 'alibaba', 'tencent', 'bytedance', 'huawei', 'zhipu', 'sensecore', 'openai', 'anthropic']
-        
-        if provider not in supported_providers:
+        if provider not in self._provider_dispatch:
             raise ValueError(f"不支持的大模型提供商: {provider}")
         
         self.config['provider'] = provider
@@ -542,6 +659,9 @@ if __name__ == '__main__':
         # 使用大模型分析股票
         result = llm_engine.analyze_stock("sh.600000", stock_data, technical_indicators)
         print("大模型分析结果:")
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+        if orjson is not None:
+            print(orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8'))
+        else:
+            print(json.dumps(result, indent=2, ensure_ascii=False))
     except Exception as e:
         print(f"分析失败: {str(e)}")
\ No newline at end of file
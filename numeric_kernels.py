@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数值计算内核模块
+提供数据获取与校验热点路径上的数值计算函数，安装numba时使用JIT编译的内核，
+未安装时退化为等价的numpy实现
+"""
+
+import numpy as np
+
+# 尝试导入numba，用于JIT编译数值内核
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _compute_preclose_numpy(open_, close):
+    """
+    计算前收盘价（numpy实现）
+
+    Args:
+        open_: 开盘价数组（float64）
+        close: 收盘价数组（float64）
+
+    Returns:
+        np.ndarray: 前收盘价数组，为前一日收盘价，缺失时用当日开盘价填充
+    """
+    preclose = np.empty_like(close)
+    if len(close) == 0:
+        return preclose
+    preclose[0] = np.nan
+    preclose[1:] = close[:-1]
+    return np.where(np.isnan(preclose), open_, preclose)
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _compute_preclose_jit(open_, close):
+        """
+        计算前收盘价（numba实现），单次遍历完成移位和缺失值填充
+        """
+        n = close.shape[0]
+        preclose = np.empty(n, dtype=np.float64)
+        for i in range(n):
+            prev = close[i - 1] if i > 0 else np.nan
+            preclose[i] = open_[i] if np.isnan(prev) else prev
+        return preclose
+
+    compute_preclose = _compute_preclose_jit
+else:
+    compute_preclose = _compute_preclose_numpy
+
+
+def _scan_numeric_block_numpy(arr, high_i, low_i, open_i, close_i, negative_cols, positive_cols):
+    """
+    扫描数值矩阵，统计数据校验所需的各项计数（numpy实现）
+
+    Args:
+        arr: 数值字段矩阵（float32或float64，形状为(行数, 列数)）
+        high_i: 最高价所在列号，不存在时为-1
+        low_i: 最低价所在列号，不存在时为-1
+        open_i: 开盘价所在列号，不存在时为-1
+        close_i: 收盘价所在列号，不存在时为-1
+        negative_cols: 不允许为负数的列号数组（int64）
+        positive_cols: 必须为正数的列号数组（int64）
+
+    Returns:
+        tuple: (每行是否有NaN, 每列NaN数量, [最高价小于最低价行数, 收盘价越界行数, 开盘价越界行数],
+                negative_cols各列负值数量, positive_cols各列非正数数量)
+    """
+    nan_mask = np.isnan(arr)
+    consistency = np.zeros(3, dtype=np.int64)
+    if high_i >= 0 and low_i >= 0:
+        high, low = arr[:, high_i], arr[:, low_i]
+        consistency[0] = np.count_nonzero(high < low)
+        if open_i >= 0:
+            if close_i >= 0:
+                close = arr[:, close_i]
+                consistency[1] = np.count_nonzero((close > high) | (close < low))
+            open_ = arr[:, open_i]
+            consistency[2] = np.count_nonzero((open_ > high) | (open_ < low))
+    return (
+        nan_mask.any(axis=1),
+        np.count_nonzero(nan_mask, axis=0).astype(np.int64),
+        consistency,
+        np.count_nonzero(arr[:, negative_cols] < 0, axis=0).astype(np.int64),
+        np.count_nonzero(arr[:, positive_cols] <= 0, axis=0).astype(np.int64)
+    )
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _scan_numeric_block_jit(arr, high_i, low_i, open_i, close_i, negative_cols, positive_cols):
+        """
+        扫描数值矩阵，统计数据校验所需的各项计数（numba实现），单次逐行遍历完成全部统计，
+        不产生中间布尔矩阵
+        """
+        n, k = arr.shape
+        row_has_nan = np.zeros(n, dtype=np.bool_)
+        nan_counts = np.zeros(k, dtype=np.int64)
+        consistency = np.zeros(3, dtype=np.int64)
+        negative_counts = np.zeros(negative_cols.shape[0], dtype=np.int64)
+        nonpositive_counts = np.zeros(positive_cols.shape[0], dtype=np.int64)
+        check_high_low = high_i >= 0 and low_i >= 0
+        for i in range(n):
+            for j in range(k):
+                if np.isnan(arr[i, j]):
+                    nan_counts[j] += 1
+                    row_has_nan[i] = True
+            if check_high_low:
+                high = arr[i, high_i]
+                low = arr[i, low_i]
+                if high < low:
+                    consistency[0] += 1
+                if open_i >= 0:
+                    if close_i >= 0:
+                        close = arr[i, close_i]
+                        if close > high or close < low:
+                            consistency[1] += 1
+                    open_ = arr[i, open_i]
+                    if open_ > high or open_ < low:
+                        consistency[2] += 1
+            for m in range(negative_cols.shape[0]):
+                if arr[i, negative_cols[m]] < 0:
+                    negative_counts[m] += 1
+            for m in range(positive_cols.shape[0]):
+                if arr[i, positive_cols[m]] <= 0:
+                    nonpositive_counts[m] += 1
+        return row_has_nan, nan_counts, consistency, negative_counts, nonpositive_counts
+
+    scan_numeric_block = _scan_numeric_block_jit
+else:
+    scan_numeric_block = _scan_numeric_block_numpy
+
+
+def _ewm_mean_numpy(values, alpha):
+    """
+    计算指数加权移动平均（numpy实现），与pandas的ewm(adjust=False).mean()一致，
+    缺失值按ignore_na=False处理：缺失值不输出新值，但之前的权重照常衰减
+
+    Args:
+        values: 输入数组（float64）
+        alpha: 平滑系数
+
+    Returns:
+        np.ndarray: 指数加权移动平均数组
+    """
+    n = values.shape[0]
+    output = np.empty(n, dtype=np.float64)
+    if n == 0:
+        return output
+    old_wt_factor = 1.0 - alpha
+    weighted = values[0]
+    old_wt = 1.0
+    output[0] = weighted
+    for i in range(1, n):
+        cur = values[i]
+        if weighted == weighted:
+            old_wt *= old_wt_factor
+            if cur == cur:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif cur == cur:
+            weighted = cur
+        output[i] = weighted
+    return output
+
+
+def _rolling_numpy(values, period, func):
+    """
+    计算滚动窗口统计值（numpy实现），窗口内有缺失值或数据不足一个窗口时为NaN
+
+    Args:
+        values: 输入数组（float64）
+        period: 窗口大小
+        func: 窗口统计函数，如np.mean、np.max
+
+    Returns:
+        np.ndarray: 滚动统计结果
+    """
+    output = np.full(values.shape[0], np.nan)
+    if 0 < period <= values.shape[0]:
+        output[period - 1:] = func(np.lib.stride_tricks.sliding_window_view(values, period), axis=1)
+    return output
+
+
+def _rsi_numpy(close, period):
+    """
+    计算RSI（numpy实现），与technical_indicator_calculator中基于简单移动平均的RSI定义一致
+
+    Args:
+        close: 收盘价数组（float64）
+        period: RSI周期
+
+    Returns:
+        np.ndarray: RSI数组
+    """
+    delta = np.full(close.shape[0], np.nan)
+    delta[1:] = close[1:] - close[:-1]
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = -np.where(delta < 0, delta, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = _rolling_numpy(gain, period, np.mean) / _rolling_numpy(loss, period, np.mean)
+        return 100 - (100 / (1 + rs))
+
+
+def _kdj_numpy(high, low, close, length, signal):
+    """
+    计算KDJ（numpy实现），与technical_indicator_calculator中的KDJ定义一致
+
+    Args:
+        high: 最高价数组（float64）
+        low: 最低价数组（float64）
+        close: 收盘价数组（float64）
+        length: KDJ周期
+        signal: 信号线周期
+
+    Returns:
+        tuple: (K值数组, D值数组, J值数组)
+    """
+    high_n = _rolling_numpy(high, length, np.max)
+    low_n = _rolling_numpy(low, length, np.min)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsv = (close - low_n) / (high_n - low_n) * 100
+    alpha = 1.0 / (1.0 + (signal - 1))
+    k = _ewm_mean_numpy(rsv, alpha)
+    d = _ewm_mean_numpy(k, alpha)
+    return k, d, 3 * k - 2 * d
+
+
+if njit is not None:
+    @njit(cache=True, error_model='numpy')
+    def _ewm_mean_jit(values, alpha):
+        """
+        计算指数加权移动平均（numba实现），与pandas的ewm(adjust=False).mean()一致
+        """
+        n = values.shape[0]
+        output = np.empty(n, dtype=np.float64)
+        if n == 0:
+            return output
+        old_wt_factor = 1.0 - alpha
+        weighted = values[0]
+        old_wt = 1.0
+        output[0] = weighted
+        for i in range(1, n):
+            cur = values[i]
+            if weighted == weighted:
+                old_wt *= old_wt_factor
+                if cur == cur:
+                    if weighted != cur:
+                        weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                    old_wt = 1.0
+            elif cur == cur:
+                weighted = cur
+            output[i] = weighted
+        return output
+
+    @njit(cache=True, error_model='numpy')
+    def _rsi_jit(close, period):
+        """
+        计算RSI（numba实现），逐个窗口累加涨跌幅，窗口全为0时结果与pandas一致
+        """
+        n = close.shape[0]
+        gain = np.zeros(n, dtype=np.float64)
+        loss = np.zeros(n, dtype=np.float64)
+        for i in range(1, n):
+            delta = close[i] - close[i - 1]
+            if delta > 0:
+                gain[i] = delta
+            elif delta < 0:
+                loss[i] = -delta
+        output = np.full(n, np.nan)
+        if period <= 0:
+            return output
+        for i in range(period - 1, n):
+            gain_sum = 0.0
+            loss_sum = 0.0
+            for j in range(i - period + 1, i + 1):
+                gain_sum += gain[j]
+                loss_sum += loss[j]
+            rs = (gain_sum / period) / (loss_sum / period)
+            output[i] = 100 - (100 / (1 + rs))
+        return output
+
+    @njit(cache=True, error_model='numpy')
+    def _kdj_jit(high, low, close, length, signal):
+        """
+        计算KDJ（numba实现），单次遍历求区间最高/最低价和RSV，再做两次指数加权平均
+        """
+        n = close.shape[0]
+        rsv = np.full(n, np.nan)
+        if length > 0:
+            for i in range(length - 1, n):
+                high_n = -np.inf
+                low_n = np.inf
+                has_nan = False
+                for j in range(i - length + 1, i + 1):
+                    if np.isnan(high[j]) or np.isnan(low[j]):
+                        has_nan = True
+                        break
+                    high_n = max(high_n, high[j])
+                    low_n = min(low_n, low[j])
+                if not has_nan:
+                    rsv[i] = (close[i] - low_n) / (high_n - low_n) * 100
+        alpha = 1.0 / (1.0 + (signal - 1))
+        k = _ewm_mean_jit(rsv, alpha)
+        d = _ewm_mean_jit(k, alpha)
+        return k, d, 3 * k - 2 * d
+
+    ewm_mean = _ewm_mean_jit
+    rolling_rsi = _rsi_jit
+    kdj = _kdj_jit
+else:
+    ewm_mean = _ewm_mean_numpy
+    rolling_rsi = _rsi_numpy
+    kdj = _kdj_numpy
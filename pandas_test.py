@@ -5,6 +5,7 @@
 测试pandas数据写入数据库功能的简化脚本
 """
 
+import numpy as np
 import pandas as pd
 from sqlite_db_manager import SQLiteDBManager
 
@@ -15,29 +16,30 @@ def test_pandas_db():
     db_manager = SQLiteDBManager('pandas_test.db')
     
     try:
-        # 创建连接
+        # 创建连接，连接时会自动使用适合批量写入的PRAGMA设置
         db_manager.connect()
         
         print("=== 测试1：创建DataFrame并写入数据库 ===")
         # 创建测试数据
+        # 各列直接使用指定类型的数组，pandas无需逐列推断类型
         stock_data = {
-            'code': ['000001', '000002', '000003', '000004', '000005'],
-            'name': ['平安银行', '万科A', '国农科技', '国农科技', '世纪星源'],
-            'date': ['2023-01-01', '2023-01-01', '2023-01-01', '2023-01-01', '2023-01-01'],
-            'open': [12.34, 15.67, 23.45, 34.56, 5.67],
-            'close': [12.56, 16.78, 22.34, 33.45, 5.89],
-            'high': [12.78, 17.89, 24.56, 35.67, 6.01],
-            'low': [12.23, 15.43, 21.23, 32.34, 5.56],
-            'volume': [123456789, 987654321, 111111111, 222222222, 333333333]
+            'code': np.array(['000001', '000002', '000003', '000004', '000005'], dtype='U6'),
+            'name': np.array(['平安银行', '万科A', '国农科技', '国农科技', '世纪星源'], dtype='U4'),
+            'date': np.array(['2023-01-01', '2023-01-01', '2023-01-01', '2023-01-01', '2023-01-01'], dtype='U10'),
+            'open': np.array([12.34, 15.67, 23.45, 34.56, 5.67], dtype='f8'),
+            'close': np.array([12.56, 16.78, 22.34, 33.45, 5.89], dtype='f8'),
+            'high': np.array([12.78, 17.89, 24.56, 35.67, 6.01], dtype='f8'),
+            'low': np.array([12.23, 15.43, 21.23, 32.34, 5.56], dtype='f8'),
+            'volume': np.array([123456789, 987654321, 111111111, 222222222, 333333333], dtype='i8')
         }
         
         # 创建DataFrame
-        df = pd.DataFrame(stock_data)
+        df = pd.DataFrame(stock_data, copy=False)
         print("创建的股票数据DataFrame:")
         print(df)
         
         # 将DataFrame写入数据库，创建新表
-        db_manager.write_dataframe(df, 'stock_data', if_exists='replace')
+        db_manager.write_dataframe(df, 'stock_data', if_exists='replace', method='multi', chunksize=1000)
         print("\n✓ 成功将DataFrame写入数据库表 stock_data")
         
         print("\n=== 测试2：从数据库读取数据到DataFrame ===")
@@ -61,22 +63,22 @@ def test_pandas_db():
         print("\n=== 测试4：追加数据到现有表 ===")
         # 创建新的测试数据
         new_stock_data = {
-            'code': ['000006', '000007'],
-            'name': ['深振业A', '全新好'],
-            'date': ['2023-01-01', '2023-01-01'],
-            'open': [6.78, 8.90],
-            'close': [6.90, 9.01],
-            'high': [7.01, 9.12],
-            'low': [6.67, 8.78],
-            'volume': [444444444, 555555555]
+            'code': np.array(['000006', '000007'], dtype='U6'),
+            'name': np.array(['深振业A', '全新好'], dtype='U4'),
+            'date': np.array(['2023-01-01', '2023-01-01'], dtype='U10'),
+            'open': np.array([6.78, 8.90], dtype='f8'),
+            'close': np.array([6.90, 9.01], dtype='f8'),
+            'high': np.array([7.01, 9.12], dtype='f8'),
+            'low': np.array([6.67, 8.78], dtype='f8'),
+            'volume': np.array([444444444, 555555555], dtype='i8')
         }
         
-        df_new = pd.DataFrame(new_stock_data)
+        df_new = pd.DataFrame(new_stock_data, copy=False)
         print("要追加的新数据:")
         print(df_new)
         
         # 追加数据到现有表
-        db_manager.write_dataframe(df_new, 'stock_data', if_exists='append')
+        db_manager.write_dataframe(df_new, 'stock_data', if_exists='append', method='multi', chunksize=1000)
         
         # 读取追加后的数据
         df_append = db_manager.read_dataframe('stock_data')
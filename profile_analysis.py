@@ -2,7 +2,6 @@ import cProfile
 import pstats
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 from technical_indicator_calculator import TechnicalIndicatorCalculator
 from traditional_analysis_engine import TraditionalAnalysisEngine
 
@@ -18,8 +17,7 @@ def create_test_data(days=100):
         包含测试数据的DataFrame
     """
     # 创建日期序列
-    dates = [datetime.now() - timedelta(days=i) for i in range(days)][::-1]
-    dates = [date.strftime('%Y-%m-%d') for date in dates]
+    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=days, freq='D').strftime('%Y-%m-%d').to_numpy()
     
     # 创建随机价格数据
     np.random.seed(42)
@@ -29,6 +27,13 @@ def create_test_data(days=100):
     low = np.minimum(open, close) * (1 - np.random.rand(days) * 0.02)
     volume = np.random.rand(days) * 1000000 + 100000
     
+    # 前收盘价为前一天的收盘价，第一天没有前一天数据，用当天收盘价代替
+    preclose = np.empty_like(close)
+    preclose[1:] = close[:-1]
+    preclose[0] = close[0]
+    pct_chg = (close / preclose - 1.0) * 100.0
+    pct_chg[0] = 0.0
+    
     # 创建DataFrame
     df = pd.DataFrame({
         'date': dates,
@@ -37,13 +42,13 @@ def create_test_data(days=100):
         'high': high,
         'low': low,
         'close': close,
-        'preclose': np.roll(close, 1),
+        'preclose': preclose,
         'volume': volume,
         'amount': close * volume,
         'adjustflag': '1',
         'turn': np.random.rand(days) * 10,
         'tradestatus': '1',
-        'pctChg': (close / np.roll(close, 1) - 1) * 100,
+        'pctChg': pct_chg,
         'peTTM': np.random.rand(days) * 50 + 10,
         'pbMRQ': np.random.rand(days) * 5 + 1,
         'psTTM': np.random.rand(days) * 10 + 1,
@@ -51,10 +56,6 @@ def create_test_data(days=100):
         'isST': '0'
     })
     
-    # 处理第一个preclose值
-    df.loc[0, 'preclose'] = df.loc[0, 'close']
-    df.loc[0, 'pctChg'] = 0.0
-    
     return df
 
 # 创建测试数据
@@ -66,9 +67,30 @@ calculator = TechnicalIndicatorCalculator()
 # 创建传统分析引擎实例
 engine = TraditionalAnalysisEngine()
 
+# 先预热一次，使numba编译和pandas内部缓存就绪，性能分析只统计稳定状态下的调用
+calculator.calculate_all_indicators(test_data)
+
 # 使用cProfile进行性能分析
-cProfile.run('calculator.calculate_all_indicators(test_data)', 'profile_stats')
+profiler = cProfile.Profile()
+profiler.enable()
+calculator.calculate_all_indicators(test_data)
+profiler.disable()
+profiler.dump_stats('profile_stats')
 
-# 打印性能分析结果
+# 打印性能分析结果：按累计耗时查看调用链，按自身耗时查看叶子函数的瓶颈
 p = pstats.Stats('profile_stats')
 p.strip_dirs().sort_stats('cumulative').print_stats(20)
+p.sort_stats('tottime').print_stats(20)
+
+# 对快速版本做同样的性能分析，与上面的结果对比
+calculator.calculate_all_indicators_fast(test_data)
+
+profiler = cProfile.Profile()
+profiler.enable()
+calculator.calculate_all_indicators_fast(test_data)
+profiler.disable()
+profiler.dump_stats('profile_stats_fast')
+
+p = pstats.Stats('profile_stats_fast')
+p.strip_dirs().sort_stats('cumulative').print_stats(20)
+p.sort_stats('tottime').print_stats(20)
@@ -1,5 +1,12 @@
 import os
+import functools
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_float_dtype
 from log_utils import setup_logger, get_logger
 from result_storage import ResultStorage
 
@@ -15,46 +22,62 @@ log_config = {
 setup_logger(log_config)
 logger = get_logger('report_generator')
 
+# 报告中展示的技术指标列及保留的小数位数，模板占位符为列名的小写形式
+INDICATOR_DECIMALS = {
+    'MACD_DIF': 4, 'MACD_DEA': 4, 'MACD_HIST': 4,
+    'RSI6': 2, 'RSI12': 2, 'RSI24': 2,
+    'KDJ_K': 2, 'KDJ_D': 2, 'KDJ_J': 2,
+    'BOLL_UPPER': 2, 'BOLL_MIDDLE': 2, 'BOLL_LOWER': 2,
+    'MA5': 2, 'MA10': 2, 'MA20': 2, 'MA60': 2
+}
+INDICATOR_COLUMNS = list(INDICATOR_DECIMALS)
+INDICATOR_PLACEHOLDERS = [col.lower() for col in INDICATOR_COLUMNS]
+# 没有股票数据时各指标的取值，只读共享
+NA_INDICATOR_VALUES = dict.fromkeys(INDICATOR_PLACEHOLDERS, 'N/A')
+# 各指标列取整时的缩放倍数，与np.round的实现一致：先乘以10^小数位数取整再除回
+INDICATOR_SCALES = 10.0 ** np.array(list(INDICATOR_DECIMALS.values()))
 
-class ReportGenerator:
-    """
-    报告生成模块类
-    生成Markdown格式的分析报告
-    """
-    
-    def __init__(self, report_dir: str = 'reports'):
-        """
-        初始化报告生成模块
-        
-        Args:
-            report_dir: 报告保存目录，默认'reports'
-        """
-        self.report_dir = report_dir
-        self.result_storage = ResultStorage()
-        self.logger = logger
-        
-        # 确保报告目录存在
-        if not os.path.exists(self.report_dir):
-            os.makedirs(self.report_dir)
-            self.logger.info(f"创建报告目录: {self.report_dir}")
-        
-        self.logger.info(f"报告生成模块已初始化，报告保存目录: {self.report_dir}")
-    
-    def generate_stock_report(self, stock_code: str, analysis_result: dict, stock_data: pd.DataFrame = None) -> str:
-        """
-        生成单只股票的分析报告
-        
-        Args:
-            stock_code: 股票代码
-            analysis_result: 分析结果字典
-            stock_data: 股票数据DataFrame（可选）
-            
-        Returns:
-            Markdown格式的报告内容
-        """
-        try:
-            # 构建报告模板
-            report_template = """# 股票分析报告
+# 分析结果中的信号名到模板占位符的映射
+SIGNAL_PLACEHOLDERS = {
+    'macd': 'macd_signal',
+    'rsi': 'rsi_signal',
+    'kdj': 'kdj_signal',
+    'bollinger': 'boll_signal',
+    'ma': 'ma_signal'
+}
+
+# 批量生成报告时启用多进程的最少股票数，股票较少时进程启动和数据传输的开销大于并行收益
+PARALLEL_REPORT_MIN_STOCKS = 32
+
+# 指标英文名称到中文名称的映射
+INDICATOR_NAMES = {
+    'macd': 'MACD',
+    'rsi': 'RSI',
+    'kdj': 'KDJ',
+    'bollinger': '布林带',
+    'ma': '均线'
+}
+
+# 决策依据中各信号的描述，买入和卖出以外的信号均视为持有
+SIGNAL_DESCRIPTIONS = {
+    'buy': '指标发出买入信号',
+    'sell': '指标发出卖出信号'
+}
+HOLD_SIGNAL_DESCRIPTION = '指标发出持有信号'
+
+# 各风险等级对应的风险提示
+RISK_TIPS = {
+    'low': "- 该股票风险较低，适合稳健型投资者\n- 建议长期持有，定期关注基本面变化",
+    'medium': "- 该股票风险中等，适合平衡型投资者\n- 建议设置止损点，定期跟踪技术指标变化\n- 关注宏观经济和行业政策变化",
+    'high': "- 该股票风险较高，适合激进型投资者\n- 建议严格控制仓位，设置止损点\n- 密切关注市场情绪和资金流向\n- 注意短期波动风险"
+}
+DEFAULT_RISK_TIPS = "- 风险等级未知，请谨慎投资\n- 建议充分了解股票基本面和技术面\n- 控制仓位，分散投资"
+
+# 直接取自分析结果的报告字段
+RESULT_FIELDS = ('analysis_date', 'strategy', 'rating', 'score', 'risk_level')
+
+# 报告模板，模块加载时定义一次，生成报告时用format_map填充，未提供的字段显示为N/A
+REPORT_TEMPLATE = """# 股票分析报告
 
 ## 基本信息
 - 股票代码：{stock_code}
@@ -114,86 +137,117 @@ class ReportGenerator:
 
 *本报告由股票分析系统自动生成，仅供参考，不构成投资建议。投资有风险，入市需谨慎。*
 """
+
+
+@functools.lru_cache(maxsize=2048)
+def _format_signals(signal_items: tuple) -> tuple:
+    """
+    根据信号生成模板中的信号字段和决策依据，相同的信号组合只计算一次
+    
+    Args:
+        signal_items: 信号字典的(指标, 信号)元组，保持原字典顺序
+        
+    Returns:
+        tuple: (模板信号字段的(占位符, 信号)元组, 决策依据文本)
+    """
+    placeholders = tuple(
+        (SIGNAL_PLACEHOLDERS[indicator], signal)
+        for indicator, signal in signal_items if indicator in SIGNAL_PLACEHOLDERS
+    )
+    basis = [
+        f"- {INDICATOR_NAMES.get(indicator, indicator)}{SIGNAL_DESCRIPTIONS.get(signal, HOLD_SIGNAL_DESCRIPTION)}"
+        for indicator, signal in signal_items
+    ]
+    return placeholders, '\n'.join(basis) if basis else "无明确决策依据"
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_report_middle(signal_items: tuple, risk_level: str, llm_provider: str, llm_model: str) -> tuple:
+    """
+    生成报告中只取决于信号、风险等级和大模型信息的部分，批量生成时相同组合只计算一次
+    
+    Args:
+        signal_items: 信号字典的(指标, 信号)元组，保持原字典顺序
+        risk_level: 风险等级
+        llm_provider: 大模型提供商
+        llm_model: 大模型名称
+        
+    Returns:
+        tuple: (模板信号字段的(占位符, 信号)元组, 决策依据文本, 风险提示文本, 大模型信息文本)
+    """
+    signal_fields, decision_basis = _format_signals(signal_items)
+    risk_tips = RISK_TIPS.get(risk_level, DEFAULT_RISK_TIPS)
+    llm_info = f"{llm_provider} {llm_model}" if llm_provider and llm_model else "未使用"
+    return signal_fields, decision_basis, risk_tips, llm_info
+
+
+class ReportGenerator:
+    """
+    报告生成模块类
+    生成Markdown格式的分析报告
+    """
+    
+    def __init__(self, report_dir: str = 'reports'):
+        """
+        初始化报告生成模块
+        
+        Args:
+            report_dir: 报告保存目录，默认'reports'
+        """
+        self.report_dir = report_dir
+        self.result_storage = ResultStorage()
+        self.logger = logger
+        
+        # 确保报告目录存在：直接创建，目录已存在时忽略，省去先检查是否存在的一次stat
+        try:
+            os.makedirs(self.report_dir)
+            self.logger.info(f"创建报告目录: {self.report_dir}")
+        except FileExistsError:
+            pass
+        
+        self.logger.info(f"报告生成模块已初始化，报告保存目录: {self.report_dir}")
+    
+    def generate_stock_report(self, stock_code: str, analysis_result: dict, stock_data: pd.DataFrame = None) -> str:
+        """
+        生成单只股票的分析报告
+        
+        Args:
+            stock_code: 股票代码
+            analysis_result: 分析结果字典
+            stock_data: 股票数据DataFrame（可选）
             
-            # 提取信号
-            signals = analysis_result.get('signals', {})
-            
-            # 获取最新的技术指标数据
-            if stock_data is not None and not stock_data.empty:
-                latest_data = stock_data.iloc[-1]
-                macd_dif = latest_data.get('MACD_DIF', 'N/A')
-                macd_dea = latest_data.get('MACD_DEA', 'N/A')
-                macd_hist = latest_data.get('MACD_HIST', 'N/A')
-                rsi6 = latest_data.get('RSI6', 'N/A')
-                rsi12 = latest_data.get('RSI12', 'N/A')
-                rsi24 = latest_data.get('RSI24', 'N/A')
-                kdj_k = latest_data.get('KDJ_K', 'N/A')
-                kdj_d = latest_data.get('KDJ_D', 'N/A')
-                kdj_j = latest_data.get('KDJ_J', 'N/A')
-                boll_upper = latest_data.get('BOLL_UPPER', 'N/A')
-                boll_middle = latest_data.get('BOLL_MIDDLE', 'N/A')
-                boll_lower = latest_data.get('BOLL_LOWER', 'N/A')
-                ma5 = latest_data.get('MA5', 'N/A')
-                ma10 = latest_data.get('MA10', 'N/A')
-                ma20 = latest_data.get('MA20', 'N/A')
-                ma60 = latest_data.get('MA60', 'N/A')
-            else:
-                # 默认值
-                macd_dif = macd_dea = macd_hist = 'N/A'
-                rsi6 = rsi12 = rsi24 = 'N/A'
-                kdj_k = kdj_d = kdj_j = 'N/A'
-                boll_upper = boll_middle = boll_lower = 'N/A'
-                ma5 = ma10 = ma20 = ma60 = 'N/A'
-            
-            # 大模型信息
-            llm_provider = analysis_result.get('llm_provider', '')
-            llm_model = analysis_result.get('llm_model', '')
-            llm_info = f"{llm_provider} {llm_model}" if llm_provider and llm_model else "未使用"
-            
-            # 决策依据
-            decision_basis = self._generate_decision_basis(signals)
+        Returns:
+            Markdown格式的报告内容
+        """
+        try:
+            # 信号字段、决策依据、风险提示和大模型信息按输入组合缓存
+            signal_fields, decision_basis, risk_tips, llm_info = _format_report_middle(
+                tuple(analysis_result.get('signals', {}).items()),
+                analysis_result.get('risk_level', 'medium'),
+                analysis_result.get('llm_provider', ''),
+                analysis_result.get('llm_model', '')
+            )
             
-            # 风险提示
-            risk_tips = self._generate_risk_tips(analysis_result.get('risk_level', 'medium'))
+            # 填充报告模板，未提供的字段默认为N/A
+            fields = defaultdict(lambda: 'N/A')
+            fields.update((field, analysis_result[field]) for field in RESULT_FIELDS if field in analysis_result)
+            fields.update(signal_fields)
             
-            # 大模型分析
-            llm_analysis = analysis_result.get('llm_analysis', '无大模型分析结果')
+            # 获取最新的技术指标数据
+            fields.update(self._get_latest_indicator_values(stock_data))
             
-            # 填充报告模板
-            report_content = report_template.format(
+            fields.update(
                 stock_code=stock_code,
-                analysis_date=analysis_result.get('analysis_date', 'N/A'),
-                strategy=analysis_result.get('strategy', 'N/A'),
                 llm_info=llm_info,
-                macd_dif=round(macd_dif, 4) if isinstance(macd_dif, (int, float)) else macd_dif,
-                macd_dea=round(macd_dea, 4) if isinstance(macd_dea, (int, float)) else macd_dea,
-                macd_hist=round(macd_hist, 4) if isinstance(macd_hist, (int, float)) else macd_hist,
-                macd_signal=signals.get('macd', 'N/A'),
-                rsi6=round(rsi6, 2) if isinstance(rsi6, (int, float)) else rsi6,
-                rsi12=round(rsi12, 2) if isinstance(rsi12, (int, float)) else rsi12,
-                rsi24=round(rsi24, 2) if isinstance(rsi24, (int, float)) else rsi24,
-                rsi_signal=signals.get('rsi', 'N/A'),
-                kdj_k=round(kdj_k, 2) if isinstance(kdj_k, (int, float)) else kdj_k,
-                kdj_d=round(kdj_d, 2) if isinstance(kdj_d, (int, float)) else kdj_d,
-                kdj_j=round(kdj_j, 2) if isinstance(kdj_j, (int, float)) else kdj_j,
-                kdj_signal=signals.get('kdj', 'N/A'),
-                boll_upper=round(boll_upper, 2) if isinstance(boll_upper, (int, float)) else boll_upper,
-                boll_middle=round(boll_middle, 2) if isinstance(boll_middle, (int, float)) else boll_middle,
-                boll_lower=round(boll_lower, 2) if isinstance(boll_lower, (int, float)) else boll_lower,
-                boll_signal=signals.get('bollinger', 'N/A'),
-                ma5=round(ma5, 2) if isinstance(ma5, (int, float)) else ma5,
-                ma10=round(ma10, 2) if isinstance(ma10, (int, float)) else ma10,
-                ma20=round(ma20, 2) if isinstance(ma20, (int, float)) else ma20,
-                ma60=round(ma60, 2) if isinstance(ma60, (int, float)) else ma60,
-                ma_signal=signals.get('ma', 'N/A'),
-                rating=analysis_result.get('rating', 'N/A'),
-                score=analysis_result.get('score', 'N/A'),
-                risk_level=analysis_result.get('risk_level', 'N/A'),
                 expected_return=round(analysis_result.get('expected_return', 0) * 100, 2),
+                # 决策依据
                 decision_basis=decision_basis,
-                llm_analysis=llm_analysis,
+                # 大模型分析
+                llm_analysis=analysis_result.get('llm_analysis', '无大模型分析结果'),
+                # 风险提示
                 risk_tips=risk_tips
             )
+            report_content = REPORT_TEMPLATE.format_map(fields)
             
             self.logger.info(f"成功生成股票 {stock_code} 的分析报告")
             return report_content
@@ -201,6 +255,34 @@ class ReportGenerator:
             self.logger.error(f"生成股票 {stock_code} 的分析报告失败: {str(e)}")
             raise
     
+    def _get_latest_indicator_values(self, stock_data: pd.DataFrame = None) -> dict:
+        """
+        获取最新一行的技术指标值，按INDICATOR_DECIMALS整块四舍五入
+        
+        Args:
+            stock_data: 股票数据DataFrame（可选）
+            
+        Returns:
+            以模板占位符为键的指标值字典，缺失的指标为'N/A'
+        """
+        # 没有股票数据时直接返回共享的N/A字典，调用方只读取不修改
+        if stock_data is None or stock_data.empty:
+            return NA_INDICATOR_VALUES
+        
+        # 取最后一行并对齐到指标列，缺失的列补为NaN
+        latest = stock_data.iloc[-1:].reindex(columns=INDICATOR_COLUMNS)
+        
+        # 指标列均为浮点类型时（技术指标计算结果的常见情况），取出为一个float64数组一次完成取整
+        if all(is_float_dtype(dtype) for dtype in latest.dtypes):
+            values = latest.to_numpy(dtype=np.float64)[0]
+            rounded = np.rint(values * INDICATOR_SCALES) / INDICATOR_SCALES
+            return dict(zip(INDICATOR_PLACEHOLDERS, [value if value == value else 'N/A' for value in rounded.tolist()]))
+        
+        # 存在非浮点列时保持单行DataFrame以保留各列类型，只对数值列取整
+        latest = latest.round(INDICATOR_DECIMALS).iloc[0]
+        latest = latest.astype(object).where(latest.notna(), 'N/A')
+        return latest.rename(str.lower).to_dict()
+    
     def _generate_decision_basis(self, signals: dict) -> str:
         """
         生成决策依据
@@ -211,17 +293,7 @@ class ReportGenerator:
         Returns:
             决策依据文本
         """
-        basis = []
-        
-        for indicator, signal in signals.items():
-            if signal == 'buy':
-                basis.append(f"- {self._get_indicator_name(indicator)}指标发出买入信号")
-            elif signal == 'sell':
-                basis.append(f"- {self._get_indicator_name(indicator)}指标发出卖出信号")
-            else:
-                basis.append(f"- {self._get_indicator_name(indicator)}指标发出持有信号")
-        
-        return '\n'.join(basis) if basis else "无明确决策依据"
+        return _format_signals(tuple(signals.items()))[1]
     
     def _generate_risk_tips(self, risk_level: str) -> str:
         """
@@ -233,14 +305,7 @@ class ReportGenerator:
         Returns:
             风险提示文本
         """
-        if risk_level == 'low':
-            return "- 该股票风险较低，适合稳健型投资者\n- 建议长期持有，定期关注基本面变化"
-        elif risk_level == 'medium':
-            return "- 该股票风险中等，适合平衡型投资者\n- 建议设置止损点，定期跟踪技术指标变化\n- 关注宏观经济和行业政策变化"
-        elif risk_level == 'high':
-            return "- 该股票风险较高，适合激进型投资者\n- 建议严格控制仓位，设置止损点\n- 密切关注市场情绪和资金流向\n- 注意短期波动风险"
-        else:
-            return "- 风险等级未知，请谨慎投资\n- 建议充分了解股票基本面和技术面\n- 控制仓位，分散投资"
+        return RISK_TIPS.get(risk_level, DEFAULT_RISK_TIPS)
     
     def _get_indicator_name(self, indicator: str) -> str:
         """
@@ -252,14 +317,7 @@ class ReportGenerator:
         Returns:
             指标中文名称
         """
-        indicator_names = {
-            'macd': 'MACD',
-            'rsi': 'RSI',
-            'kdj': 'KDJ',
-            'bollinger': '布林带',
-            'ma': '均线'
-        }
-        return indicator_names.get(indicator, indicator)
+        return INDICATOR_NAMES.get(indicator, indicator)
     
     def save_report_to_file(self, stock_code: str, report_content: str, analysis_date: str, format: str = 'markdown') -> str:
         """
@@ -280,8 +338,7 @@ class ReportGenerator:
             file_path = os.path.join(self.report_dir, filename)
             
             # 保存报告
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(report_content)
+            Path(file_path).write_text(report_content, encoding='utf-8')
             
             self.logger.info(f"成功将报告保存到文件: {file_path}")
             return file_path
@@ -327,7 +384,7 @@ class ReportGenerator:
             
             # 保存报告
             if save_to_file:
-                self.save_report_to_file(report_content, stock_code, analysis_result.get('analysis_date', ''))
+                self.save_report_to_file(stock_code, report_content, analysis_result.get('analysis_date', ''))
             
             if save_to_db:
                 self.save_report_to_db(report_content, stock_code, analysis_result.get('analysis_date', ''))
@@ -353,19 +410,86 @@ class ReportGenerator:
         """
         reports = {}
         
-        for stock_code, result in analysis_results.items():
+        if len(analysis_results) < PARALLEL_REPORT_MIN_STOCKS:
+            for stock_code, result in analysis_results.items():
+                try:
+                    stock_data = stock_data_dict.get(stock_code) if stock_data_dict else None
+                    reports[stock_code] = self.generate_and_save_report(stock_code, result, stock_data, save_to_file)
+                except Exception as e:
+                    self.logger.error(f"生成股票 {stock_code} 的报告失败，跳过该股票: {str(e)}")
+                    continue
+        else:
+            # 各股票的报告生成和文件写入互不依赖，分发到多个进程并行执行；
+            # 报告只用到最新一行技术指标，只把最后一行数据传给子进程；数据库写入在主进程中统一完成，避免SQLite写冲突；
+            # 使用spawn启动子进程，不继承主进程的数据库连接、后台写入线程和锁
+            with ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_report_worker,
+                                     initargs=(self.report_dir,)) as executor:
+                futures = {}
+                for stock_code, result in analysis_results.items():
+                    stock_data = stock_data_dict.get(stock_code) if stock_data_dict else None
+                    if stock_data is not None:
+                        stock_data = stock_data.iloc[-1:]
+                    futures[stock_code] = executor.submit(_generate_report_worker, stock_code, result, stock_data, save_to_file)
+            
+            for stock_code, future in futures.items():
+                try:
+                    reports[stock_code] = future.result()
+                except Exception as e:
+                    self.logger.error(f"生成股票 {stock_code} 的报告失败，跳过该股票: {str(e)}")
+                    continue
+        
+        # 所有报告生成后一次性写入数据库，整批只提交一次事务；
+        # 违反唯一约束的报告逐份跳过，与逐份保存时一样视为该股票的报告生成失败
+        if save_to_db and reports:
             try:
-                stock_data = stock_data_dict.get(stock_code) if stock_data_dict else None
-                report_content = self.generate_and_save_report(stock_code, result, stock_data, save_to_file, save_to_db)
-                reports[stock_code] = report_content
+                failed = self.result_storage.save_batch_analysis_reports([
+                    (stock_code, analysis_results[stock_code].get('analysis_date', ''), 'full', report_content)
+                    for stock_code, report_content in reports.items()
+                ])
             except Exception as e:
-                self.logger.error(f"生成股票 {stock_code} 的报告失败，跳过该股票: {str(e)}")
-                continue
+                self.logger.error(f"批量保存 {len(reports)} 份报告到数据库失败（{list(reports)}）: {str(e)}")
+                failed = list(reports)
+            for stock_code in failed:
+                self.logger.error(f"保存股票 {stock_code} 的报告到数据库失败，跳过该股票")
+                reports.pop(stock_code, None)
         
         self.logger.info(f"批量生成报告完成，成功生成 {len(reports)} 份报告")
         return reports
 
 
+# 子进程中复用的报告生成器，由进程池初始化函数创建
+_worker_generator = None
+
+
+def _init_report_worker(report_dir: str):
+    """
+    报告生成子进程初始化：每个子进程只创建一次报告生成器
+    
+    Args:
+        report_dir: 报告保存目录
+    """
+    global _worker_generator
+    _worker_generator = ReportGenerator(report_dir)
+
+
+def _generate_report_worker(stock_code: str, analysis_result: dict, stock_data: pd.DataFrame, save_to_file: bool) -> str:
+    """
+    在子进程中生成单只股票的报告，并按需保存到文件
+    
+    Args:
+        stock_code: 股票代码
+        analysis_result: 分析结果字典
+        stock_data: 股票数据DataFrame（可选）
+        save_to_file: 是否保存到文件
+        
+    Returns:
+        报告内容
+    """
+    return _worker_generator.generate_and_save_report(stock_code, analysis_result, stock_data,
+                                                      save_to_file=save_to_file, save_to_db=False)
+
+
 # 使用示例
 if __name__ == '__main__':
     # 创建报告生成器实例
@@ -394,7 +518,7 @@ if __name__ == '__main__':
         report_content = report_generator.generate_stock_report('sh.600000', sample_result)
         
         # 保存报告到文件
-        file_path = report_generator.save_report_to_file(report_content, 'sh.600000', '2023-10-01')
+        file_path = report_generator.save_report_to_file('sh.600000', report_content, '2023-10-01')
         print(f"报告已生成并保存到: {file_path}")
         
         # 打印报告前1000个字符
@@ -1,5 +1,11 @@
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
 import pandas as pd
-from sqlite_db_manager import SQLiteDBManager
+from sqlite_db_manager import SQLiteDBManager, WRITE_PRAGMAS, BULK_LOAD_PRAGMAS
 from log_utils import setup_logger, get_logger
 
 # 配置日志
@@ -14,6 +20,288 @@ log_config = {
 setup_logger(log_config)
 logger = get_logger('result_storage')
 
+# 分析结果的必要字段
+REQUIRED_RESULT_FIELDS = frozenset(['stock_code', 'analysis_date', 'strategy', 'rating'])
+
+# 技术指标DataFrame的必要列
+REQUIRED_INDICATOR_COLUMNS = frozenset(['date', 'code'])
+
+# 策略绩效的必要字段
+REQUIRED_PERFORMANCE_FIELDS = frozenset(['strategy_name', 'start_date', 'end_date'])
+
+# analysis_results表的写入列，顺序与_build_result_row返回的元组一致；
+# 各指标信号合并为一个JSON对象写入signals_json列
+ANALYSIS_RESULT_COLUMNS = [
+    'stock_code', 'analysis_date', 'strategy', 'rating', 'score', 'signals_json',
+    'llm_analysis', 'llm_provider', 'llm_model', 'risk_level', 'expected_return'
+]
+
+# 查询结果中的信号列到signals_json中键名的映射，查询时用json_extract展开为单独的列
+SIGNAL_RESULT_COLUMNS = {
+    'macd_signal': 'macd',
+    'rsi_signal': 'rsi',
+    'kdj_signal': 'kdj',
+    'boll_signal': 'bollinger',
+    'ma_signal': 'ma'
+}
+
+# 大模型分析相关的列，其中llm_analysis为较长的文本，查询时默认不读取
+LLM_RESULT_COLUMNS = ['llm_analysis', 'llm_provider', 'llm_model']
+
+# 信号列在查询中对应的表达式
+SIGNAL_COLUMN_EXPRESSIONS = {
+    col: f"json_extract(signals_json, '$.{key}')" for col, key in SIGNAL_RESULT_COLUMNS.items()
+}
+
+# get_analysis_results默认读取的列
+DEFAULT_RESULT_QUERY_COLUMNS = [
+    'stock_code', 'analysis_date', 'strategy', 'rating', 'score',
+    *SIGNAL_RESULT_COLUMNS, 'risk_level', 'expected_return'
+]
+
+# 技术指标分批写入时每批的行数
+TECHNICAL_INDICATOR_CHUNKSIZE = 500
+
+# 后台写入线程每次合并写入的最大分析结果条数
+STORAGE_WORKER_BATCH_SIZE = 256
+
+
+def _build_result_row(result: dict) -> tuple:
+    """
+    将分析结果字典转换为与ANALYSIS_RESULT_COLUMNS顺序一致的行元组，
+    直接按列顺序取值，不构建中间字典
+    
+    Args:
+        result: 分析结果字典，需包含REQUIRED_RESULT_FIELDS中的字段
+        
+    Returns:
+        analysis_results表的一行数据
+    """
+    # 直接调用result.get，由解释器的方法调用优化避免创建绑定方法对象
+    signals = result.get('signals')
+    return (
+        result['stock_code'], result['analysis_date'], result['strategy'], result['rating'], result.get('score'),
+        json.dumps(signals, ensure_ascii=False, separators=(',', ':')) if signals else None,
+        result.get('llm_analysis'), result.get('llm_provider'), result.get('llm_model'), result.get('risk_level'),
+        result.get('expected_return')
+    )
+
+
+def _quote_columns(columns: list, expressions: dict = None) -> str:
+    """
+    将列名列表转换为SELECT子句中的列表达式，列名按SQL标识符加双引号
+    
+    Args:
+        columns: 列名列表，为None时表示所有列
+        expressions: 计算列名到SQL表达式的映射，这些列以"表达式 AS 列名"的形式查询，默认None
+        
+    Returns:
+        SELECT子句中的列表达式
+    """
+    if columns is None:
+        return '*'
+    expressions = expressions or {}
+    quoted = []
+    for col in columns:
+        name = '"' + col.replace('"', '""') + '"'
+        quoted.append(f"{expressions[col]} AS {name}" if col in expressions else name)
+    return ', '.join(quoted)
+
+
+def _paginate(query: str, params: list, limit: int = None, offset: int = None) -> str:
+    """
+    为查询添加LIMIT/OFFSET子句，并将对应参数追加到params中
+    
+    Args:
+        query: SQL查询语句
+        params: 查询参数列表
+        limit: 最多返回的行数，默认None（不限制）
+        offset: 跳过的行数，默认None（不跳过）
+        
+    Returns:
+        添加分页子句后的查询语句
+    """
+    if limit is None and offset is None:
+        return query
+    # SQLite的OFFSET必须跟在LIMIT之后，LIMIT -1表示不限制行数
+    params.append(-1 if limit is None else limit)
+    query += " LIMIT ?"
+    if offset is not None:
+        params.append(offset)
+        query += " OFFSET ?"
+    return query
+
+
+def _insert_rows_with_fallback(db_manager: SQLiteDBManager, table_name: str, columns: list, rows: list) -> list:
+    """
+    批量写入多行，违反唯一约束时整批回滚，改为逐行写入以保存其余的行
+    
+    Args:
+        db_manager: 数据库管理器
+        table_name: 表名
+        columns: 列名列表
+        rows: 与columns顺序一致的行元组列表
+        
+    Returns:
+        写入失败的(行元组, 异常)列表，全部写入成功时为空列表；非约束冲突的错误直接抛出
+    """
+    try:
+        db_manager.insert_many(table_name, columns, rows)
+        return []
+    except sqlite3.IntegrityError as e:
+        if len(rows) == 1:
+            return [(rows[0], e)]
+    
+    failures = []
+    for row in rows:
+        try:
+            db_manager.insert_many(table_name, columns, [row])
+        except sqlite3.IntegrityError as e:
+            failures.append((row, e))
+    return failures
+
+
+class StorageWorker(threading.Thread):
+    """
+    分析结果后台写入线程
+    从队列中取出待写入的行，每次最多合并STORAGE_WORKER_BATCH_SIZE条，通过一次executemany写入并提交；
+    线程使用独立的数据库连接，不阻塞调用方。写入失败的错误被记录下来，在下一次flush()或stop()时抛出
+    """
+    
+    def __init__(self, db_path: str, pragmas: dict):
+        """
+        初始化后台写入线程
+        
+        Args:
+            db_path: 数据库文件路径
+            pragmas: 连接建立后设置的PRAGMA
+        """
+        super().__init__(name='StorageWorker', daemon=True)
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self.queue = queue.Queue()
+        self.logger = logger
+        # 连接失败时的错误，之后提交的行均无法写入，每次flush()都抛出
+        self._connect_error = None
+        # 写入失败的错误，抛出后清空
+        self._errors = []
+        self._errors_lock = threading.Lock()
+    
+    def run(self):
+        db_manager = SQLiteDBManager(self.db_path, pragmas=self.pragmas)
+        try:
+            db_manager.connect()
+        except Exception as e:
+            self.logger.error(f"后台写入线程连接数据库失败: {str(e)}")
+            self._connect_error = e
+        try:
+            while True:
+                # 阻塞等待第一条，再取出队列中已有的其余行合并写入
+                rows = [self.queue.get()]
+                while len(rows) < STORAGE_WORKER_BATCH_SIZE:
+                    try:
+                        rows.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                
+                # None为停止标记
+                stop = None in rows
+                batch = [row for row in rows if row is not None]
+                try:
+                    # 连接失败时仍取出队列中的行并记为写入失败，避免flush()一直阻塞
+                    if batch and self._connect_error is None:
+                        self._write_batch(db_manager, batch)
+                    elif batch:
+                        for row in batch:
+                            self._record_error(row, self._connect_error)
+                finally:
+                    for _ in rows:
+                        self.queue.task_done()
+                if stop:
+                    break
+        finally:
+            if self._connect_error is None:
+                db_manager.disconnect()
+    
+    def _write_batch(self, db_manager: SQLiteDBManager, batch: list):
+        """
+        写入一批分析结果，违反唯一约束时整批回滚，改为逐行写入以保存其余的行
+        
+        Args:
+            db_manager: 后台写入线程的数据库管理器
+            batch: 与ANALYSIS_RESULT_COLUMNS顺序一致的行元组列表
+        """
+        try:
+            failures = _insert_rows_with_fallback(db_manager, 'analysis_results', ANALYSIS_RESULT_COLUMNS, batch)
+        except Exception as e:
+            failures = [(row, e) for row in batch]
+        for row, error in failures:
+            self._record_error(row, error)
+        self.logger.info(f"后台写入 {len(batch) - len(failures)}/{len(batch)} 条分析结果")
+    
+    def _record_error(self, row: tuple, error: Exception):
+        """
+        记录一行分析结果的写入错误
+        
+        Args:
+            row: 写入失败的行元组
+            error: 写入时的异常
+        """
+        self.logger.error(f"后台写入股票 {row[0]} 的分析结果失败: {str(error)}")
+        with self._errors_lock:
+            self._errors.append((row[0], error))
+    
+    def raise_errors(self):
+        """
+        抛出已记录的写入错误，抛出后清空
+        
+        Raises:
+            连接失败时的异常，或写入失败时的异常（多条失败时为汇总各股票代码的RuntimeError）
+        """
+        errors = self.pop_errors()
+        if self._connect_error is not None:
+            raise self._connect_error
+        if len(errors) == 1:
+            raise errors[0][1]
+        if errors:
+            codes = ', '.join(code for code, _ in errors)
+            raise RuntimeError(f"后台写入 {len(errors)} 条分析结果失败（{codes}）: {errors[0][1]}") from errors[0][1]
+    
+    def pop_errors(self) -> list:
+        """
+        取出已记录的写入错误并清空
+        
+        Returns:
+            (股票代码, 异常)列表
+        """
+        with self._errors_lock:
+            errors, self._errors = self._errors, []
+        return errors
+    
+    def submit(self, row: tuple):
+        """
+        提交一行待写入的分析结果
+        
+        Args:
+            row: 与ANALYSIS_RESULT_COLUMNS顺序一致的行元组
+        """
+        self.queue.put(row)
+    
+    def flush(self):
+        """
+        等待队列中已提交的行全部写入，并抛出期间记录的写入错误
+        """
+        self.queue.join()
+        self.raise_errors()
+    
+    def stop(self):
+        """
+        写完队列中剩余的行后停止线程，并抛出期间记录的写入错误
+        """
+        self.queue.put(None)
+        self.join()
+        self.raise_errors()
+
 
 class ResultStorage:
     """
@@ -21,22 +309,31 @@ class ResultStorage:
     负责将分析结果存储到数据库中
     """
     
-    def __init__(self, db_path: str = 'stock_data.db'):
+    def __init__(self, db_path: str = 'stock_data.db', bulk_load: bool = False):
         """
         初始化结果存储模块
         
         Args:
             db_path: 数据库文件路径，默认'stock_data.db'
+            bulk_load: 是否为批量导入模式，开启后提交时不再同步刷盘，默认False
         """
         self.db_path = db_path
-        self.db_manager = SQLiteDBManager(db_path)
+        self.pragmas = BULK_LOAD_PRAGMAS if bulk_load else WRITE_PRAGMAS
+        self.db_manager = SQLiteDBManager(db_path, pragmas=self.pragmas)
         self.logger = logger
+        # 分析结果的后台写入线程，首次调用save_analysis_result时启动
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        # 数据库连接在首次读写时建立，之后各方法复用同一连接，由close()统一关闭
         self.logger.info(f"结果存储模块已初始化，数据库路径: {db_path}")
     
     def connect(self):
         """
         连接数据库
+        连接在首次使用时建立并在实例生命周期内复用，已连接时直接返回
         """
+        if self.db_manager.conn is not None:
+            return
         try:
             self.db_manager.connect()
             self.logger.info("数据库连接成功")
@@ -48,6 +345,8 @@ class ResultStorage:
         """
         断开数据库连接
         """
+        if self.db_manager.conn is None:
+            return
         try:
             self.db_manager.disconnect()
             self.logger.info("数据库连接已断开")
@@ -55,140 +354,157 @@ class ResultStorage:
             self.logger.error(f"断开数据库连接失败: {str(e)}")
             raise
     
-    def save_technical_indicators(self, df: pd.DataFrame):
+    def flush(self):
+        """
+        等待后台写入线程写完已提交的分析结果，之前有分析结果写入失败时抛出对应的异常
+        """
+        if self._worker is not None:
+            self._worker.flush()
+    
+    def flush_failures(self) -> list:
+        """
+        等待后台写入线程写完已提交的分析结果，写入错误不抛出而是返回对应的股票代码，
+        供批量处理将失败的结果对应回各只股票
+        
+        Returns:
+            写入失败的股票代码列表
+        """
+        if self._worker is None:
+            return []
+        self._worker.queue.join()
+        return [code for code, _ in self._worker.pop_errors()]
+    
+    def close(self):
+        """
+        关闭结果存储模块，写完待写入的分析结果并释放数据库连接，
+        之前有分析结果写入失败时在释放连接后抛出对应的异常
+        """
+        with self._worker_lock:
+            worker, self._worker = self._worker, None
+        try:
+            if worker is not None:
+                atexit.unregister(self.close)
+                worker.stop()
+        finally:
+            self.disconnect()
+    
+    def __enter__(self):
+        self.connect()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def save_technical_indicators(self, df: pd.DataFrame, method: str = None,
+                                  chunksize: int = TECHNICAL_INDICATOR_CHUNKSIZE):
         """
         保存技术指标到数据库
         
         Args:
             df: 包含技术指标的DataFrame
+            method: 插入方式，透传给write_dataframe，默认None（sqlite3下为单条预编译INSERT的executemany，
+                    比'multi'的多行INSERT更快）
+            chunksize: 每批写入的行数，默认TECHNICAL_INDICATOR_CHUNKSIZE
         """
         try:
             self.connect()
             
             # 确保DataFrame包含必要的列
-            required_columns = ['date', 'code']
-            for col in required_columns:
-                if col not in df.columns:
-                    raise ValueError(f"DataFrame缺少必要的列: {col}")
+            missing = REQUIRED_INDICATOR_COLUMNS.difference(df.columns)
+            if missing:
+                raise ValueError(f"DataFrame缺少必要的列: {sorted(missing)}")
             
             # 保存到数据库
-            self.db_manager.write_dataframe(df, 'technical_indicators', if_exists='append', index=False)
+            self.db_manager.write_dataframe(df, 'technical_indicators', if_exists='append', index=False,
+                                           method=method, chunksize=chunksize)
             self.logger.info(f"成功保存 {len(df)} 条技术指标数据")
         except Exception as e:
             self.logger.error(f"保存技术指标失败: {str(e)}")
             raise
-        finally:
-            self.disconnect()
+    
+    def _get_worker(self) -> StorageWorker:
+        """
+        获取后台写入线程，未启动时启动并注册退出时的清理
+        
+        Returns:
+            后台写入线程
+        """
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = StorageWorker(self.db_path, self.pragmas)
+                self._worker.start()
+                atexit.register(self.close)
+            return self._worker
     
     def save_analysis_result(self, result: dict):
         """
         保存分析结果到数据库
+        结果校验后提交给后台写入线程即返回，需要立即读取时先调用flush()；
+        写入失败（如违反唯一约束）的异常在之后的flush()或close()中抛出。内存数据库直接同步写入
         
         Args:
             result: 分析结果字典
         """
         try:
-            self.connect()
-            
             # 确保结果包含必要的字段
-            required_fields = ['stock_code', 'analysis_date', 'strategy', 'rating']
-            for field in required_fields:
-                if field not in result:
-                    raise ValueError(f"分析结果缺少必要的字段: {field}")
-            
-            # 提取信号字段
-            signals = result.get('signals', {})
-            
-            # 构建插入数据
-            data = {
-                'stock_code': result['stock_code'],
-                'analysis_date': result['analysis_date'],
-                'strategy': result['strategy'],
-                'rating': result['rating'],
-                'score': result.get('score'),
-                'macd_signal': signals.get('macd'),
-                'rsi_signal': signals.get('rsi'),
-                'kdj_signal': signals.get('kdj'),
-                'boll_signal': signals.get('bollinger'),
-                'ma_signal': signals.get('ma'),
-                'llm_analysis': result.get('llm_analysis'),
-                'llm_provider': result.get('llm_provider'),
-                'llm_model': result.get('llm_model'),
-                'risk_level': result.get('risk_level'),
-                'expected_return': result.get('expected_return')
-            }
+            missing = REQUIRED_RESULT_FIELDS - result.keys()
+            if missing:
+                raise ValueError(f"分析结果缺少必要的字段: {sorted(missing)}")
             
-            # 插入数据
-            self.db_manager.insert('analysis_results', data)
-            self.logger.info(f"成功保存股票 {result['stock_code']} 的分析结果")
+            row = _build_result_row(result)
+            if self.db_path == ':memory:':
+                # 内存数据库的数据只在本连接可见，不能交给使用独立连接的后台线程，直接同步写入
+                self.connect()
+                self.db_manager.insert_many('analysis_results', ANALYSIS_RESULT_COLUMNS, [row])
+            else:
+                # 提交给后台写入线程
+                self._get_worker().submit(row)
+            self.logger.debug("已提交股票 %s 的分析结果", result['stock_code'])
         except Exception as e:
             self.logger.error(f"保存分析结果失败: {str(e)}")
             raise
-        finally:
-            self.disconnect()
     
     def save_batch_analysis_results(self, results: dict):
         """
-        批量保存分析结果
+        批量保存分析结果，所有结果通过一条预编译的INSERT语句在一个事务中写入；
+        有结果违反唯一约束时改为逐条写入，跳过失败的结果
         
         Args:
             results: 以股票代码为键，分析结果为值的字典
+            
+        Returns:
+            写入失败的股票代码列表
         """
+        # 必要字段齐全的结果直接转换为行元组，缺少字段的结果跳过，最后汇总记录一条警告
+        rows = [_build_result_row(result) for result in results.values()
+                if result.keys() >= REQUIRED_RESULT_FIELDS]
+        skipped = []
+        if len(rows) < len(results):
+            debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+            for stock_code, result in results.items():
+                missing = REQUIRED_RESULT_FIELDS - result.keys()
+                if missing:
+                    skipped.append(stock_code)
+                    if debug_enabled:
+                        self.logger.debug("股票 %s 的分析结果缺少必要字段 %s，跳过", stock_code, sorted(missing))
+            self.logger.warning("%d 条分析结果缺少必要字段，已跳过: %s", len(skipped), skipped)
+        
         try:
             self.connect()
             
-            # 开始事务
-            self.db_manager.begin_transaction()
-            
-            count = 0
-            for stock_code, result in results.items():
-                try:
-                    # 确保结果包含必要的字段
-                    required_fields = ['stock_code', 'analysis_date', 'strategy', 'rating']
-                    for field in required_fields:
-                        if field not in result:
-                            self.logger.warning(f"股票 {stock_code} 的分析结果缺少必要字段 {field}，跳过")
-                            continue
-                    
-                    # 提取信号字段
-                    signals = result.get('signals', {})
-                    
-                    # 构建插入数据
-                    data = {
-                        'stock_code': result['stock_code'],
-                        'analysis_date': result['analysis_date'],
-                        'strategy': result['strategy'],
-                        'rating': result['rating'],
-                        'score': result.get('score'),
-                        'macd_signal': signals.get('macd'),
-                        'rsi_signal': signals.get('rsi'),
-                        'kdj_signal': signals.get('kdj'),
-                        'boll_signal': signals.get('bollinger'),
-                        'ma_signal': signals.get('ma'),
-                        'llm_analysis': result.get('llm_analysis'),
-                        'llm_provider': result.get('llm_provider'),
-                        'llm_model': result.get('llm_model'),
-                        'risk_level': result.get('risk_level'),
-                        'expected_return': result.get('expected_return')
-                    }
-                    
-                    # 插入数据
-                    self.db_manager.insert('analysis_results', data)
-                    count += 1
-                except Exception as e:
-                    self.logger.error(f"保存股票 {stock_code} 的分析结果失败: {str(e)}")
-                    continue
-            
-            # 提交事务
-            self.db_manager.commit_transaction()
-            self.logger.info(f"批量保存完成，成功保存 {count} 条分析结果")
+            # 插入数据，违反唯一约束的结果逐条跳过
+            failures = []
+            if rows:
+                failures = _insert_rows_with_fallback(self.db_manager, 'analysis_results', ANALYSIS_RESULT_COLUMNS, rows)
+            failed = [row[0] for row, _ in failures]
+            if failures:
+                self.logger.error("%d 条分析结果写入失败，已跳过: %s（%s）", len(failed), failed, failures[0][1])
+            self.logger.info("批量保存完成，成功保存 %d 条分析结果，跳过 %d 条",
+                             len(rows) - len(failed), len(skipped) + len(failed))
+            return failed
         except Exception as e:
-            # 回滚事务
-            self.db_manager.rollback_transaction()
             self.logger.error(f"批量保存分析结果失败: {str(e)}")
             raise
-        finally:
-            self.disconnect()
     
     def save_analysis_report(self, stock_code: str, analysis_date: str, report_type: str, report_content: str):
         """
@@ -217,8 +533,39 @@ class ResultStorage:
         except Exception as e:
             self.logger.error(f"保存分析报告失败: {str(e)}")
             raise
-        finally:
-            self.disconnect()
+    
+    def save_batch_analysis_reports(self, reports: list):
+        """
+        批量保存分析报告，所有报告在一个事务中写入；
+        有报告违反唯一约束时改为逐份写入，跳过失败的报告
+        
+        Args:
+            reports: 报告列表，每项为(stock_code, analysis_date, report_type, report_content)元组
+            
+        Returns:
+            写入失败的股票代码列表
+        """
+        if not reports:
+            return []
+        
+        try:
+            self.connect()
+            
+            # 插入数据，违反唯一约束的报告逐份跳过
+            failures = _insert_rows_with_fallback(
+                self.db_manager,
+                'analysis_reports',
+                ['stock_code', 'analysis_date', 'report_type', 'report_content'],
+                reports
+            )
+            failed = [row[0] for row, _ in failures]
+            if failures:
+                self.logger.error(f"{len(failed)} 份分析报告写入失败，已跳过: {failed}（{failures[0][1]}）")
+            self.logger.info(f"批量保存完成，成功保存 {len(reports) - len(failed)} 份分析报告")
+            return failed
+        except Exception as e:
+            self.logger.error(f"批量保存分析报告失败: {str(e)}")
+            raise
     
     def save_strategy_performance(self, performance: dict):
         """
@@ -231,10 +578,9 @@ class ResultStorage:
             self.connect()
             
             # 确保绩效包含必要的字段
-            required_fields = ['strategy_name', 'start_date', 'end_date']
-            for field in required_fields:
-                if field not in performance:
-                    raise ValueError(f"策略绩效缺少必要的字段: {field}")
+            missing = REQUIRED_PERFORMANCE_FIELDS - performance.keys()
+            if missing:
+                raise ValueError(f"策略绩效缺少必要的字段: {sorted(missing)}")
             
             # 插入数据
             self.db_manager.insert('strategy_performance', performance)
@@ -242,11 +588,10 @@ class ResultStorage:
         except Exception as e:
             self.logger.error(f"保存策略绩效失败: {str(e)}")
             raise
-        finally:
-            self.disconnect()
     
     def get_analysis_results(self, stock_code: str = None, start_date: str = None, end_date: str = None, 
-                            strategy: str = None) -> pd.DataFrame:
+                            strategy: str = None, columns: list = None, include_llm: bool = False,
+                            limit: int = None, offset: int = None, chunksize: int = None) -> pd.DataFrame:
         """
         获取分析结果
         
@@ -255,11 +600,18 @@ class ResultStorage:
             start_date: 开始日期，默认None（不限制）
             end_date: 结束日期，默认None（不限制）
             strategy: 分析策略，默认None（所有策略）
+            columns: 要读取的列，默认None（DEFAULT_RESULT_QUERY_COLUMNS），信号列（如macd_signal）从signals_json中取出
+            include_llm: columns为None时是否同时读取大模型分析相关的列，默认False
+            limit: 最多返回的行数，默认None（不限制）
+            offset: 跳过的行数，默认None（不跳过）
+            chunksize: 每批读取的行数，默认None（一次读取全部结果）
             
         Returns:
-            分析结果的DataFrame
+            分析结果的DataFrame，指定chunksize时为逐批产生DataFrame的迭代器
         """
         try:
+            # 先等待后台写入线程写完已提交的分析结果
+            self.flush()
             self.connect()
             
             # 构建查询条件
@@ -282,24 +634,31 @@ class ResultStorage:
                 where_clause.append("strategy = ?")
                 params.append(strategy)
             
+            # 只读取需要的列，默认不读取较长的大模型分析文本
+            if columns is None:
+                columns = DEFAULT_RESULT_QUERY_COLUMNS + LLM_RESULT_COLUMNS if include_llm else DEFAULT_RESULT_QUERY_COLUMNS
+            
             # 构建完整查询
-            query = "SELECT * FROM analysis_results"
+            query = f"SELECT {_quote_columns(columns, SIGNAL_COLUMN_EXPRESSIONS)} FROM analysis_results"
             if where_clause:
                 query += " WHERE " + " AND ".join(where_clause)
             
             query += " ORDER BY analysis_date DESC"
+            query = _paginate(query, params, limit, offset)
             
             # 执行查询
-            df = self.db_manager.read_dataframe(query, params=tuple(params) if params else None)
-            self.logger.info(f"成功获取 {len(df)} 条分析结果")
+            df = self.db_manager.read_dataframe(query=query, params=tuple(params) if params else None,
+                                               chunksize=chunksize)
+            if chunksize is None:
+                self.logger.info(f"成功获取 {len(df)} 条分析结果")
             return df
         except Exception as e:
             self.logger.error(f"获取分析结果失败: {str(e)}")
             raise
-        finally:
-            self.disconnect()
     
-    def get_technical_indicators(self, stock_code: str, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+    def get_technical_indicators(self, stock_code: str, start_date: str = None, end_date: str = None,
+                                 columns: list = None, limit: int = None, offset: int = None,
+                                 chunksize: int = None) -> pd.DataFrame:
         """
         获取技术指标数据
         
@@ -307,9 +666,13 @@ class ResultStorage:
             stock_code: 股票代码
             start_date: 开始日期，默认None（不限制）
             end_date: 结束日期，默认None（不限制）
+            columns: 要读取的列，默认None（所有列）
+            limit: 最多返回的行数，默认None（不限制）
+            offset: 跳过的行数，默认None（不跳过）
+            chunksize: 每批读取的行数，默认None（一次读取全部结果）
             
         Returns:
-            技术指标数据的DataFrame
+            技术指标数据的DataFrame，指定chunksize时为逐批产生DataFrame的迭代器
         """
         try:
             self.connect()
@@ -327,17 +690,17 @@ class ResultStorage:
                 params.append(end_date)
             
             # 构建完整查询
-            query = f"SELECT * FROM technical_indicators WHERE {' AND '.join(where_clause)} ORDER BY date"
+            query = f"SELECT {_quote_columns(columns)} FROM technical_indicators WHERE {' AND '.join(where_clause)} ORDER BY date"
+            query = _paginate(query, params, limit, offset)
             
             # 执行查询
-            df = self.db_manager.read_dataframe(query, params=tuple(params))
-            self.logger.info(f"成功获取股票 {stock_code} 的 {len(df)} 条技术指标数据")
+            df = self.db_manager.read_dataframe(query=query, params=tuple(params), chunksize=chunksize)
+            if chunksize is None:
+                self.logger.info(f"成功获取股票 {stock_code} 的 {len(df)} 条技术指标数据")
             return df
         except Exception as e:
             self.logger.error(f"获取技术指标数据失败: {str(e)}")
             raise
-        finally:
-            self.disconnect()
 
 
 # 使用示例
@@ -367,4 +730,6 @@ if __name__ == '__main__':
         storage.save_analysis_result(sample_result)
         print("分析结果保存成功")
     except Exception as e:
-        print(f"分析结果保存失败: {str(e)}")
\ No newline at end of file
+        print(f"分析结果保存失败: {str(e)}")
+    finally:
+        storage.close()
\ No newline at end of file
@@ -1,4 +1,5 @@
-import random
+from collections import defaultdict
+import numpy as np
 import pandas as pd
 from log_utils import setup_logger, get_logger
 
@@ -14,6 +15,13 @@ log_config = {
 setup_logger(log_config)
 logger = get_logger('sampling_module')
 
+# 股票代码前缀（含分隔符）到所属市场的映射，其他前缀归为'other'
+MARKET_PREFIXES = {
+    'sh.': 'shanghai',
+    'sz.': 'shenzhen',
+    'bj.': 'beijing'
+}
+
 
 class SamplingModule:
     """
@@ -21,11 +29,16 @@ class SamplingModule:
     支持随机抽样和分层抽样
     """
     
-    def __init__(self):
+    def __init__(self, seed: int = None):
         """
         初始化抽样模块
+        
+        Args:
+            seed: 随机种子，默认None（每次运行结果不同），固定后抽样结果可复现
         """
         self.logger = logger
+        # 随机抽样和分层抽样共用的numpy随机数生成器，只在初始化时创建一次
+        self._rng = np.random.default_rng(seed)
         self.logger.info("抽样模块已初始化")
     
     def random_sampling(self, stock_codes: list, ratio: float = 0.1, max_samples: int = None) -> list:
@@ -56,8 +69,8 @@ class SamplingModule:
             # 确保至少返回1只股票（如果有股票的话）
             sample_size = max(1, sample_size)
             
-            # 随机抽样
-            sampled_stocks = random.sample(stock_codes, sample_size)
+            # 随机抽样：只抽取下标再按下标取股票代码，不复制整个列表
+            sampled_stocks = [stock_codes[i] for i in self._rng.choice(total_stocks, sample_size, replace=False).tolist()]
             
             self.logger.info(f"随机抽样完成，从 {total_stocks} 只股票中抽取了 {len(sampled_stocks)} 只")
             return sampled_stocks
@@ -87,47 +100,54 @@ class SamplingModule:
                 self.logger.warning("股票代码列表为空，返回空列表")
                 return []
             
-            # 如果没有提供股票信息字典，默认按市场分层
+            # 如果没有提供股票信息字典，默认按股票代码前缀判断市场并分层：
+            # 截取前3个字符作为前缀，只对去重后的少数几个前缀查表，再把前缀编号映射为市场编号，
+            # 不构建中间的股票信息字典
             if not stock_info_dict:
-                stock_info_dict = {}
+                codes = np.asarray(stock_codes, dtype=str)
+                if stratify_by == 'market':
+                    prefixes, prefix_inverse = np.unique(codes.astype('U3'), return_inverse=True)
+                    strata_keys, market_inverse = np.unique(
+                        [MARKET_PREFIXES.get(prefix, 'other') for prefix in prefixes.tolist()], return_inverse=True
+                    )
+                    inverse = market_inverse[prefix_inverse]
+                else:
+                    # 默认信息中只有市场字段，按其他字段分层时全部归入'unknown'
+                    strata_keys = np.asarray(['unknown'])
+                    inverse = np.zeros(len(codes), dtype=np.intp)
+                
+                # 按分层编号稳定排序后同一分层的股票连续排列，按各层数量切分
+                grouped_codes = codes[np.argsort(inverse, kind='stable')].tolist()
+                ends = np.cumsum(np.bincount(inverse, minlength=len(strata_keys))).tolist()
+                strata = {
+                    key: grouped_codes[start:end]
+                    for key, start, end in zip(strata_keys.tolist(), [0] + ends[:-1], ends)
+                }
+            else:
+                # 只对股票信息字典中存在的股票分层，每只股票只查一次字典
+                strata = defaultdict(list)
+                get_info = stock_info_dict.get
                 for code in stock_codes:
-                    # 根据股票代码前缀判断市场
-                    if code.startswith('sh.'):
-                        market = 'shanghai'
-                    elif code.startswith('sz.'):
-                        market = 'shenzhen'
-                    else:
-                        market = 'other'
-                    stock_info_dict[code] = {'market': market}
-            
-            # 按分层依据分组
-            strata = {}
-            for code in stock_codes:
-                if code in stock_info_dict:
-                    key = stock_info_dict[code].get(stratify_by, 'unknown')
-                    if key not in strata:
-                        strata[key] = []
-                    strata[key].append(code)
+                    info = get_info(code)
+                    if info is not None:
+                        strata[info.get(stratify_by, 'unknown')].append(code)
             
             sampled_stocks = []
             
             # 对每个分层进行抽样
-            for key, codes in strata.items():
+            for codes in strata.values():
                 # 计算该分层的抽样数量
-                stratum_size = len(codes)
-                sample_size = int(stratum_size * ratio)
-                sample_size = max(1, sample_size)  # 每层至少抽取1只股票
+                sample_size = max(1, int(len(codes) * ratio))  # 每层至少抽取1只股票
                 
-                # 随机抽样
-                stratum_samples = random.sample(codes, sample_size)
-                sampled_stocks.extend(stratum_samples)
+                # 随机抽样：只抽取下标再按下标取股票代码
+                sampled_stocks.extend(codes[i] for i in self._rng.choice(len(codes), sample_size, replace=False).tolist())
             
             # 如果设置了最大样本数，随机选择指定数量
             if max_samples and len(sampled_stocks) > max_samples:
-                sampled_stocks = random.sample(sampled_stocks, max_samples)
+                sampled_stocks = [sampled_stocks[i] for i in self._rng.choice(len(sampled_stocks), max_samples, replace=False).tolist()]
             
             self.logger.info(f"分层抽样完成，从 {total_stocks} 只股票中抽取了 {len(sampled_stocks)} 只")
-            self.logger.debug(f"分层抽样详情: {strata}")
+            self.logger.debug(f"分层抽样详情: { {key: len(codes) for key, codes in strata.items()} }")
             return sampled_stocks
         except Exception as e:
             self.logger.error(f"分层抽样失败: {str(e)}")
@@ -173,7 +193,8 @@ class SamplingModule:
             self.logger.error(f"抽样失败: {str(e)}")
             raise
     
-    def batch_sample(self, stock_data_dict: dict, mode: str = 'random', config: dict = None) -> dict:
+    def batch_sample(self, stock_data_dict: dict, mode: str = 'random', config: dict = None,
+                     lazy: bool = False) -> dict:
         """
         批量抽样
         
@@ -181,19 +202,20 @@ class SamplingModule:
             stock_data_dict: 以股票代码为键，DataFrame为值的字典
             mode: 抽样模式，'random'（随机抽样）或'stratified'（分层抽样），默认'random'
             config: 抽样配置字典
+            lazy: 是否返回(股票代码, DataFrame)迭代器而不构建新字典，默认False
             
         Returns:
-            抽样后的股票数据字典
+            抽样后的股票数据字典，lazy为True时为(股票代码, DataFrame)元组的迭代器
         """
         try:
-            stock_codes = list(stock_data_dict.keys())
-            sampled_codes = self.sample(stock_codes, mode, config)
+            sampled_codes = self.sample(list(stock_data_dict), mode, config)
+            self.logger.info(f"批量抽样完成，从 {len(stock_data_dict)} 只股票中抽取了 {len(sampled_codes)} 只")
             
-            # 构建抽样后的字典
-            sampled_data_dict = {code: stock_data_dict[code] for code in sampled_codes}
+            if lazy:
+                return ((code, stock_data_dict[code]) for code in sampled_codes)
             
-            self.logger.info(f"批量抽样完成，从 {len(stock_codes)} 只股票中抽取了 {len(sampled_data_dict)} 只")
-            return sampled_data_dict
+            # 构建抽样后的字典
+            return {code: stock_data_dict[code] for code in sampled_codes}
         except Exception as e:
             self.logger.error(f"批量抽样失败: {str(e)}")
             raise
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据表结构定义模块
+集中定义history_k_data表的字段及类型，供数据获取器和建表脚本共用，避免多处维护同一份字段列表
+"""
+
+# history_k_data表字段及SQLite类型，顺序即Baostock查询字段顺序
+HISTORY_K_DATA_COLUMNS = {
+    'date': 'TEXT',
+    'code': 'TEXT',
+    'open': 'REAL',
+    'high': 'REAL',
+    'low': 'REAL',
+    'close': 'REAL',
+    'preclose': 'REAL',
+    'volume': 'REAL',
+    'amount': 'REAL',
+    'adjustflag': 'TEXT',
+    'turn': 'REAL',
+    'tradestatus': 'TEXT',
+    'pctChg': 'REAL',
+    'peTTM': 'REAL',
+    'pbMRQ': 'REAL',
+    'psTTM': 'REAL',
+    'pcfNcfTTM': 'REAL',
+    'isST': 'TEXT'
+}
+
+# history_k_data表字段列表
+FIELDS = tuple(HISTORY_K_DATA_COLUMNS)
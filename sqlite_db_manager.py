@@ -7,6 +7,8 @@ SQLite数据库管理类
 """
 
 import sqlite3
+import threading
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 # 尝试导入pandas，用于DataFrame操作
@@ -18,42 +20,200 @@ except ImportError:
 # 导入日志工具
 from log_utils import get_logger
 
+# SQLite单条语句允许绑定的参数个数上限（3.32.0之前的默认值），多行INSERT按此限制每批行数
+SQLITE_MAX_VARIABLES = 999
+
+# 每个连接缓存的预编译语句数量（sqlite3默认为128），批量处理中反复执行的参数化语句可直接复用
+SQLITE_CACHED_STATEMENTS = 256
+
+# 连接建立后默认设置的PRAGMA：WAL日志加synchronous=NORMAL，读写可以并发且提交时不再每次同步刷盘；
+# 临时表放在内存中，页缓存扩大到64MB（负数表示单位为KB），读取时使用256MB的内存映射，
+# 数据库被锁定时最多等待30秒
+WRITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'busy_timeout': 30000
+}
+
+# 批量导入场景的PRAGMA设置：在WRITE_PRAGMAS基础上关闭同步刷盘，断电时可能丢失最近提交的数据
+BULK_LOAD_PRAGMAS = dict(WRITE_PRAGMAS, synchronous='OFF')
+
+
+@lru_cache(maxsize=256)
+def _build_insert_sql(table_name: str, columns: Tuple[str, ...], on_conflict: Optional[str] = None) -> str:
+    """
+    构建参数化的INSERT语句，同一表、列组合和冲突处理方式只构建一次，所有实例共享
+    
+    Args:
+        table_name: 表名
+        columns: 列名元组
+        on_conflict: 约束冲突时的处理方式，如'IGNORE'、'REPLACE'，默认None（报错）
+        
+    Returns:
+        参数化的INSERT语句
+    """
+    verb = f'INSERT OR {on_conflict}' if on_conflict else 'INSERT'
+    return f'{verb} INTO {table_name} ({", ".join(columns)}) VALUES ({", ".join(["?"] * len(columns))})'
+
+
+@lru_cache(maxsize=256)
+def _build_update_sql(table_name: str, columns: Tuple[str, ...], where_clause: str) -> str:
+    """
+    构建参数化的UPDATE语句，同一表、列组合和WHERE子句只构建一次，所有实例共享
+    
+    Args:
+        table_name: 表名
+        columns: 要更新的列名元组
+        where_clause: WHERE子句
+        
+    Returns:
+        参数化的UPDATE语句
+    """
+    query = f'UPDATE {table_name} SET {", ".join([f"{col} = ?" for col in columns])}'
+    if where_clause:
+        query += f' WHERE {where_clause}'
+    return query
+
+
+@lru_cache(maxsize=256)
+def _build_select_sql(table_name: str, columns_str: str, where_clause: str, order_by: str,
+                      limit: int, offset: int) -> str:
+    """
+    构建SELECT语句，相同参数只构建一次，所有实例共享
+    
+    Args:
+        table_name: 表名
+        columns_str: 列表达式
+        where_clause: WHERE子句
+        order_by: ORDER BY子句
+        limit: LIMIT子句
+        offset: OFFSET子句
+        
+    Returns:
+        SELECT语句
+    """
+    query = f'SELECT {columns_str} FROM {table_name}'
+    
+    # 添加WHERE子句
+    if where_clause:
+        query += f' WHERE {where_clause}'
+    
+    # 添加ORDER BY子句
+    if order_by:
+        query += f' ORDER BY {order_by}'
+    
+    # 添加LIMIT子句
+    if limit > 0:
+        query += f' LIMIT {limit}'
+        # 添加OFFSET子句
+        if offset > 0:
+            query += f' OFFSET {offset}'
+    
+    return query
+
+
+def _apply_dtype_map(df: 'pd.DataFrame', dtype_map: Dict[str, Any]) -> 'pd.DataFrame':
+    """
+    按列转换DataFrame的类型，DataFrame中不存在的列忽略
+    
+    Args:
+        df: 要转换的DataFrame
+        dtype_map: 列名到目标类型的映射
+        
+    Returns:
+        转换后的DataFrame
+    """
+    dtypes = {col: dtype for col, dtype in dtype_map.items() if col in df.columns}
+    return df.astype(dtypes) if dtypes else df
+
+
+class _SharedState:
+    """
+    不区分线程的连接状态，与threading.local接口一致，用于内存数据库
+    连接仍按sqlite3默认的check_same_thread建立，只能在建立连接的线程中使用，
+    其他线程使用时sqlite3抛出ProgrammingError，而不是静默打开另一个空的内存数据库
+    """
+
 
 class SQLiteDBManager:
     """SQLite数据库管理类"""
 
-    def __init__(self, db_path: str = ':memory:', log_level: Optional[int] = None):
+    def __init__(self, db_path: str = ':memory:', log_level: Optional[int] = None,
+                 pragmas: Optional[Dict[str, Any]] = None):
         """
         初始化数据库管理器
         
         Args:
-            db_path: 数据库文件路径，默认为内存数据库
+            db_path: 数据库文件路径，默认为内存数据库（内存数据库只能在单个线程中使用）
             log_level: 日志级别，默认使用log_utils配置的级别
+            pragmas: 每次建立连接后设置的PRAGMA，默认为WRITE_PRAGMAS，传入空字典表示不设置
         """
         self.db_path = db_path
+        self.pragmas = WRITE_PRAGMAS if pragmas is None else pragmas
+        # 连接、游标和事务状态按线程保存，每个线程首次读写时各自建立连接，
+        # 多线程可共享同一个管理器实例并发读取；内存数据库的连接之间不共享数据，
+        # 只保存一个连接且只能在建立连接的线程中使用，不支持多线程
+        self._local = _SharedState() if db_path == ':memory:' else threading.local()
         self.conn = None
         self.cursor = None
+        # 是否处于begin_transaction开启的显式事务中，事务内的写操作不再逐条提交
+        self._in_txn = False
         
         # 获取日志记录器
         self.logger = get_logger('SQLiteDBManager')
         # 日志级别已由log_utils统一配置，无需单独设置
     
+    @property
+    def conn(self) -> Optional[sqlite3.Connection]:
+        """当前线程的数据库连接，未连接时为None"""
+        return getattr(self._local, 'conn', None)
+    
+    @conn.setter
+    def conn(self, value: Optional[sqlite3.Connection]) -> None:
+        self._local.conn = value
+    
+    @property
+    def cursor(self) -> Optional[sqlite3.Cursor]:
+        """当前线程的游标，未连接时为None"""
+        return getattr(self._local, 'cursor', None)
+    
+    @cursor.setter
+    def cursor(self, value: Optional[sqlite3.Cursor]) -> None:
+        self._local.cursor = value
+    
+    @property
+    def _in_txn(self) -> bool:
+        """当前线程是否处于begin_transaction开启的显式事务中"""
+        return getattr(self._local, 'in_txn', False)
+    
+    @_in_txn.setter
+    def _in_txn(self, value: bool) -> None:
+        self._local.in_txn = value
+    
     def connect(self) -> None:
-        """建立数据库连接"""
+        """建立当前线程的数据库连接"""
         try:
             # 创建数据库连接
-            self.conn = sqlite3.connect(self.db_path)
+            # 扩大预编译语句缓存，相同的SQL文本不再重新解析
+            self.conn = sqlite3.connect(self.db_path, cached_statements=SQLITE_CACHED_STATEMENTS)
             # 设置行返回为字典形式
             self.conn.row_factory = sqlite3.Row
             # 创建游标
             self.cursor = self.conn.cursor()
-            self.logger.info(f'成功连接到数据库: {self.db_path}')
+            self.logger.info('成功连接到数据库: %s', self.db_path)
+            
+            # 设置连接级别的PRAGMA
+            if self.pragmas:
+                self.apply_pragmas(self.pragmas)
         except sqlite3.Error as e:
-            self.logger.error(f'数据库连接失败: {str(e)}')
+            self.logger.error('数据库连接失败: %s', e)
             raise
     
     def disconnect(self) -> None:
-        """关闭数据库连接"""
+        """关闭当前线程的数据库连接"""
         try:
             if self.cursor:
                 self.cursor.close()
@@ -61,11 +221,45 @@ class SQLiteDBManager:
             if self.conn:
                 self.conn.close()
                 self.conn = None
+            self._in_txn = False
             self.logger.info('数据库连接已关闭')
         except sqlite3.Error as e:
-            self.logger.error(f'关闭数据库连接时出错: {str(e)}')
+            self.logger.error('关闭数据库连接时出错: %s', e)
             raise
     
+    def apply_pragmas(self, pragmas: Optional[Dict[str, Any]] = None) -> None:
+        """
+        在当前连接上设置PRAGMA
+        
+        Args:
+            pragmas: PRAGMA名称到取值的字典，默认为WRITE_PRAGMAS
+        """
+        try:
+            if not self.conn:
+                self.connect()
+            for name, value in (pragmas or WRITE_PRAGMAS).items():
+                # 内存数据库不支持WAL日志
+                if name == 'journal_mode' and self.db_path == ':memory:':
+                    continue
+                self.conn.execute(f'PRAGMA {name}={value}')
+            self.logger.info('已设置PRAGMA: %s', pragmas or WRITE_PRAGMAS)
+        except sqlite3.Error as e:
+            self.logger.error('设置PRAGMA失败: %s', e)
+            raise
+    
+    def _commit(self) -> None:
+        """提交当前写操作，处于显式事务中时推迟到commit_transaction统一提交"""
+        if not self._in_txn:
+            self.conn.commit()
+    
+    def _rollback(self) -> None:
+        """
+        写操作失败时回滚未提交的修改；处于显式事务中时不回滚，失败的语句已由SQLite单独撤销，
+        事务中此前的修改保留，由调用方决定commit_transaction或rollback_transaction
+        """
+        if self.conn and not self._in_txn:
+            self.conn.rollback()
+    
     def execute_query(self, query: str, params: Optional[Tuple] = None) -> Any:
         """
         执行SQL查询
@@ -88,9 +282,9 @@ class SQLiteDBManager:
                 
             return result
         except sqlite3.Error as e:
-            self.logger.error(f'执行查询失败: {str(e)}')
-            self.logger.error(f'SQL: {query}')
-            self.logger.error(f'参数: {params}')
+            self.logger.error('执行查询失败: %s', e)
+            self.logger.error('SQL: %s', query)
+            self.logger.error('参数: %s', params)
             raise
     
     def fetch_one(self, query: str, params: Optional[Tuple] = None) -> Optional[Dict[str, Any]]:
@@ -127,6 +321,36 @@ class SQLiteDBManager:
         # 转换为字典列表
         return [dict(row) for row in rows]
     
+    def fetch_all_tuples(self, query: str, params: Optional[Tuple] = None) -> Tuple[List[str], List[Tuple]]:
+        """
+        获取所有查询结果，结果行为元组，不为每行构建字典
+        
+        Args:
+            query: SQL查询语句
+            params: 查询参数
+            
+        Returns:
+            (列名列表, 行元组列表)
+        """
+        try:
+            if not self.conn:
+                self.connect()
+            
+            # 使用单独的游标并关闭行工厂，直接返回sqlite3产生的元组
+            cursor = self.conn.cursor()
+            cursor.row_factory = None
+            try:
+                cursor.execute(query, params or ())
+                columns = [desc[0] for desc in cursor.description]
+                return columns, cursor.fetchall()
+            finally:
+                cursor.close()
+        except sqlite3.Error as e:
+            self.logger.error('执行查询失败: %s', e)
+            self.logger.error('SQL: %s', query)
+            self.logger.error('参数: %s', params)
+            raise
+    
     def execute_update(self, query: str, params: Optional[Tuple] = None) -> int:
         """
         执行更新操作（INSERT、UPDATE、DELETE）
@@ -148,28 +372,55 @@ class SQLiteDBManager:
                 self.cursor.execute(query)
                 
             # 提交事务
-            self.conn.commit()
+            self._commit()
             
             # 返回影响的行数
             return self.cursor.rowcount
+        except sqlite3.Error as e:
+            # 发生错误时回滚事务
+            self._rollback()
+            self.logger.error('执行更新操作失败: %s', e)
+            self.logger.error('SQL: %s', query)
+            self.logger.error('参数: %s', params)
+            raise
+    
+    def execute_script(self, script: str) -> None:
+        """
+        执行由多条SQL语句组成的脚本（如批量建表、建索引）
+        
+        Args:
+            script: 以分号分隔的SQL脚本
+        """
+        try:
+            if not self.conn:
+                self.connect()
+            
+            self.cursor.executescript(script)
+            
+            # 提交事务
+            self.conn.commit()
         except sqlite3.Error as e:
             # 发生错误时回滚事务
             if self.conn:
                 self.conn.rollback()
-            self.logger.error(f'执行更新操作失败: {str(e)}')
-            self.logger.error(f'SQL: {query}')
-            self.logger.error(f'参数: {params}')
+            self.logger.error('执行SQL脚本失败: %s', e)
+            self.logger.error('SQL: %s', script)
             raise
     
     def begin_transaction(self) -> None:
-        """开始事务"""
+        """
+        开始事务
+        使用BEGIN IMMEDIATE立即获取写锁，避免WAL模式下事务中途升级写锁时出现SQLITE_BUSY；
+        提交或回滚前，execute_update和insert_many等写操作不再逐条提交
+        """
         try:
             if not self.conn:
                 self.connect()
-            self.execute_query('BEGIN TRANSACTION')
+            self.execute_query('BEGIN IMMEDIATE')
+            self._in_txn = True
             self.logger.info('事务已开始')
         except sqlite3.Error as e:
-            self.logger.error(f'开始事务失败: {str(e)}')
+            self.logger.error('开始事务失败: %s', e)
             raise
     
     def commit_transaction(self) -> None:
@@ -178,9 +429,10 @@ class SQLiteDBManager:
             if not self.conn:
                 raise sqlite3.ProgrammingError('未连接到数据库')
             self.conn.commit()
+            self._in_txn = False
             self.logger.info('事务已提交')
         except sqlite3.Error as e:
-            self.logger.error(f'提交事务失败: {str(e)}')
+            self.logger.error('提交事务失败: %s', e)
             raise
     
     def rollback_transaction(self) -> None:
@@ -189,28 +441,72 @@ class SQLiteDBManager:
             if not self.conn:
                 raise sqlite3.ProgrammingError('未连接到数据库')
             self.conn.rollback()
+            self._in_txn = False
             self.logger.info('事务已回滚')
         except sqlite3.Error as e:
-            self.logger.error(f'回滚事务失败: {str(e)}')
+            self.logger.error('回滚事务失败: %s', e)
             raise
     
-    def create_table(self, table_name: str, columns: Dict[str, str]) -> None:
+    @staticmethod
+    def build_create_table_sql(table_name: str, columns: Dict[str, str]) -> str:
         """
-        创建表
+        构建CREATE TABLE语句
         
         Args:
             table_name: 表名
             columns: 列定义，格式为 {列名: 列类型}
+            
+        Returns:
+            CREATE TABLE IF NOT EXISTS语句
         """
-        # 构建CREATE TABLE语句
         columns_def = ', '.join([f'{col} {col_type}' for col, col_type in columns.items()])
-        query = f'CREATE TABLE IF NOT EXISTS {table_name} ({columns_def})'
+        return f'CREATE TABLE IF NOT EXISTS {table_name} ({columns_def})'
+    
+    @staticmethod
+    def build_create_index_sql(table_name: str, columns: Tuple[str, ...], unique: bool = False) -> str:
+        """
+        构建CREATE INDEX语句，索引名为idx_表名_列名
+        
+        Args:
+            table_name: 表名
+            columns: 索引列元组，顺序即索引键顺序
+            unique: 是否为唯一索引
+            
+        Returns:
+            CREATE INDEX IF NOT EXISTS语句
+        """
+        index_name = f'idx_{table_name}_{"_".join(columns)}'
+        verb = 'CREATE UNIQUE INDEX' if unique else 'CREATE INDEX'
+        return f'{verb} IF NOT EXISTS {index_name} ON {table_name}({", ".join(columns)})'
+    
+    def create_table(self, table_name: str, columns: Dict[str, str],
+                     indexes: Optional[List[Tuple[str, ...]]] = None) -> None:
+        """
+        创建表
+        
+        Args:
+            table_name: 表名
+            columns: 列定义，格式为 {列名: 列类型}
+            indexes: 要创建的索引列表（可选），每项为一个索引的列名元组，如[('code', 'date')]
+        """
+        query = self.build_create_table_sql(table_name, columns)
         
         try:
             self.execute_update(query)
-            self.logger.info(f'表 {table_name} 已创建或已存在')
+            for index_columns in indexes or []:
+                self.execute_update(self.build_create_index_sql(table_name, tuple(index_columns)))
+            self.logger.info('表 %s 已创建或已存在', table_name)
+        except sqlite3.Error as e:
+            self.logger.error('创建表失败: %s', e)
+            raise
+    
+    def analyze(self) -> None:
+        """收集表和索引的统计信息，供查询优化器选择索引，批量导入数据后调用"""
+        try:
+            self.execute_update('ANALYZE')
+            self.logger.info('已更新数据库统计信息')
         except sqlite3.Error as e:
-            self.logger.error(f'创建表失败: {str(e)}')
+            self.logger.error('更新数据库统计信息失败: %s', e)
             raise
     
     def insert(self, table_name: str, data: Dict[str, Any]) -> int:
@@ -224,12 +520,59 @@ class SQLiteDBManager:
         Returns:
             插入的行数
         """
-        # 构建INSERT语句
-        columns = ', '.join(data.keys())
-        placeholders = ', '.join(['?'] * len(data))
-        query = f'INSERT INTO {table_name} ({columns}) VALUES ({placeholders})'
+        return self.insert_many(table_name, tuple(data), [tuple(data.values())])
+    
+    def insert_records(self, table_name: str, records: List[Dict[str, Any]],
+                       on_conflict: Optional[str] = None) -> int:
+        """
+        批量插入字典形式的数据，列名取自第一条记录，其他记录缺少的列写入NULL
         
-        return self.execute_update(query, tuple(data.values()))
+        Args:
+            table_name: 表名
+            records: 要插入的数据列表，每条格式为 {列名: 值}
+            on_conflict: 约束冲突时的处理方式，如'IGNORE'、'REPLACE'，默认None（报错）
+            
+        Returns:
+            插入的行数
+        """
+        if not records:
+            return 0
+        columns = tuple(records[0])
+        rows = [tuple(record.get(col) for col in columns) for record in records]
+        return self.insert_many(table_name, columns, rows, on_conflict)
+    
+    def insert_many(self, table_name: str, columns: List[str], rows: List[Tuple],
+                    on_conflict: Optional[str] = None) -> int:
+        """
+        批量插入数据，所有行通过一次executemany写入并在同一个事务中提交
+        
+        Args:
+            table_name: 表名
+            columns: 列名列表
+            rows: 要插入的数据，每行为与columns顺序一致的元组
+            on_conflict: 约束冲突时的处理方式，如'IGNORE'、'REPLACE'，默认None（报错）
+            
+        Returns:
+            插入的行数
+        """
+        query = _build_insert_sql(table_name, tuple(columns), on_conflict)
+        try:
+            if not self.conn:
+                self.connect()
+            
+            self.cursor.executemany(query, rows)
+            
+            # 提交事务
+            self._commit()
+            
+            # 返回影响的行数
+            return self.cursor.rowcount
+        except sqlite3.Error as e:
+            # 发生错误时回滚事务
+            self._rollback()
+            self.logger.error('批量插入数据失败: %s', e)
+            self.logger.error('SQL: %s', query)
+            raise
     
     def update(self, table_name: str, data: Dict[str, Any], where_clause: str = '', 
                where_params: Optional[Tuple] = None) -> int:
@@ -246,17 +589,12 @@ class SQLiteDBManager:
             更新的行数
         """
         # 构建UPDATE语句
-        set_clause = ', '.join([f'{col} = ?' for col in data.keys()])
-        query = f'UPDATE {table_name} SET {set_clause}'
+        query = _build_update_sql(table_name, tuple(data), where_clause)
         
         # 组合参数
         params = list(data.values())
-        
-        # 添加WHERE子句
-        if where_clause:
-            query += f' WHERE {where_clause}'
-            if where_params:
-                params.extend(where_params)
+        if where_clause and where_params:
+            params.extend(where_params)
         
         return self.execute_update(query, tuple(params))
     
@@ -307,22 +645,7 @@ class SQLiteDBManager:
             columns_str = columns
         
         # 构建SELECT语句
-        query = f'SELECT {columns_str} FROM {table_name}'
-        
-        # 添加WHERE子句
-        if where_clause:
-            query += f' WHERE {where_clause}'
-        
-        # 添加ORDER BY子句
-        if order_by:
-            query += f' ORDER BY {order_by}'
-        
-        # 添加LIMIT子句
-        if limit > 0:
-            query += f' LIMIT {limit}'
-            # 添加OFFSET子句
-            if offset > 0:
-                query += f' OFFSET {offset}'
+        query = _build_select_sql(table_name, columns_str, where_clause, order_by, limit, offset)
         
         return self.fetch_all(query, where_params)
     
@@ -336,13 +659,14 @@ class SQLiteDBManager:
         query = f'DROP TABLE IF EXISTS {table_name}'
         try:
             self.execute_update(query)
-            self.logger.info(f'表 {table_name} 已删除或不存在')
+            self.logger.info('表 %s 已删除或不存在', table_name)
         except sqlite3.Error as e:
-            self.logger.error(f'删除表失败: {str(e)}')
+            self.logger.error('删除表失败: %s', e)
             raise
     
     def write_dataframe(self, df: 'pd.DataFrame', table_name: str, 
-                        if_exists: str = 'append', index: bool = False) -> None:
+                        if_exists: str = 'append', index: bool = False,
+                        method: Optional[str] = None, chunksize: Optional[int] = None) -> None:
         """
         将pandas DataFrame写入数据库表
         
@@ -354,6 +678,10 @@ class SQLiteDBManager:
                       - 'replace': 替换已存在的表
                       - 'append': 向已存在的表追加数据
             index: 是否将DataFrame的索引写入表中
+            method: 插入方式，透传给DataFrame.to_sql，'multi'表示每批数据用一条多行INSERT写入，
+                    默认为None（逐行INSERT）
+            chunksize: 每批写入的行数，默认为None（一次写入全部数据）；
+                       method为'multi'时会限制在SQLite参数个数上限以内
         """
         if pd is None:
             raise ImportError('pandas未安装，请使用pip install pandas安装')
@@ -365,6 +693,19 @@ class SQLiteDBManager:
             if not self.conn:
                 self.connect()
                 
+            # 向已存在的表追加数据时直接按列转换为Python对象后executemany写入，
+            # 不经过to_sql，避免其在内部自行提交而打断begin_transaction开启的显式事务；
+            # 日期时间列需要to_sql做类型转换，仍走to_sql
+            if (if_exists == 'append' and method is None and not index
+                    and not any(kind in 'mM' for kind in df.dtypes.map(lambda t: t.kind))
+                    and self.fetch_one("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                                       (table_name,))):
+                # float列中的NaN由SQLite按NULL存储
+                rows = zip(*(df[col].tolist() for col in df.columns))
+                self.insert_many(table_name, [str(col) for col in df.columns], rows)
+                self.logger.info('成功将DataFrame写入表 %s', table_name)
+                return
+            
             # 使用pandas的to_sql方法写入数据
             # 只对字符串类型的列指定dtype，其他列使用默认类型
             dtype_dict = {}
@@ -372,22 +713,28 @@ class SQLiteDBManager:
                 if df[col].dtype == 'object':
                     dtype_dict[col] = 'TEXT'
             
+            # 多行INSERT的参数个数为行数乘以列数，每批行数不能超过SQLite的参数个数上限
+            if method == 'multi':
+                max_rows = max(1, SQLITE_MAX_VARIABLES // (len(df.columns) + int(index)))
+                chunksize = min(chunksize, max_rows) if chunksize else max_rows
+            
             df.to_sql(table_name, self.conn, if_exists=if_exists, index=index, 
-                     dtype=dtype_dict)
+                     dtype=dtype_dict, method=method, chunksize=chunksize)
             
             # 手动提交事务
-            self.conn.commit()
-            self.logger.info(f'成功将DataFrame写入表 {table_name}')
+            self._commit()
+            self.logger.info('成功将DataFrame写入表 %s', table_name)
         except Exception as e:
             # 发生错误时回滚事务
-            if self.conn:
-                self.conn.rollback()
-            self.logger.error(f'将DataFrame写入表 {table_name} 失败: {str(e)}')
+            self._rollback()
+            self.logger.error('将DataFrame写入表 %s 失败: %s', table_name, e)
             raise
     
     def read_dataframe(self, table_name: str = None, columns: Optional[List[str]] = None, 
                       where_clause: str = '', where_params: Optional[Tuple] = None, 
-                      query: str = None, params: Optional[Tuple] = None) -> 'pd.DataFrame':
+                      query: str = None, params: Optional[Tuple] = None,
+                      chunksize: Optional[int] = None,
+                      dtype_map: Optional[Dict[str, Any]] = None) -> 'pd.DataFrame':
         """
         从数据库表读取数据到pandas DataFrame
         
@@ -398,9 +745,12 @@ class SQLiteDBManager:
             where_params: WHERE子句的参数（如果提供params参数，则忽略此参数）
             query: 完整的SQL查询语句（可选，优先级高于table_name等参数）
             params: 查询参数（可选，优先级高于where_params）
+            chunksize: 每批读取的行数（可选），指定时返回逐批产生DataFrame的迭代器
+            dtype_map: 列名到目标类型的映射（可选），如{'close': 'float32'}，结果中不存在的列忽略；
+                       默认不转换，数值列保持float64/int64，需要全精度的计算（如长周期夏普比率）不应降精度
             
         Returns:
-            包含查询结果的pandas DataFrame
+            包含查询结果的pandas DataFrame，指定chunksize时为DataFrame迭代器
         """
         if pd is None:
             raise ImportError('pandas未安装，请使用pip install pandas安装')
@@ -428,12 +778,21 @@ class SQLiteDBManager:
                     
                 final_params = where_params
             
-            # 使用pandas的read_sql方法读取数据
-            df = pd.read_sql(final_query, self.conn, params=final_params)
-            self.logger.info(f'成功执行查询并读取数据到DataFrame')
+            if chunksize:
+                # 分批读取交给pandas的read_sql
+                df = pd.read_sql(final_query, self.conn, params=final_params, chunksize=chunksize)
+                if dtype_map:
+                    df = (_apply_dtype_map(chunk, dtype_map) for chunk in df)
+            else:
+                # 以元组形式取回全部行后直接按列构建DataFrame，不经过sqlite3.Row对象和read_sql的逐行转换
+                columns, rows = self.fetch_all_tuples(final_query, final_params)
+                df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                if dtype_map:
+                    df = _apply_dtype_map(df, dtype_map)
+            self.logger.info('成功执行查询并读取数据到DataFrame')
             return df
         except Exception as e:
-            self.logger.error(f'从数据库读取数据失败: {str(e)}')
+            self.logger.error('从数据库读取数据失败: %s', e)
             raise
 
 
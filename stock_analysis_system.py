@@ -1,5 +1,11 @@
 import json
+import os
 import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+import pandas as pd
 from stock_data_reader import StockDataReader
 from technical_indicator_calculator import TechnicalIndicatorCalculator
 from traditional_analysis_engine import TraditionalAnalysisEngine
@@ -22,6 +28,28 @@ log_config = {
 setup_logger(log_config)
 logger = get_logger('stock_analysis_system')
 
+# 批量分析时每批读取历史数据和写入技术指标的股票数
+ANALYSIS_BATCH_SIZE = 200
+
+# 批量回测时启用多进程的最少策略数，策略较少时进程启动的开销大于并行收益
+PARALLEL_BACKTEST_MIN_STRATEGIES = 4
+
+
+@lru_cache(maxsize=4)
+def _read_config_text(config_path: str, mtime_ns: int) -> str:
+    """
+    读取配置文件内容，以文件路径和修改时间为键缓存，文件修改后自动重新读取
+    
+    Args:
+        config_path: 配置文件路径
+        mtime_ns: 配置文件的修改时间（纳秒）
+        
+    Returns:
+        配置文件文本
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
 
 class StockAnalysisSystem:
     """
@@ -47,7 +75,7 @@ class StockAnalysisSystem:
         self.indicator_calculator = TechnicalIndicatorCalculator()
         self.traditional_engine = TraditionalAnalysisEngine()
         self.llm_engine = LLMAnalysisEngine(self.config.get('analysis', {}).get('llm', {}))
-        self.sampler = SamplingModule()
+        self.sampler = SamplingModule(self.config.get('analysis', {}).get('sampling', {}).get('seed'))
         self.storage = ResultStorage(self.config.get('output', {}).get('database_path', 'stock_data.db'))
         self.report_generator = ReportGenerator(self.config.get('analysis', {}).get('report', {}).get('save_path', 'reports'))
         self.evaluator = StrategyEvaluator(self.config.get('output', {}).get('database_path', 'stock_data.db'))
@@ -65,8 +93,8 @@ class StockAnalysisSystem:
             配置字典
         """
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            # 缓存的是文件文本，每次解析出新的字典，各实例修改配置时互不影响
+            config = json.loads(_read_config_text(config_path, os.stat(config_path).st_mtime_ns))
             self.logger.info(f"成功加载配置文件: {config_path}")
             return config
         except FileNotFoundError:
@@ -92,44 +120,62 @@ class StockAnalysisSystem:
             # 获取股票数据
             stock_data = self.data_reader.get_stock_data(stock_code)
             
-            if stock_data.empty:
-                self.logger.warning(f"未获取到股票 {stock_code} 的数据")
+            technical_data, result = self._compute_stock_analysis(stock_code, stock_data, use_llm)
+            if technical_data is None:
                 return {}
             
-            # 计算技术指标
-            technical_data = self.indicator_calculator.calculate_all_indicators(stock_data)
-            
             # 保存技术指标到数据库
             self.storage.save_technical_indicators(technical_data)
             
-            # 传统技术分析
-            traditional_result = self.traditional_engine.analyze(technical_data)
-            
-            # 如果使用大模型分析
-            if use_llm:
-                # 准备大模型分析数据
-                latest_data = stock_data.iloc[-1].to_dict()
-                latest_indicators = technical_data.iloc[-1].to_dict()
-                
-                # 大模型分析
-                llm_result = self.llm_engine.analyze_stock(stock_code, latest_data, latest_indicators)
-                
-                # 合并结果
-                traditional_result.update(llm_result)
-            
             # 保存分析结果
-            self.storage.save_analysis_result(traditional_result)
+            self.storage.save_analysis_result(result)
             
             # 生成并保存报告
             if save_report:
-                self.report_generator.generate_and_save_report(stock_code, traditional_result, technical_data)
+                self.report_generator.generate_and_save_report(stock_code, result, technical_data)
             
-            self.logger.info(f"成功分析股票 {stock_code}")
-            return traditional_result
+            self.logger.info("成功分析股票 %s", stock_code)
+            return result
         except Exception as e:
-            self.logger.error(f"分析股票 {stock_code} 失败: {str(e)}")
+            self.logger.error("分析股票 %s 失败: %s", stock_code, e)
             raise
     
+    def _compute_stock_analysis(self, stock_code: str, stock_data: pd.DataFrame, use_llm: bool = False) -> tuple:
+        """
+        基于已读取的历史数据计算单只股票的技术指标和分析结果，不写入数据库
+        
+        Args:
+            stock_code: 股票代码
+            stock_data: 股票历史数据，按日期升序排列
+            use_llm: 是否使用大模型分析
+            
+        Returns:
+            (技术指标DataFrame, 分析结果字典)，没有数据时为(None, {})
+        """
+        if stock_data.empty:
+            self.logger.warning("未获取到股票 %s 的数据", stock_code)
+            return None, {}
+        
+        # 计算技术指标
+        technical_data = self.indicator_calculator.calculate_all_indicators(stock_data)
+        
+        # 传统技术分析
+        traditional_result = self.traditional_engine.analyze(technical_data)
+        
+        # 如果使用大模型分析
+        if use_llm:
+            # 准备大模型分析数据
+            latest_data = stock_data.iloc[-1].to_dict()
+            latest_indicators = technical_data.iloc[-1].to_dict()
+            
+            # 大模型分析
+            llm_result = self.llm_engine.analyze_stock(stock_code, latest_data, latest_indicators)
+            
+            # 合并结果
+            traditional_result.update(llm_result)
+        
+        return technical_data, traditional_result
+    
     def batch_analyze_stocks(self, stock_codes: list = None, use_llm: bool = False, save_reports: bool = True) -> dict:
         """
         批量分析多只股票
@@ -162,13 +208,68 @@ class StockAnalysisSystem:
             
             results = {}
             
-            for stock_code in stock_codes:
-                try:
-                    result = self.analyze_stock(stock_code, use_llm, save_reports)
-                    results[stock_code] = result
-                except Exception as e:
-                    self.logger.error(f"分析股票 {stock_code} 失败: {str(e)}")
-                    continue
+            # 各股票的分析互不依赖，使用线程池并发执行，数据库读写由各线程的独立连接完成；
+            # 每ANALYSIS_BATCH_SIZE只股票的历史数据用一次批量查询读取，技术指标合并后一次写入，
+            # 与逐只分析时的顺序一致，只有技术指标保存成功的股票才保存分析结果和报告
+            max_workers = max(1, min(analysis_config.get('max_workers', 4), len(stock_codes)))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for start in range(0, len(stock_codes), ANALYSIS_BATCH_SIZE):
+                    batch_codes = stock_codes[start:start + ANALYSIS_BATCH_SIZE]
+                    try:
+                        batch_data = self.data_reader.get_multiple_stocks_data(batch_codes)
+                    except Exception as e:
+                        self.logger.error("批量读取 %d 只股票数据失败: %s", len(batch_codes), e)
+                        continue
+                    
+                    futures = [executor.submit(self._compute_stock_analysis, stock_code, batch_data[stock_code],
+                                               use_llm)
+                               for stock_code in batch_codes]
+                    
+                    batch_results = {}
+                    indicator_frames = {}
+                    for stock_code, future in zip(batch_codes, futures):
+                        try:
+                            technical_data, result = future.result()
+                        except Exception as e:
+                            self.logger.error("分析股票 %s 失败: %s", stock_code, e)
+                            continue
+                        if technical_data is None:
+                            results[stock_code] = result
+                        else:
+                            batch_results[stock_code] = result
+                            indicator_frames[stock_code] = technical_data
+                    
+                    if not indicator_frames:
+                        continue
+                    saved_codes = self._save_batch_indicators(indicator_frames)
+                    
+                    # 分析结果由后台线程合并写入，等待本批写完，写入失败的股票视为分析失败，不再生成报告
+                    for stock_code in saved_codes:
+                        try:
+                            self.storage.save_analysis_result(batch_results[stock_code])
+                        except Exception as e:
+                            self.logger.error("分析股票 %s 失败: %s", stock_code, e)
+                            batch_results.pop(stock_code)
+                    for stock_code in self.storage.flush_failures():
+                        if batch_results.pop(stock_code, None) is not None:
+                            self.logger.error("分析股票 %s 失败: 保存分析结果失败", stock_code)
+                    saved_codes = [stock_code for stock_code in saved_codes if stock_code in batch_results]
+                    
+                    futures = {}
+                    if save_reports:
+                        futures = {stock_code: executor.submit(self.report_generator.generate_and_save_report,
+                                                               stock_code, batch_results[stock_code],
+                                                               indicator_frames[stock_code])
+                                   for stock_code in saved_codes}
+                    for stock_code in saved_codes:
+                        try:
+                            if stock_code in futures:
+                                futures[stock_code].result()
+                        except Exception as e:
+                            self.logger.error("分析股票 %s 失败: %s", stock_code, e)
+                            continue
+                        results[stock_code] = batch_results[stock_code]
+                        self.logger.info("成功分析股票 %s", stock_code)
             
             self.logger.info(f"批量分析完成，成功分析 {len(results)} 只股票")
             return results
@@ -176,6 +277,44 @@ class StockAnalysisSystem:
             self.logger.error(f"批量分析股票失败: {str(e)}")
             raise
     
+    def _save_batch_indicators(self, indicator_frames: dict) -> list:
+        """
+        合并保存一批股票的技术指标，整批写入失败时逐只股票重试，
+        仍写入失败的股票视为分析失败
+        
+        Args:
+            indicator_frames: 以股票代码为键，技术指标DataFrame为值的字典
+            
+        Returns:
+            技术指标保存成功的股票代码列表
+        """
+        try:
+            self.storage.save_technical_indicators(pd.concat(indicator_frames.values(), ignore_index=True))
+            return list(indicator_frames)
+        except Exception as e:
+            if len(indicator_frames) == 1:
+                self.logger.error("分析股票 %s 失败: %s", next(iter(indicator_frames)), e)
+                return []
+            self.logger.warning("合并保存 %d 只股票的技术指标失败，逐只重试: %s", len(indicator_frames), e)
+        
+        saved_codes = []
+        for stock_code, technical_data in indicator_frames.items():
+            try:
+                self.storage.save_technical_indicators(technical_data)
+            except Exception as e:
+                self.logger.error("分析股票 %s 失败: %s", stock_code, e)
+                continue
+            saved_codes.append(stock_code)
+        return saved_codes
+    
+    def _flush_storage(self) -> None:
+        """
+        等待后台写入线程写完已提交的分析结果，写入失败的股票只记录日志，不影响之后的读取
+        """
+        failed_codes = self.storage.flush_failures()
+        if failed_codes:
+            self.logger.warning("%d 只股票的分析结果写入失败: %s", len(failed_codes), failed_codes)
+    
     def generate_strategy_comparison(self, strategy_names: list, start_date: str = None, end_date: str = None) -> str:
         """
         生成策略对比报告
@@ -200,9 +339,9 @@ class StockAnalysisSystem:
             report = self.evaluator.generate_comparison_report(strategy_names, start_date, end_date)
             
             # 保存报告到文件
-            report_path = f"{self.report_generator.report_dir}/strategy_comparison_{start_date}_{end_date}.md"
-            with open(report_path, 'w', encoding='utf-8') as f:
-                f.write(report)
+            report_path = os.path.join(self.report_generator.report_dir,
+                                       f"strategy_comparison_{start_date}_{end_date}.md")
+            Path(report_path).write_text(report, encoding='utf-8')
             
             self.logger.info(f"成功生成策略对比报告，保存路径: {report_path}")
             return report
@@ -210,7 +349,8 @@ class StockAnalysisSystem:
             self.logger.error(f"生成策略对比报告失败: {str(e)}")
             raise
     
-    def run_backtest(self, strategy_name: str, start_date: str, end_date: str, stock_codes: list = None) -> dict:
+    def run_backtest(self, strategy_name: str, start_date: str, end_date: str, stock_codes: list = None,
+                     save: bool = True) -> dict:
         """
         回测单个策略
         
@@ -219,15 +359,19 @@ class StockAnalysisSystem:
             start_date: 开始日期
             end_date: 结束日期
             stock_codes: 股票代码列表（可选）
+            save: 是否保存绩效数据，默认True
             
         Returns:
             回测结果字典
         """
         try:
+            # 回测读取分析结果，先等待后台写入完成
+            self._flush_storage()
+            
             # 计算策略绩效
             performance = self.evaluator.calculate_performance(strategy_name, start_date, end_date, stock_codes)
             
-            if performance:
+            if performance and save:
                 # 保存绩效数据
                 self.evaluator.save_performance(performance)
             
@@ -253,14 +397,39 @@ class StockAnalysisSystem:
         try:
             performances = []
             
-            for strategy_name in strategy_names:
-                try:
-                    performance = self.run_backtest(strategy_name, start_date, end_date, stock_codes)
+            # 回测读取分析结果，先等待后台写入完成，子进程才能读到全部已提交的结果
+            self._flush_storage()
+            
+            if len(strategy_names) < PARALLEL_BACKTEST_MIN_STRATEGIES:
+                for strategy_name in strategy_names:
+                    try:
+                        # 绩效数据在全部回测完成后统一批量保存
+                        performance = self.run_backtest(strategy_name, start_date, end_date, stock_codes, save=False)
+                        if performance:
+                            performances.append(performance)
+                    except Exception as e:
+                        self.logger.error(f"回测策略 {strategy_name} 失败: {str(e)}")
+                        continue
+            else:
+                # 各策略的绩效计算互不依赖，分发到多个进程并行执行；
+                # 每个子进程创建自己的策略评估器和数据库连接，绩效数据在主进程中统一保存；
+                # 使用spawn启动子进程，不继承主进程的数据库连接、后台写入线程和锁
+                max_workers = min(os.cpu_count() or 1, len(strategy_names))
+                with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_init_backtest_worker,
+                                         initargs=(self.evaluator.db_path,)) as executor:
+                    futures = [executor.submit(_backtest_worker, strategy_name, start_date, end_date, stock_codes)
+                               for strategy_name in strategy_names]
+                
+                for strategy_name, future in zip(strategy_names, futures):
+                    try:
+                        performance = future.result()
+                    except Exception as e:
+                        self.logger.error(f"回测策略 {strategy_name} 失败: {str(e)}")
+                        continue
                     if performance:
                         performances.append(performance)
-                except Exception as e:
-                    self.logger.error(f"回测策略 {strategy_name} 失败: {str(e)}")
-                    continue
+                        self.logger.info(f"成功回测策略 {strategy_name}")
             
             # 批量保存绩效数据
             if performances:
@@ -273,6 +442,37 @@ class StockAnalysisSystem:
             raise
 
 
+# 子进程中复用的策略评估器，由进程池初始化函数创建
+_worker_evaluator = None
+
+
+def _init_backtest_worker(db_path: str):
+    """
+    回测子进程初始化：每个子进程只创建一次策略评估器，使用自己的数据库连接
+    
+    Args:
+        db_path: 数据库文件路径
+    """
+    global _worker_evaluator
+    _worker_evaluator = StrategyEvaluator(db_path)
+
+
+def _backtest_worker(strategy_name: str, start_date: str, end_date: str, stock_codes: list = None) -> dict:
+    """
+    在子进程中计算单个策略的绩效
+    
+    Args:
+        strategy_name: 策略名称
+        start_date: 开始日期
+        end_date: 结束日期
+        stock_codes: 股票代码列表（可选）
+        
+    Returns:
+        策略绩效指标字典
+    """
+    return _worker_evaluator.calculate_performance(strategy_name, start_date, end_date, stock_codes)
+
+
 # 使用示例
 if __name__ == '__main__':
     # 创建股票分析系统实例
@@ -94,7 +94,7 @@ def init_database(config=None):
             'psTTM': 'REAL',
             'pcfNcfTTM': 'REAL',
             'isST': 'TEXT'
-        })
+        }, indexes=[('code', 'date')])
         logger.info('数据库初始化完成')
         return db_manager
     else:
@@ -302,9 +302,6 @@ def fetch_stock_data(code, start_date, end_date, config=None):
                 logger.debug(f'成功获取股票 {code} 历史数据，共 {len(result)} 条记录')
             else:
                 # 使用akshare获取数据
-                # 创建akshare数据获取器
-                akshare_fetcher = AkShareDataFetcher(config)
-                
                 # 处理股票代码格式，akshare不需要前缀
                 if code.startswith('sh.'):
                     ak_code = code[3:]
@@ -313,8 +310,9 @@ def fetch_stock_data(code, start_date, end_date, config=None):
                 else:
                     ak_code = code
                 
-                # 获取股票数据
-                result = akshare_fetcher.fetch_stock_data(ak_code, start_date, end_date)
+                # 创建akshare数据获取器并获取股票数据，结束时关闭其线程池
+                with AkShareDataFetcher(config) as akshare_fetcher:
+                    result = akshare_fetcher.fetch_stock_data(ak_code, start_date, end_date)
                 logger.debug(f'成功获取股票 {code} 历史数据，共 {len(result)} 条记录')
             
             # 数据校验
@@ -652,6 +650,9 @@ def main():
             combined_df = pd.concat(batch_data, ignore_index=True)
             db_manager.write_dataframe(combined_df, 'history_k_data', if_exists='append')
         
+        # 批量导入完成后更新统计信息，使查询优化器按新的数据分布选择索引
+        db_manager.analyze()
+        
         # 10. 输出统计信息
         logger.info('===== 数据获取统计 =====')
         logger.info(f'总股票数: {total_stocks}')
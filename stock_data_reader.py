@@ -14,6 +14,12 @@ log_config = {
 setup_logger(log_config)
 logger = get_logger('stock_data_reader')
 
+# 价格列降为float32的类型映射，价格只需6-7位有效数字；成交量和成交额超出float32整数精确范围（2^24），保持float64
+PRICE_FLOAT32_DTYPES = {col: 'float32' for col in ('open', 'high', 'low', 'close', 'preclose')}
+
+# 批量读取多只股票时每条查询包含的股票代码数，不超过SQLite单条语句的参数个数上限（999）并为日期参数留出余量
+MAX_CODES_PER_QUERY = 900
+
 
 class StockDataReader:
     """
@@ -65,8 +71,8 @@ class StockDataReader:
         try:
             self.connect()
             query = "SELECT DISTINCT code FROM history_k_data ORDER BY code"
-            result = self.db_manager.fetch_all(query)
-            stock_codes = [item['code'] for item in result]
+            _, rows = self.db_manager.fetch_all_tuples(query)
+            stock_codes = [row[0] for row in rows]
             self.logger.info(f"成功获取 {len(stock_codes)} 个股票代码")
             return stock_codes
         except Exception as e:
@@ -76,7 +82,7 @@ class StockDataReader:
             self.disconnect()
     
     def get_stock_data(self, stock_code: str, start_date: str = None, end_date: str = None, 
-                      limit: int = None, columns: list = None) -> pd.DataFrame:
+                      limit: int = None, columns: list = None, dtype_map: dict = None) -> pd.DataFrame:
         """
         获取单只股票的历史数据
         
@@ -86,6 +92,7 @@ class StockDataReader:
             end_date: 结束日期，格式'YYYY-MM-DD'，默认为None（不限制）
             limit: 返回数据条数限制，默认为None（不限制）
             columns: 要返回的列列表，默认为None（返回所有列）
+            dtype_map: 列名到目标类型的映射，默认为None（不转换），如PRICE_FLOAT32_DTYPES将价格列降为float32
             
         Returns:
             股票历史数据的DataFrame
@@ -118,7 +125,7 @@ class StockDataReader:
                 query += f" LIMIT {limit}"
             
             # 执行查询
-            df = self.db_manager.read_dataframe(query=query, params=params)
+            df = self.db_manager.read_dataframe(query=query, params=params, dtype_map=dtype_map)
             
             # 如果有数据，按日期升序排序
             if not df.empty:
@@ -138,29 +145,78 @@ class StockDataReader:
                                columns: list = None) -> dict:
         """
         获取多只股票的历史数据
+        不限制条数时每MAX_CODES_PER_QUERY只股票用一条IN查询读取，再按股票代码分组，
+        避免逐只股票查询的连接和语句开销
         
         Args:
             stock_codes: 股票代码列表
             start_date: 开始日期，格式'YYYY-MM-DD'，默认为None（不限制）
             end_date: 结束日期，格式'YYYY-MM-DD'，默认为None（不限制）
-            limit: 返回数据条数限制，默认为None（不限制）
+            limit: 每只股票返回数据条数限制，默认为None（不限制）；指定时逐只股票查询
             columns: 要返回的列列表，默认为None（返回所有列）
             
         Returns:
-            以股票代码为键，DataFrame为值的字典
+            以股票代码为键，DataFrame为值的字典，顺序与stock_codes一致，没有数据的股票对应空DataFrame
         """
         result = {}
         
-        for stock_code in stock_codes:
-            try:
-                df = self.get_stock_data(stock_code, start_date, end_date, limit, columns)
-                result[stock_code] = df
-            except Exception as e:
-                self.logger.error(f"获取股票 {stock_code} 数据失败，跳过该股票: {str(e)}")
-                continue
+        if limit:
+            for stock_code in stock_codes:
+                try:
+                    df = self.get_stock_data(stock_code, start_date, end_date, limit, columns)
+                    result[stock_code] = df
+                except Exception as e:
+                    self.logger.error(f"获取股票 {stock_code} 数据失败，跳过该股票: {str(e)}")
+                    continue
+            
+            self.logger.info(f"成功获取 {len(result)} 只股票的历史数据")
+            return result
         
-        self.logger.info(f"成功获取 {len(result)} 只股票的历史数据")
-        return result
+        try:
+            self.connect()
+            
+            # 分组需要code列，未请求时查询后再去掉
+            select_columns = columns
+            if columns and 'code' not in columns:
+                select_columns = ['code', *columns]
+            columns_str = ', '.join(select_columns) if select_columns else '*'
+            
+            # 日期条件
+            date_clause = ''
+            date_params = []
+            if start_date:
+                date_clause += " AND date >= ?"
+                date_params.append(start_date)
+            if end_date:
+                date_clause += " AND date <= ?"
+                date_params.append(end_date)
+            
+            frames = []
+            for start in range(0, len(stock_codes), MAX_CODES_PER_QUERY):
+                chunk = stock_codes[start:start + MAX_CODES_PER_QUERY]
+                query = (f"SELECT {columns_str} FROM history_k_data WHERE code IN ({', '.join(['?'] * len(chunk))})"
+                         f"{date_clause} ORDER BY code, date")
+                frames.append(self.db_manager.read_dataframe(query=query, params=(*chunk, *date_params)))
+            
+            if not frames:
+                return result
+            df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            
+            groups = {code: group for code, group in df.groupby('code', sort=False)}
+            empty = df.iloc[0:0]
+            for stock_code in stock_codes:
+                stock_df = groups.get(stock_code, empty)
+                if select_columns is not columns:
+                    stock_df = stock_df.drop(columns='code')
+                result[stock_code] = stock_df.reset_index(drop=True)
+            
+            self.logger.info(f"成功获取 {len(groups)} 只股票的历史数据")
+            return result
+        except Exception as e:
+            self.logger.error(f"批量获取股票数据失败: {str(e)}")
+            raise
+        finally:
+            self.disconnect()
     
     def get_latest_data(self, stock_code: str, days: int = 100) -> pd.DataFrame:
         """
@@ -220,8 +276,8 @@ class StockDataReader:
             
             query += " ORDER BY date"
             
-            result = self.db_manager.fetch_all(query, tuple(params))
-            trading_dates = [item['date'] for item in result]
+            _, rows = self.db_manager.fetch_all_tuples(query, tuple(params))
+            trading_dates = [row[0] for row in rows]
             self.logger.info(f"成功获取 {len(trading_dates)} 个交易日期")
             return trading_dates
         except Exception as e:
@@ -64,7 +64,7 @@ class StrategyEvaluator:
             
             # 查询分析结果
             query = f"SELECT * FROM analysis_results WHERE {' AND '.join(where_clause)} ORDER BY analysis_date, stock_code"
-            df = self.db_manager.read_dataframe(query, params=tuple(params))
+            df = self.db_manager.read_dataframe(query=query, params=tuple(params))
             
             if df.empty:
                 self.logger.warning(f"未找到策略 {strategy_name} 在 {start_date} 至 {end_date} 的分析结果")
@@ -434,7 +434,7 @@ class StrategyEvaluator:
             ORDER BY date
             """
             
-            df = self.db_manager.read_dataframe(query, params=(stock_code, start_date, end_date))
+            df = self.db_manager.read_dataframe(query=query, params=(stock_code, start_date, end_date))
             
             if not df.empty:
                 df['stock_code'] = df['code']  # 保持与分析结果一致的字段名
@@ -598,28 +598,17 @@ class StrategyEvaluator:
     
     def batch_save_performance(self, performances: list):
         """
-        批量保存绩效数据
+        批量保存绩效数据，所有记录通过一次executemany写入，
+        与已有记录冲突（同一策略和区间）的记录跳过
         
         Args:
             performances: 绩效指标字典列表
         """
         try:
             self.db_manager.connect()
-            self.db_manager.begin_transaction()
-            
-            count = 0
-            for performance in performances:
-                try:
-                    self.db_manager.insert('strategy_performance', performance)
-                    count += 1
-                except Exception as e:
-                    self.logger.error(f"保存策略 {performance.get('strategy_name', '未知')} 的绩效数据失败: {str(e)}")
-                    continue
-            
-            self.db_manager.commit_transaction()
+            count = self.db_manager.insert_records('strategy_performance', performances, on_conflict='IGNORE')
             self.logger.info(f"批量保存完成，成功保存 {count} 条绩效数据")
         except Exception as e:
-            self.db_manager.rollback_transaction()
             self.logger.error(f"批量保存绩效数据失败: {str(e)}")
             raise
         finally:
@@ -663,7 +652,7 @@ class StrategyEvaluator:
             
             query += " ORDER BY start_date DESC, strategy_name"
             
-            df = self.db_manager.read_dataframe(query, params=tuple(params))
+            df = self.db_manager.read_dataframe(query=query, params=tuple(params))
             self.logger.info(f"成功获取 {len(df)} 条策略绩效数据")
             return df
         except Exception as e:
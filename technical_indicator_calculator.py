@@ -1,5 +1,13 @@
+import numpy as np
 import pandas as pd
 from log_utils import setup_logger, get_logger
+from numeric_kernels import ewm_mean, rolling_rsi, kdj as kdj_kernel
+
+# 尝试导入TA-Lib，用于快速计算移动平均
+try:
+    import talib
+except ImportError:
+    talib = None
 
 # 配置日志
 log_config = {
@@ -13,6 +21,36 @@ log_config = {
 setup_logger(log_config)
 logger = get_logger('technical_indicator_calculator')
 
+# 技术指标默认配置
+DEFAULT_INDICATOR_CONFIG = {
+    'ma_periods': [5, 10, 20, 60, 120, 250],
+    'macd': {'fast': 12, 'slow': 26, 'signal': 9},
+    'rsi_periods': [6, 12, 24],
+    'kdj': {'length': 9, 'signal': 3},
+    'bollinger': {'length': 20, 'std': 2},
+    'volume_ma_periods': [5, 10, 20]
+}
+
+
+def _rolling_mean(series: pd.Series, period: int) -> np.ndarray:
+    """
+    计算简单移动平均
+    
+    安装TA-Lib且序列中没有缺失值时使用TA-Lib的SMA（与pandas的rolling mean定义一致）；
+    序列有缺失值时TA-Lib会把NaN传播到之后的所有窗口，此时退回pandas的rolling
+    
+    Args:
+        series: float64序列
+        period: 窗口大小
+        
+    Returns:
+        np.ndarray: 移动平均结果，前period-1个值为NaN
+    """
+    values = series.to_numpy()
+    if talib is not None and 0 < period <= len(values) and not np.isnan(values).any():
+        return talib.SMA(values, timeperiod=period)
+    return series.rolling(window=period).mean().to_numpy()
+
 
 class TechnicalIndicatorCalculator:
     """
@@ -245,14 +283,7 @@ class TechnicalIndicatorCalculator:
             result_df = df.copy()
             
             # 默认配置
-            default_config = {
-                'ma_periods': [5, 10, 20, 60, 120, 250],
-                'macd': {'fast': 12, 'slow': 26, 'signal': 9},
-                'rsi_periods': [6, 12, 24],
-                'kdj': {'length': 9, 'signal': 3},
-                'bollinger': {'length': 20, 'std': 2},
-                'volume_ma_periods': [5, 10, 20]
-            }
+            default_config = dict(DEFAULT_INDICATOR_CONFIG)
             
             # 合并配置
             if config:
@@ -274,6 +305,86 @@ class TechnicalIndicatorCalculator:
             self.logger.error(f"计算所有技术指标失败: {str(e)}")
             raise
 
+    
+    def calculate_all_indicators_fast(self, df: pd.DataFrame, config: dict = None) -> pd.DataFrame:
+        """
+        计算所有技术指标（快速版本）
+        
+        指标定义和结果与calculate_all_indicators一致，但不再由各指标方法分别复制DataFrame、逐列插入：
+        所有指标先计算为数组，最后一次性拼接到结果中；MACD、RSI和KDJ使用numeric_kernels中的数值内核计算，
+        安装TA-Lib时，移动平均使用TA-Lib计算
+        
+        Args:
+            df: 包含股票数据的DataFrame，必须包含'open'、'high'、'low'、'close'、'volume'列
+            config: 指标配置字典，包含各指标的参数设置
+            
+        Returns:
+            添加了所有技术指标的DataFrame
+        """
+        try:
+            # 合并配置
+            default_config = dict(DEFAULT_INDICATOR_CONFIG)
+            if config:
+                default_config.update(config)
+            
+            self.logger.info(f"开始快速计算所有技术指标，配置: {default_config}")
+            
+            close = df['close'].astype('float64')
+            close_values = close.to_numpy()
+            indicators = {}
+            
+            # 均线
+            for period in default_config['ma_periods']:
+                indicators[f'MA{period}'] = _rolling_mean(close, period)
+            
+            # MACD：平滑系数按pandas由span换算com的方式计算，结果与ewm(span=...)一致
+            macd = default_config['macd']
+            ema_fast = ewm_mean(close_values, 1.0 / (1.0 + (macd['fast'] - 1) / 2.0))
+            ema_slow = ewm_mean(close_values, 1.0 / (1.0 + (macd['slow'] - 1) / 2.0))
+            dif = ema_fast - ema_slow
+            dea = ewm_mean(dif, 1.0 / (1.0 + (macd['signal'] - 1) / 2.0))
+            indicators['MACD_DIF'] = dif
+            indicators['MACD_DEA'] = dea
+            indicators['MACD_HIST'] = 2 * (dif - dea)
+            
+            # RSI
+            for period in default_config['rsi_periods']:
+                indicators[f'RSI{period}'] = rolling_rsi(close_values, period)
+            
+            # KDJ
+            kdj = default_config['kdj']
+            indicators['KDJ_K'], indicators['KDJ_D'], indicators['KDJ_J'] = kdj_kernel(
+                df['high'].to_numpy(dtype='float64'),
+                df['low'].to_numpy(dtype='float64'),
+                close_values,
+                kdj['length'],
+                kdj['signal']
+            )
+            
+            # 布林带：TA-Lib的标准差为总体标准差，与pandas的样本标准差不一致，这里仍用pandas计算
+            bollinger = default_config['bollinger']
+            middle = _rolling_mean(close, bollinger['length'])
+            std_dev = close.rolling(window=bollinger['length']).std().to_numpy()
+            indicators['BOLL_UPPER'] = middle + bollinger['std'] * std_dev
+            indicators['BOLL_MIDDLE'] = middle
+            indicators['BOLL_LOWER'] = middle - bollinger['std'] * std_dev
+            
+            # 成交量均线
+            volume = df['volume'].astype('float64')
+            for period in default_config['volume_ma_periods']:
+                indicators[f'VOL{period}'] = _rolling_mean(volume, period)
+            
+            # 一次性拼接所有指标列；输入中已有同名列时按原列位置覆盖
+            if df.columns.intersection(list(indicators)).empty:
+                result_df = pd.concat([df, pd.DataFrame(indicators, index=df.index)], axis=1)
+            else:
+                result_df = df.assign(**indicators)
+            
+            self.logger.info("所有技术指标快速计算完成")
+            return result_df
+        except Exception as e:
+            self.logger.error(f"快速计算所有技术指标失败: {str(e)}")
+            raise
 
 # 使用示例
 if __name__ == '__main__':
@@ -52,6 +52,8 @@ class TestAkShareIntegration(unittest.TestCase):
         """
         清理测试环境
         """
+        self.fetcher.close()
+        
         # 清理缓存文件
         cache_dir = './cache/akshare'
         if os.path.exists(cache_dir):
@@ -143,7 +145,25 @@ class TestAkShareIntegration(unittest.TestCase):
         elapsed_time = end_time - start_time
         min_interval = 1.0 / self.fetcher.rate_limit
         self.assertGreaterEqual(elapsed_time, min_interval)
-    
+
+    def test_rate_limit_concurrent(self):
+        """
+        测试多线程并发时速率限制仍然生效
+        """
+        import time
+        import threading
+
+        start_time = time.time()
+        threads = [threading.Thread(target=self.fetcher._check_rate_limit) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed_time = time.time() - start_time
+
+        # 3个请求至少需要2个最小间隔
+        self.assertGreaterEqual(elapsed_time, 2 * self.fetcher.min_interval * 0.95)
+
     def test_cache_mechanism(self):
         """
         测试缓存机制
@@ -183,8 +203,16 @@ class TestAkShareIntegration(unittest.TestCase):
         self.assertEqual(len(cached_data), len(test_data))
         
         # 验证缓存文件路径生成
-        cache_file = self.fetcher._get_cache_file_path(stock_code, self.start_date, self.end_date)
+        cache_file = self.fetcher._get_cache_file_path(stock_code)
         self.assertTrue(os.path.exists(cache_file))
+        
+        # 已缓存区间内的子区间直接命中缓存
+        cached_data = self.fetcher._load_from_cache(stock_code, '2023-01-02', '2023-01-05')
+        self.assertIsInstance(cached_data, pd.DataFrame)
+        self.assertEqual(list(cached_data['date']), ['2023-01-02'])
+        
+        # 超出已缓存区间则不命中
+        self.assertIsNone(self.fetcher._load_from_cache(stock_code, '2022-12-01', self.end_date))
     
     def test_data_conversion(self):
         """
@@ -229,6 +257,8 @@ class TestAkShareIntegration(unittest.TestCase):
         self.assertEqual(standard_data['date'].iloc[0], '2023-01-01')
         self.assertEqual(standard_data['open'].iloc[0], 10.0)
         self.assertEqual(standard_data['close'].iloc[0], 10.5)
+        self.assertEqual(standard_data['preclose'].iloc[0], 10.0)  # 收盘价 - 涨跌额
+        self.assertEqual(standard_data['preclose'].iloc[1], 10.5)
         self.assertEqual(standard_data['adjustflag'].iloc[0], '1')  # 前复权
         self.assertEqual(standard_data['tradestatus'].iloc[0], '1')  # 正常交易
         self.assertEqual(standard_data['isST'].iloc[0], '0')  # 非ST股
@@ -248,6 +278,143 @@ class TestAkShareIntegration(unittest.TestCase):
             self.assertIsInstance(df, pd.DataFrame)
             self.assertTrue(df.empty)
     
+    def test_fetch_stock_data_batch(self):
+        """
+        测试批量并发获取股票数据
+        """
+        mock_data = pd.DataFrame({
+            '日期': ['2023-01-03', '2023-01-04'],
+            '开盘': [10.0, 10.5],
+            '收盘': [10.5, 11.0],
+            '最高': [11.0, 11.5],
+            '最低': [10.0, 10.5],
+            '成交量': [1000000, 1500000]
+        })
+
+        with patch('akshare_data_fetcher.ak.stock_zh_a_hist', return_value=mock_data) as mock_stock_hist:
+            codes = ['000001', '000002', '000003']
+            results = self.fetcher.fetch_stock_data_batch(codes, self.start_date, self.end_date)
+
+            self.assertEqual(set(results.keys()), set(codes))
+            for code in codes:
+                self.assertEqual(len(results[code]), 2)
+                self.assertEqual(results[code]['code'].iloc[0], code)
+            self.assertEqual(mock_stock_hist.call_count, 3)
+
+            # 再次获取时全部命中缓存，不再调用akshare
+            self.fetcher.fetch_stock_data_batch(codes, self.start_date, self.end_date)
+            self.assertEqual(mock_stock_hist.call_count, 3)
+
+    def test_fetch_inflight_dedup(self):
+        """
+        测试相同参数的并发请求只调用一次akshare
+        """
+        import time
+        import threading
+
+        mock_data = pd.DataFrame({
+            '日期': ['2023-01-03'],
+            '开盘': [10.0],
+            '收盘': [10.5],
+            '最高': [11.0],
+            '最低': [10.0],
+            '成交量': [1000000]
+        })
+
+        def slow_fetch(**kwargs):
+            time.sleep(0.2)
+            return mock_data
+
+        results = []
+        with patch('akshare_data_fetcher.ak.stock_zh_a_hist', side_effect=slow_fetch) as mock_stock_hist:
+            threads = [
+                threading.Thread(target=lambda: results.append(
+                    self.fetcher._fetch_one('000001', self.start_date, self.end_date)))
+                for _ in range(3)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(mock_stock_hist.call_count, 1)
+        self.assertEqual(len(results), 3)
+        for df in results:
+            self.assertEqual(df['close'].iloc[0], 10.5)
+        # 各请求得到的是互不共享的DataFrame
+        self.assertEqual(len({id(df) for df in results}), 3)
+        self.assertEqual(self.fetcher._inflight, {})
+
+    def test_close(self):
+        """
+        测试关闭后线程池不再接受新的请求
+        """
+        with AkShareDataFetcher(self.config) as fetcher:
+            pass
+        with self.assertRaises(RuntimeError):
+            fetcher.executor.submit(print)
+
+    def test_fetch_and_store(self):
+        """
+        测试获取数据并批量写入数据库
+        """
+        import sqlite3
+        from sqlite_db_manager import SQLiteDBManager
+        from schema import HISTORY_K_DATA_COLUMNS
+
+        mock_data = pd.DataFrame({
+            '日期': ['2023-01-03', '2023-01-04'],
+            '开盘': [10.0, 10.5],
+            '收盘': [10.5, 11.0],
+            '最高': [11.0, 11.5],
+            '最低': [10.0, 10.5],
+            '成交量': [1000000, 1500000]
+        })
+
+        conn = sqlite3.connect(':memory:')
+        conn.execute(SQLiteDBManager.build_create_table_sql('history_k_data', HISTORY_K_DATA_COLUMNS))
+
+        with patch('akshare_data_fetcher.ak.stock_zh_a_hist', return_value=mock_data):
+            self.assertEqual(self.fetcher.fetch_and_store('000001', self.start_date, self.end_date, conn), 2)
+            # 重复写入同一区间不会产生重复记录
+            self.fetcher.fetch_and_store('000001', self.start_date, self.end_date, conn)
+
+        rows = conn.execute('SELECT date, close FROM history_k_data ORDER BY date').fetchall()
+        conn.close()
+        self.assertEqual(rows, [('2023-01-03', 10.5), ('2023-01-04', 11.0)])
+
+    def test_fetch_and_store_atomic(self):
+        """
+        测试写入失败时删除的旧数据一并回滚，自动提交模式的连接同样适用
+        """
+        import sqlite3
+        from sqlite_db_manager import SQLiteDBManager
+        from schema import HISTORY_K_DATA_COLUMNS
+
+        # 同一日期出现两次，违反(code, date)唯一索引导致写入失败
+        mock_data = pd.DataFrame({
+            '日期': ['2023-01-03', '2023-01-03'],
+            '开盘': [10.0, 10.5],
+            '收盘': [10.5, 11.0],
+            '最高': [11.0, 11.5],
+            '最低': [10.0, 10.5],
+            '成交量': [1000000, 1500000]
+        })
+
+        conn = sqlite3.connect(':memory:', isolation_level=None)
+        conn.execute(SQLiteDBManager.build_create_table_sql('history_k_data', HISTORY_K_DATA_COLUMNS))
+        conn.execute('CREATE UNIQUE INDEX idx_code_date ON history_k_data(code, date)')
+        conn.execute("INSERT INTO history_k_data (date, code, close) VALUES ('2023-01-03', '000001', 9.0)")
+
+        with patch('akshare_data_fetcher.ak.stock_zh_a_hist', return_value=mock_data):
+            with self.assertRaises(sqlite3.IntegrityError):
+                self.fetcher.fetch_and_store('000001', self.start_date, self.end_date, conn)
+
+        self.assertFalse(conn.in_transaction)
+        rows = conn.execute('SELECT date, close FROM history_k_data').fetchall()
+        conn.close()
+        self.assertEqual(rows, [('2023-01-03', 9.0)])
+
     def test_cache_invalidation(self):
         """
         测试缓存失效机制
@@ -278,15 +445,12 @@ class TestAkShareIntegration(unittest.TestCase):
         stock_code = '000001'
         self.fetcher._save_to_cache(stock_code, self.start_date, self.end_date, test_data)
         
-        # 获取缓存文件路径
-        cache_file = self.fetcher._get_cache_file_path(stock_code, self.start_date, self.end_date)
-        
-        # 修改缓存文件的修改时间，使其过期
+        # 模拟25小时后加载，使缓存过期
         import time
-        os.utime(cache_file, (time.time() - 3600 * 25, time.time() - 3600 * 25))
-        
-        # 尝试从缓存加载
-        cached_data = self.fetcher._load_from_cache(stock_code, self.start_date, self.end_date)
+        expired_time = time.time() + 3600 * 25
+        with patch('akshare_data_fetcher.time.time', return_value=expired_time):
+            # 尝试从缓存加载
+            cached_data = self.fetcher._load_from_cache(stock_code, self.start_date, self.end_date)
         
         # 验证缓存已失效
         self.assertIsNone(cached_data)
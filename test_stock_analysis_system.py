@@ -20,6 +20,12 @@ from traditional_analysis_engine import TraditionalAnalysisEngine
 from strategy_evaluator import StrategyEvaluator
 from stock_data_reader import StockDataReader
 from report_generator import ReportGenerator
+from result_storage import ResultStorage
+from create_tables import create_tables
+from sqlite_db_manager import SQLiteDBManager
+from stock_analysis_system import StockAnalysisSystem
+from data_validator import DataValidator
+from numeric_kernels import scan_numeric_block, _scan_numeric_block_numpy
 
 
 class TestTechnicalIndicatorCalculator(unittest.TestCase):
@@ -162,6 +168,20 @@ class TestTechnicalIndicatorCalculator(unittest.TestCase):
         for col in required_columns:
             self.assertIn(col, result.columns)
             self.assertFalse(pd.isna(result[col].iloc[-1]))
+    
+    def test_calculate_all_indicators_fast(self):
+        """
+        测试快速计算所有技术指标，结果应与calculate_all_indicators一致
+        """
+        expected = self.calculator.calculate_all_indicators(self.test_data)
+        result = self.calculator.calculate_all_indicators_fast(self.test_data)
+        
+        # 验证结果
+        pd.testing.assert_frame_equal(result, expected, check_exact=False)
+        
+        # 输入中已有指标列时，结果同样一致
+        result = self.calculator.calculate_all_indicators_fast(expected)
+        pd.testing.assert_frame_equal(result, self.calculator.calculate_all_indicators(expected), check_exact=False)
 
 
 class TestTraditionalAnalysisEngine(unittest.TestCase):
@@ -394,7 +414,43 @@ class TestReportGenerator(unittest.TestCase):
         # 清理测试文件
         os.remove(file_path)
         os.rmdir('./test_reports')
+    
+    def test_generate_and_save_report(self):
+        """
+        测试生成并保存报告到文件
+        """
+        report_content = self.generator.generate_and_save_report(
+            '000001', 
+            self.test_analysis_result,
+            self.test_data
+        )
+        
+        # 验证报告按股票代码和分析日期命名保存
+        file_path = os.path.join('./test_reports', '000001_2023-01-30.md')
+        self.assertTrue(os.path.exists(file_path))
+        with open(file_path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), report_content)
+        
+        # 清理测试文件
+        os.remove(file_path)
+        os.rmdir('./test_reports')
 
+    
+    def test_batch_generate_reports_parallel(self):
+        """
+        测试股票数达到并行阈值时在子进程中生成报告，结果与逐只生成一致
+        """
+        from report_generator import PARALLEL_REPORT_MIN_STOCKS
+        analysis_results = {
+            f'{i:06d}': {**self.test_analysis_result, 'stock_code': f'{i:06d}'}
+            for i in range(PARALLEL_REPORT_MIN_STOCKS)
+        }
+        
+        reports = self.generator.batch_generate_reports(analysis_results, save_to_file=False)
+        
+        self.assertEqual(list(reports), list(analysis_results))
+        self.assertEqual(reports['000001'],
+                         self.generator.generate_stock_report('000001', analysis_results['000001']))
 
 class TestStrategyEvaluator(unittest.TestCase):
     """
@@ -430,5 +486,386 @@ class TestStrategyEvaluator(unittest.TestCase):
         self.skipTest("SQLiteDBManager.read_dataframe()不接受params参数")
 
 
+
+
+class TestDataValidator(unittest.TestCase):
+    """
+    数据校验器测试类
+    """
+    
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        self.validator = DataValidator()
+        
+        # 创建字段齐全、数值合法的测试数据
+        self.test_data = pd.DataFrame({
+            'date': ['2023-01-03', '2023-01-04', '2023-01-05'],
+            'code': ['sh.600000'] * 3,
+            'open': [10.0, 11.0, 12.0],
+            'high': [10.5, 11.5, 12.5],
+            'low': [9.5, 10.5, 11.5],
+            'close': [10.2, 11.2, 12.2],
+            'preclose': [9.8, 10.2, 11.2],
+            'volume': [1000000, 2000000, 3000000],
+            'amount': [10200000, 22400000, 36600000],
+            'adjustflag': ['3'] * 3,
+            'turn': [0.5, 1.0, 1.5],
+            'tradestatus': ['1'] * 3,
+            'pctChg': [4.08, -9.80, 8.93],
+            'peTTM': [5.0, 5.2, 5.4],
+            'pbMRQ': [1.0, 1.1, 1.2],
+            'psTTM': [2.0, 2.1, 2.2],
+            'pcfNcfTTM': [3.0, 3.1, 3.2],
+            'isST': ['0'] * 3
+        })
+    
+    def test_validate_valid_data(self):
+        """
+        测试合法数据校验通过
+        """
+        result = self.validator.validate_dataframe(self.test_data, 'sh.600000')
+        self.assertTrue(result['is_valid'])
+        self.assertEqual(result['errors'], [])
+    
+    def test_validate_invalid_values(self):
+        """
+        测试NaN、数值列中的字符串和无效日期
+        """
+        df = self.test_data.astype({'open': object})
+        df.loc[0, 'close'] = np.nan
+        df.loc[1, 'open'] = 'abc'
+        df.loc[2, 'date'] = 'not a date'
+        
+        result = self.validator.validate_dataframe(df, 'sh.600000')
+        
+        self.assertFalse(result['is_valid'])
+        self.assertIn('字段 close 包含 1 个无效数值', result['errors'])
+        self.assertIn('字段 open 包含 1 个无效数值', result['errors'])
+        self.assertIn('字段 date 包含 1 个无效日期', result['errors'])
+        self.assertIn('数据不完整，共 3/3 行包含缺失值', result['errors'])
+        # 校验不修改传入的DataFrame
+        self.assertEqual(df.loc[1, 'open'], 'abc')
+    
+    def test_validate_duplicate_dates(self):
+        """
+        测试重复日期
+        """
+        df = self.test_data.copy()
+        df.loc[2, 'date'] = '2023-01-03'
+        
+        result = self.validator.validate_dataframe(df, 'sh.600000')
+        
+        self.assertFalse(result['is_valid'])
+        self.assertEqual(result['errors'], ['存在重复日期，共 2 行'])
+    
+    def test_validate_price_consistency(self):
+        """
+        测试最高价、最低价、开盘价和收盘价不一致
+        """
+        df = self.test_data.copy()
+        df.loc[0, ['high', 'low']] = [9.0, 9.5]
+        df.loc[1, 'close'] = 12.0
+        df.loc[2, 'volume'] = 0
+        
+        result = self.validator.validate_dataframe(df, 'sh.600000')
+        
+        self.assertFalse(result['is_valid'])
+        self.assertIn('最高价小于最低价，共 1 行', result['errors'])
+        self.assertIn('收盘价不在最高价和最低价之间，共 2 行', result['errors'])
+        self.assertIn('开盘价不在最高价和最低价之间，共 1 行', result['errors'])
+        self.assertIn('成交量为零或负数，共 1 行', result['errors'])
+    
+    def test_clean_dataframe(self):
+        """
+        测试清理数据时同一日期只保留最后一条，并用前一天的值填充缺失值
+        """
+        df = pd.concat([self.test_data, self.test_data.iloc[[2]].assign(close=12.4)], ignore_index=True)
+        df.loc[1, 'close'] = np.nan
+        
+        cleaned = self.validator.clean_dataframe(df)
+        
+        self.assertEqual(len(cleaned), 3)
+        self.assertEqual(cleaned['close'].tolist(), [10.2, 10.2, 12.4])
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(cleaned['date']))
+        self.assertFalse(cleaned.isna().to_numpy().any())
+
+
+class TestNumericKernels(unittest.TestCase):
+    """
+    数值计算内核测试类
+    """
+    
+    def test_scan_numeric_block_numpy(self):
+        """
+        测试numpy实现的数值矩阵扫描结果，以及与当前使用的实现一致
+        """
+        # 列依次为open、high、low、close、volume
+        arr = np.array([
+            [10.0, 10.5, 9.5, 10.2, 100.0],
+            [11.0, 10.0, 10.5, 11.2, 0.0],
+            [np.nan, 12.5, 11.5, 13.0, -1.0],
+            [12.0, 12.5, 11.5, 12.2, np.nan],
+        ])
+        args = (1, 2, 0, 3, np.array([0, 1, 2, 3], dtype=np.int64), np.array([4], dtype=np.int64))
+        
+        row_has_nan, nan_counts, consistency, negative_counts, nonpositive_counts = \
+            _scan_numeric_block_numpy(arr, *args)
+        
+        self.assertEqual(row_has_nan.tolist(), [False, False, True, True])
+        self.assertEqual(nan_counts.tolist(), [1, 0, 0, 0, 1])
+        self.assertEqual(consistency.tolist(), [1, 2, 1])
+        self.assertEqual(negative_counts.tolist(), [0, 0, 0, 0])
+        self.assertEqual(nonpositive_counts.tolist(), [2])
+        
+        for expected, actual in zip(_scan_numeric_block_numpy(arr, *args), scan_numeric_block(arr, *args)):
+            np.testing.assert_array_equal(expected, actual)
+    
+    def test_scan_numeric_block_without_prices(self):
+        """
+        测试没有价格列时不做一致性检查
+        """
+        arr = np.array([[1.0, -2.0], [np.nan, 3.0]], dtype=np.float32)
+        
+        _, nan_counts, consistency, negative_counts, _ = _scan_numeric_block_numpy(
+            arr, -1, -1, -1, -1, np.array([0, 1], dtype=np.int64), np.array([], dtype=np.int64)
+        )
+        
+        self.assertEqual(nan_counts.tolist(), [1, 0])
+        self.assertEqual(consistency.tolist(), [0, 0, 0])
+        self.assertEqual(negative_counts.tolist(), [0, 1])
+
+class TestSQLiteDBManager(unittest.TestCase):
+    """
+    SQLite数据库管理类测试类
+    """
+    
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        import tempfile
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_manager = SQLiteDBManager(os.path.join(self.temp_dir, 'test.db'))
+        self.db_manager.connect()
+        self.db_manager.execute_script("CREATE TABLE t (a INTEGER UNIQUE)")
+    
+    def tearDown(self):
+        """
+        清理测试环境
+        """
+        import shutil
+        self.db_manager.disconnect()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_failed_statement_in_transaction(self):
+        """
+        测试显式事务中一条语句失败后事务仍然有效，之后的写入可以由rollback_transaction撤销
+        """
+        self.db_manager.begin_transaction()
+        self.db_manager.insert('t', {'a': 1})
+        with self.assertRaises(Exception):
+            self.db_manager.insert('t', {'a': 1})
+        self.db_manager.insert('t', {'a': 2})
+        self.db_manager.rollback_transaction()
+        self.assertEqual(self.db_manager.fetch_all("SELECT a FROM t"), [])
+        
+        self.db_manager.begin_transaction()
+        self.db_manager.insert('t', {'a': 1})
+        with self.assertRaises(Exception):
+            self.db_manager.insert('t', {'a': 1})
+        self.db_manager.insert('t', {'a': 2})
+        self.db_manager.commit_transaction()
+        self.assertEqual([row['a'] for row in self.db_manager.fetch_all("SELECT a FROM t ORDER BY a")], [1, 2])
+
+
+class TestResultStorage(unittest.TestCase):
+    """
+    结果存储模块测试类
+    """
+    
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        import tempfile
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'test_results.db')
+        create_tables(self.db_path)
+        self.storage = ResultStorage(self.db_path)
+    
+    def tearDown(self):
+        """
+        清理测试环境
+        """
+        import shutil
+        try:
+            self.storage.close()
+        except Exception:
+            pass
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_save_analysis_result_duplicate(self):
+        """
+        测试一批分析结果中有重复行时其余行仍写入，重复行的错误在flush()时抛出
+        """
+        for i in range(10):
+            self.storage.save_analysis_result({
+                'stock_code': f'sh.60000{i}', 'analysis_date': '2023-01-30', 'strategy': 'default', 'rating': 'buy'
+            })
+        self.storage.save_analysis_result({
+            'stock_code': 'sh.600003', 'analysis_date': '2023-01-30', 'strategy': 'default', 'rating': 'sell'
+        })
+        
+        with self.assertRaises(Exception):
+            self.storage.flush()
+        self.assertEqual(len(self.storage.get_analysis_results()), 10)
+    
+    def test_save_batch_analysis_results_duplicate(self):
+        """
+        测试批量保存分析结果时只跳过违反唯一约束的结果
+        """
+        results = {
+            f'sh.60000{i}': {'stock_code': f'sh.60000{i}', 'analysis_date': '2023-01-30',
+                             'strategy': 'default', 'rating': 'buy'}
+            for i in range(5)
+        }
+        self.assertEqual(self.storage.save_batch_analysis_results(results), [])
+        
+        duplicate = dict(results['sh.600001'])
+        new_result = {**duplicate, 'stock_code': 'sz.000001'}
+        failed = self.storage.save_batch_analysis_results({'sh.600001': duplicate, 'sz.000001': new_result})
+        self.assertEqual(failed, ['sh.600001'])
+        self.assertEqual(len(self.storage.get_analysis_results()), 6)
+    
+    def test_save_batch_analysis_reports_duplicate(self):
+        """
+        测试批量保存分析报告时只跳过违反唯一约束的报告
+        """
+        self.assertEqual(self.storage.save_batch_analysis_reports([]), [])
+        self.assertEqual(
+            self.storage.save_batch_analysis_reports([('sh.600001', '2023-01-30', 'full', 'a')]), []
+        )
+        failed = self.storage.save_batch_analysis_reports([
+            ('sh.600001', '2023-01-30', 'full', 'b'),
+            ('sh.600002', '2023-01-30', 'full', 'c'),
+        ])
+        self.assertEqual(failed, ['sh.600001'])
+        _, rows = self.storage.db_manager.fetch_all_tuples('SELECT stock_code, report_content FROM analysis_reports ORDER BY stock_code')
+        self.assertEqual(rows, [('sh.600001', 'a'), ('sh.600002', 'c')])
+    
+    def test_flush_connect_error(self):
+        """
+        测试后台写入线程连接数据库失败时flush()抛出异常而不是一直阻塞
+        """
+        storage = ResultStorage(os.path.join(self.temp_dir, 'missing_dir', 'test.db'))
+        storage.save_analysis_result({
+            'stock_code': 'sh.600000', 'analysis_date': '2023-01-30', 'strategy': 'default', 'rating': 'buy'
+        })
+        with self.assertRaises(Exception):
+            storage.flush()
+        with self.assertRaises(Exception):
+            storage.close()
+
+
+
+class TestStockAnalysisSystem(unittest.TestCase):
+    """
+    股票分析系统测试类
+    """
+    
+    def setUp(self):
+        """
+        设置测试环境：文件数据库中写入3只股票的历史数据
+        """
+        import json
+        import tempfile
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'test_system.db')
+        create_tables(self.db_path)
+        
+        self.stock_codes = ['sh.600001', 'sh.600002', 'sh.600003']
+        rng = np.random.default_rng(0)
+        frames = []
+        for code in self.stock_codes:
+            close = rng.random(60) * 10 + 10
+            frames.append(pd.DataFrame({
+                'date': pd.date_range('2023-01-01', periods=60).strftime('%Y-%m-%d'),
+                'code': code,
+                'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+                'volume': rng.integers(1000000, 10000000, 60).astype(float),
+                'amount': rng.integers(10000000, 100000000, 60).astype(float),
+            }))
+        db_manager = SQLiteDBManager(self.db_path)
+        db_manager.write_dataframe(pd.concat(frames, ignore_index=True), 'history_k_data', if_exists='append')
+        db_manager.disconnect()
+        
+        config_path = os.path.join(self.temp_dir, 'config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'output': {'database_path': self.db_path},
+                'analysis': {'report': {'save_path': os.path.join(self.temp_dir, 'reports')}}
+            }, f)
+        self.system = StockAnalysisSystem(config_path)
+    
+    def tearDown(self):
+        """
+        清理测试环境
+        """
+        import shutil
+        try:
+            self.system.storage.close()
+        except Exception:
+            pass
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_batch_analyze_stocks_indicator_failure(self):
+        """
+        测试技术指标保存失败的股票不保存分析结果和报告，也不出现在返回结果中
+        """
+        save_technical_indicators = self.system.storage.save_technical_indicators
+        
+        def fail_one(df, *args, **kwargs):
+            if 'sh.600002' in set(df['code']):
+                raise ValueError('写入失败')
+            return save_technical_indicators(df[['date', 'code']], *args, **kwargs)
+        
+        with patch.object(self.system.storage, 'save_technical_indicators', side_effect=fail_one):
+            results = self.system.batch_analyze_stocks(self.stock_codes)
+        self.system.storage.flush()
+        
+        self.assertEqual(sorted(results), ['sh.600001', 'sh.600003'])
+        stored = self.system.storage.get_analysis_results()
+        self.assertEqual(sorted(stored['stock_code']), ['sh.600001', 'sh.600003'])
+        reports = os.listdir(os.path.join(self.temp_dir, 'reports'))
+        self.assertFalse(any('sh.600002' in name for name in reports))
+    
+    def test_batch_analyze_stocks_duplicate_results(self):
+        """
+        测试重复分析同一批股票时，分析结果写入失败的股票从返回结果中移除而不是抛出异常
+        """
+        with patch.object(self.system.storage, 'save_technical_indicators'):
+            results = self.system.batch_analyze_stocks(self.stock_codes, save_reports=False)
+            self.assertEqual(sorted(results), self.stock_codes)
+            
+            results = self.system.batch_analyze_stocks(self.stock_codes, save_reports=False)
+            self.assertEqual(results, {})
+        self.assertEqual(self.system.storage.flush_failures(), [])
+        self.assertEqual(len(self.system.storage.get_analysis_results()), 3)
+    
+    def test_batch_run_backtest_parallel(self):
+        """
+        测试策略数达到并行阈值时在子进程中回测，且能读到刚提交给后台写入线程的分析结果
+        """
+        with patch.object(self.system.storage, 'save_technical_indicators'):
+            results = self.system.batch_analyze_stocks(self.stock_codes, save_reports=False)
+        strategy = next(iter(results.values()))['strategy']
+        analysis_date = next(iter(results.values()))['analysis_date']
+        
+        strategy_names = [strategy, 'missing_1', 'missing_2', 'missing_3']
+        performances = self.system.batch_run_backtest(strategy_names, analysis_date, analysis_date)
+        self.assertEqual([p['strategy_name'] for p in performances], [strategy])
+
 if __name__ == '__main__':
     unittest.main()